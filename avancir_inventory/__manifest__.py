@@ -19,6 +19,8 @@
         - Inter-store inventory transfers
         - End-of-day POS reconciliation
         - Fetch activity history from Avancir API
+        - Local mirror of Avancir items and RFID activity
+        - Webhook receiver for Avancir RFID events
 
         Configuration:
         - Set RFID API credentials in Settings > Inventory > RFID
@@ -36,8 +38,12 @@
     ],
     'data': [
         'security/ir.model.access.csv',
+        'data/avancir_cron.xml',
         'views/res_config_settings_views.xml',
+        'views/res_company_views.xml',
         'views/product_template_views.xml',
+        'views/avancir_reconciliation_views.xml',
+        'views/avancir_item_views.xml',
     ],
     'installable': True,
     'application': False,
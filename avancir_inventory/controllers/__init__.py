@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
 
 from . import activity_controller
+from . import metrics_controller
+from . import reconciliation_controller
+from . import webhook_controller
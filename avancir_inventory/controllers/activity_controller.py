@@ -2,11 +2,29 @@
 
 import json
 import logging
+import random
+import time
 
 from odoo import http
 from odoo.http import request, Response
 
+from ..tools.cache import response_cache
+
 _logger = logging.getLogger(__name__)
+# Append-only, sampled audit trail of RFID API calls (routed by the log config)
+_audit_logger = logging.getLogger('odoo.addons.avancir_inventory.audit')
+
+# Response cache TTL per endpoint: (config parameter, default seconds).
+# A TTL of 0 disables caching for that endpoint.
+CACHE_TTLS = {
+    'history': ('cache_ttl_history', 30),
+    'history_location': ('cache_ttl_history', 30),
+    'item_history': ('cache_ttl_history', 30),
+    'inventory': ('cache_ttl_inventory', 10),
+}
+
+# Where reads are served from: Avancir live, or the local avancir.item mirror
+SOURCES = ('remote', 'local')
 
 
 class AvancirHistoryController(http.Controller):
@@ -28,10 +46,57 @@ class AvancirHistoryController(http.Controller):
         }, status=status)
 
     def _get_sync_model(self):
-        """Get or create an avancir.sync record for API calls."""
-        Sync = request.env['avancir.sync'].sudo()
-        # Return the model class - we'll create temp records as needed
-        return Sync
+        """Return the avancir.sync model; API calls run on the empty recordset."""
+        return request.env['avancir.sync'].sudo()
+
+    def _audit(self, endpoint, started, status, **details):
+        """
+        Log one API call to the audit logger, sampled.
+
+        Read-only proxy calls are not stored in the database; the sample
+        rate (avancir_inventory.api_audit_sample_rate, 0 to 1) bounds the
+        log volume.
+        """
+        rate = float(self._get_sync_model()._get_config('api_audit_sample_rate', 0.01))
+        if rate <= 0 or random.random() >= rate:
+            return
+        _audit_logger.info(json.dumps({
+            'endpoint': endpoint,
+            'status': status,
+            'duration_ms': round((time.monotonic() - started) * 1000, 1),
+            'db': request.db,
+            **details,
+        }, default=str))
+
+    def _cached(self, endpoint, fetch, source='remote', cacheable=None, **params):
+        """
+        Serve an Avancir read through the shared response cache.
+
+        Concurrent identical misses trigger a single upstream call. Reads
+        from the local mirror are already cheap and are never cached.
+        Results ``cacheable`` rejects are returned but not cached.
+        """
+        if source == 'local':
+            return fetch()
+        Sync = self._get_sync_model()
+        ttl_param, default_ttl = CACHE_TTLS[endpoint]
+        ttl = float(Sync._get_config(ttl_param, default_ttl))
+        response_cache.max_entries = int(Sync._get_config('cache_max_entries', 1000))
+        key = response_cache.make_key(request.db, endpoint, **params)
+        return response_cache.get_or_fetch(key, ttl, fetch, cacheable)
+
+    def _cached_history(self, endpoint, fetch, source='remote', **params):
+        """
+        Serve a history read through the cache, keeping partial results out of it.
+
+        ``fetch`` takes the list collecting the item ids whose history
+        Avancir failed to return. Returns (history, failed ids).
+        """
+        def fetch_history():
+            failed = []
+            return fetch(failed), failed
+        return self._cached(endpoint, fetch_history, source=source,
+                            cacheable=lambda result: not result[1], **params)
 
     # ================================================================
     # HISTORY FETCH ENDPOINTS
@@ -44,11 +109,18 @@ class AvancirHistoryController(http.Controller):
 
         Query params:
             - item_ids: Comma-separated list of Avancir item IDs (required)
+            - source: 'remote' (default) or 'local' to read the mirror
 
         Returns:
-            Activity history from Avancir's /items/history/batch endpoint
+            Activity history from Avancir's /items/history/batch endpoint.
+            partial is true when Avancir failed to return the history of
+            the items in failed_item_ids; such responses are not cached.
         """
+        started = time.monotonic()
         try:
+            source = kwargs.get('source') or 'remote'
+            if source not in SOURCES:
+                return self._error_response(f'source must be one of: {", ".join(SOURCES)}', 400)
             item_ids_param = kwargs.get('item_ids', '')
             if not item_ids_param:
                 return self._error_response('item_ids query parameter is required', 400)
@@ -57,30 +129,24 @@ class AvancirHistoryController(http.Controller):
             if not item_ids:
                 return self._error_response('No valid item IDs provided', 400)
 
-            Sync = self._get_sync_model()
-            # Create temp sync record for API call
-            temp_sync = Sync.create({
-                'name': 'History Fetch (temp)',
-                'sync_type': 'full',
-                'state': 'running',
+            history, failed = self._cached_history(
+                'history', lambda failed: self._get_sync_model().get_item_history(
+                    item_ids, source=source, failed=failed),
+                source=source, item_ids=','.join(sorted(item_ids)))
+            self._audit('history', started, 200, item_count=len(item_ids), failed=len(failed))
+
+            return self._json_response({
+                'success': True,
+                'data': history,
+                'item_count': len(item_ids),
+                'history_count': len(history) if isinstance(history, list) else 0,
+                'partial': bool(failed),
+                'failed_item_ids': failed,
             })
 
-            try:
-                history = temp_sync.get_item_history(item_ids)
-                temp_sync.write({'state': 'done'})
-
-                return self._json_response({
-                    'success': True,
-                    'data': history,
-                    'item_count': len(item_ids),
-                    'history_count': len(history) if isinstance(history, list) else 0,
-                })
-            except Exception as e:
-                temp_sync.write({'state': 'error', 'error_log': str(e)})
-                raise
-
         except Exception as e:
             _logger.error(f'Error fetching item history: {e}')
+            self._audit('history', started, 500, error=str(e))
             return self._error_response(str(e), 500)
 
     @http.route('/api/v1/rfid/history/location/<string:location_name>', type='http', auth='public', methods=['GET'], csrf=False)
@@ -92,45 +158,50 @@ class AvancirHistoryController(http.Controller):
             - location_name: Name of the location/warehouse
 
         Query params:
-            - limit: Max number of items to fetch history for (default 50)
+            - limit: Max number of items to fetch history for (default 50,
+                     capped by the history_max_items setting)
+            - source: 'remote' (default) or 'local' to read the mirror
 
         Returns:
-            Activity history from Avancir for items at that location
+            Activity history from Avancir for items at that location, with
+            partial and failed_item_ids as for /api/v1/rfid/history
         """
+        started = time.monotonic()
         try:
+            source = kwargs.get('source') or 'remote'
+            if source not in SOURCES:
+                return self._error_response(f'source must be one of: {", ".join(SOURCES)}', 400)
             if not location_name:
                 return self._error_response('location_name is required', 400)
 
+            max_items = int(self._get_sync_model()._get_config('history_max_items', 5000))
             limit = int(kwargs.get('limit', 50))
             if limit < 1:
                 limit = 50
-            if limit > 200:
-                limit = 200
-
-            Sync = self._get_sync_model()
-            temp_sync = Sync.create({
-                'name': f'History Fetch - {location_name} (temp)',
-                'sync_type': 'full',
-                'state': 'running',
+            if limit > max_items:
+                limit = max_items
+
+            history, failed = self._cached_history(
+                'history_location',
+                lambda failed: self._get_sync_model().get_item_history_by_location(
+                    location_name, limit=limit, source=source, failed=failed),
+                source=source, location=location_name, limit=limit)
+            self._audit('history_location', started, 200, location=location_name, limit=limit,
+                        failed=len(failed))
+
+            return self._json_response({
+                'success': True,
+                'data': history,
+                'location': location_name,
+                'limit': limit,
+                'history_count': len(history) if isinstance(history, list) else 0,
+                'partial': bool(failed),
+                'failed_item_ids': failed,
             })
 
-            try:
-                history = temp_sync.get_item_history_by_location(location_name, limit=limit)
-                temp_sync.write({'state': 'done'})
-
-                return self._json_response({
-                    'success': True,
-                    'data': history,
-                    'location': location_name,
-                    'limit': limit,
-                    'history_count': len(history) if isinstance(history, list) else 0,
-                })
-            except Exception as e:
-                temp_sync.write({'state': 'error', 'error_log': str(e)})
-                raise
-
         except Exception as e:
             _logger.error(f'Error fetching history for location {location_name}: {e}')
+            self._audit('history_location', started, 500, location=location_name, error=str(e))
             return self._error_response(str(e), 500)
 
     @http.route('/api/v1/rfid/items/<string:item_id>/history', type='http', auth='public', methods=['GET'], csrf=False)
@@ -141,36 +212,38 @@ class AvancirHistoryController(http.Controller):
         Path params:
             - item_id: Avancir item ID
 
+        Query params:
+            - source: 'remote' (default) or 'local' to read the mirror
+
         Returns:
-            Activity history for the specified item
+            Activity history for the specified item; partial is true when
+            Avancir failed to return it
         """
+        started = time.monotonic()
         try:
+            source = kwargs.get('source') or 'remote'
+            if source not in SOURCES:
+                return self._error_response(f'source must be one of: {", ".join(SOURCES)}', 400)
             if not item_id:
                 return self._error_response('item_id is required', 400)
 
-            Sync = self._get_sync_model()
-            temp_sync = Sync.create({
-                'name': f'History Fetch - Item {item_id} (temp)',
-                'sync_type': 'full',
-                'state': 'running',
+            history, failed = self._cached_history(
+                'item_history', lambda failed: self._get_sync_model().get_item_history_single(
+                    item_id, source=source, failed=failed),
+                source=source, item_id=item_id)
+            self._audit('item_history', started, 200, item_id=item_id, failed=len(failed))
+
+            return self._json_response({
+                'success': True,
+                'data': history,
+                'item_id': item_id,
+                'history_count': len(history) if isinstance(history, list) else 0,
+                'partial': bool(failed),
             })
 
-            try:
-                history = temp_sync.get_item_history_single(item_id)
-                temp_sync.write({'state': 'done'})
-
-                return self._json_response({
-                    'success': True,
-                    'data': history,
-                    'item_id': item_id,
-                    'history_count': len(history) if isinstance(history, list) else 0,
-                })
-            except Exception as e:
-                temp_sync.write({'state': 'error', 'error_log': str(e)})
-                raise
-
         except Exception as e:
             _logger.error(f'Error fetching history for item {item_id}: {e}')
+            self._audit('item_history', started, 500, item_id=item_id, error=str(e))
             return self._error_response(str(e), 500)
 
     # ================================================================
@@ -187,37 +260,54 @@ class AvancirHistoryController(http.Controller):
 
         Query params:
             - status: Optional status filter
+            - source: 'remote' (default) or 'local' to read the mirror
 
         Returns:
             List of items at the location
         """
+        started = time.monotonic()
         try:
+            source = kwargs.get('source') or 'remote'
+            if source not in SOURCES:
+                return self._error_response(f'source must be one of: {", ".join(SOURCES)}', 400)
             if not location_name:
                 return self._error_response('location_name is required', 400)
 
             status_filter = kwargs.get('status')
 
-            Sync = self._get_sync_model()
-            temp_sync = Sync.create({
-                'name': f'Inventory Fetch - {location_name} (temp)',
-                'sync_type': 'inventory',
-                'state': 'running',
+            items = self._cached(
+                'inventory',
+                lambda: self._get_sync_model().get_avancir_inventory_by_location(
+                    location_name, status_filter=status_filter, source=source),
+                source=source, location=location_name, status=status_filter)
+            self._audit('inventory', started, 200, location=location_name, status_filter=status_filter)
+
+            return self._json_response({
+                'success': True,
+                'data': items,
+                'location': location_name,
+                'item_count': len(items) if isinstance(items, list) else 0,
             })
 
-            try:
-                items = temp_sync.get_avancir_inventory_by_location(location_name, status_filter=status_filter)
-                temp_sync.write({'state': 'done'})
-
-                return self._json_response({
-                    'success': True,
-                    'data': items,
-                    'location': location_name,
-                    'item_count': len(items) if isinstance(items, list) else 0,
-                })
-            except Exception as e:
-                temp_sync.write({'state': 'error', 'error_log': str(e)})
-                raise
-
         except Exception as e:
             _logger.error(f'Error fetching inventory for location {location_name}: {e}')
+            self._audit('inventory', started, 500, location=location_name, error=str(e))
             return self._error_response(str(e), 500)
+
+    # ================================================================
+    # MONITORING
+    # ================================================================
+
+    @http.route('/api/v1/rfid/cache/stats', type='http', auth='user', methods=['GET'], csrf=False)
+    def get_cache_stats(self, **kwargs):
+        """
+        Response cache counters for this worker process.
+
+        Returns:
+            hits, misses, coalesced (waited on another caller's fetch),
+            evictions, size and max_entries
+        """
+        return self._json_response({
+            'success': True,
+            'data': response_cache.stats(),
+        })
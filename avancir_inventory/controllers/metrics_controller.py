@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import hmac
+import json
+
+from odoo import http
+from odoo.http import request, Response
+
+from ..tools.metrics import client_metrics
+
+
+class AvancirMetricsController(http.Controller):
+    """Prometheus scrape endpoint for the Avancir client metrics."""
+
+    def _json_response(self, data, status=200):
+        return Response(json.dumps(data), status=status, content_type='application/json')
+
+    @http.route('/api/v1/rfid/metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    def get_metrics(self, **kwargs):
+        """
+        Avancir client metrics of this worker process, in the Prometheus
+        text format.
+
+        Headers:
+            - Authorization: Bearer <avancir_inventory.metrics_token>
+
+        Returns:
+            Latency histograms, response status counts, retries, bytes
+            sent and received, breaker/rate-limit rejections and token
+            refreshes, per endpoint and method
+        """
+        if not request.db:
+            return self._json_response({'success': False, 'error': 'No database selected'}, 404)
+
+        token = request.env['avancir.sync'].sudo()._get_config('metrics_token')
+        if not token:
+            return self._json_response({'success': False, 'error': 'Metrics are not enabled'}, 404)
+        scheme, _sep, received = request.httprequest.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(received.strip().encode(), token.encode()):
+            return self._json_response({'success': False, 'error': 'Invalid token'}, 403)
+
+        return Response(
+            client_metrics.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
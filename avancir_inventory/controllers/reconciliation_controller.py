@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import logging
+
+from odoo import http
+from odoo.http import request, Response
+
+_logger = logging.getLogger(__name__)
+
+
+class AvancirReconciliationController(http.Controller):
+    """CSV export of stored reconciliation lines."""
+
+    _CSV_FIELDS = [
+        'kind', 'sku', 'name', 'avancir_id', 'odoo_qty',
+        'avancir_qty', 'pos_sold', 'avancir_status', 'last_scan',
+    ]
+    # Lines read per query while streaming
+    _CHUNK = 2000
+
+    @http.route('/avancir/reconciliation/<int:sync_id>/csv', type='http', auth='user', methods=['GET'])
+    def export_reconciliation_csv(self, sync_id, **kwargs):
+        """
+        Download every line of a reconciliation as CSV.
+
+        Lines are read in id-ordered chunks rather than one large read.
+        """
+        sync = request.env['avancir.sync'].browse(sync_id)
+        if not sync.exists():
+            return request.not_found()
+        sync.check_access('read')
+
+        Line = request.env['avancir.reconciliation.line']
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self._CSV_FIELDS)
+
+        last_id = 0
+        while True:
+            rows = Line.search_read(
+                [('sync_id', '=', sync_id), ('id', '>', last_id)],
+                self._CSV_FIELDS, order='id', limit=self._CHUNK,
+            )
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            for row in rows:
+                writer.writerow(['' if row[f] is False else row[f] for f in self._CSV_FIELDS])
+            Line.invalidate_model()
+
+        filename = f'reconciliation_{sync_id}.csv'
+        return Response(
+            buffer.getvalue().encode('utf-8'),
+            content_type='text/csv; charset=utf-8',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        )
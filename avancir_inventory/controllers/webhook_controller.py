@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import hashlib
+import hmac
+import json
+import logging
+
+from odoo import SUPERUSER_ID, api, http
+from odoo.http import request, Response
+from odoo.modules.registry import Registry
+
+from ..tools.event_buffer import EventBuffer
+from ..tools.mirror import normalize_activity
+
+_logger = logging.getLogger(__name__)
+
+
+def _flush_events(dbname, rows):
+    """Bulk-insert one batch of buffered webhook events, in its own cursor."""
+    with Registry(dbname).cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env['avancir.item.activity']._insert_rows(rows, source='webhook')
+
+
+# One buffer per worker process, keyed by database name
+event_buffer = EventBuffer(_flush_events)
+atexit.register(event_buffer.flush_all)
+
+
+class AvancirWebhookController(http.Controller):
+    """Receiver for Avancir scan, status and location events."""
+
+    def _json_response(self, data, status=200):
+        return Response(json.dumps(data), status=status, content_type='application/json')
+
+    @staticmethod
+    def _event_rows(payload):
+        """
+        Normalize a webhook payload into activity rows.
+
+        Accepts ``{'events': [...]}``, a bare list or a single event. Events
+        without an id get a fingerprint of their content, so redelivered
+        events are still recognised as duplicates.
+        """
+        if isinstance(payload, dict):
+            payload = payload.get('events', [payload])
+        if not isinstance(payload, list):
+            return None
+        rows = []
+        for event in payload:
+            if not isinstance(event, dict):
+                return None
+            row = normalize_activity(event)
+            if row is None:
+                fingerprint = hashlib.sha1(json.dumps(event, sort_keys=True, default=str).encode()).hexdigest()
+                row = normalize_activity({**event, 'id': fingerprint})
+            if row is None:
+                return None
+            rows.append(row)
+        return rows
+
+    @http.route('/api/v1/rfid/webhook', type='http', auth='none', methods=['POST'], csrf=False)
+    def receive_events(self, **kwargs):
+        """
+        Accept a batch of Avancir events.
+
+        Headers:
+            - X-Avancir-Secret: shared secret (avancir_inventory.webhook_secret)
+
+        Events are buffered in memory and bulk-inserted into
+        avancir.item.activity every webhook_flush_size events or
+        webhook_flush_interval_ms milliseconds, whichever comes first.
+
+        Returns:
+            202 with the number of accepted events
+        """
+        if not request.db:
+            return self._json_response({'success': False, 'error': 'No database selected'}, 404)
+
+        Sync = request.env['avancir.sync'].sudo()
+        secret = Sync._get_config('webhook_secret')
+        received = request.httprequest.headers.get('X-Avancir-Secret', '')
+        if not secret:
+            return self._json_response({'success': False, 'error': 'Webhook is not enabled'}, 404)
+        if not hmac.compare_digest(received.encode(), secret.encode()):
+            return self._json_response({'success': False, 'error': 'Invalid secret'}, 403)
+
+        try:
+            payload = json.loads(request.httprequest.get_data() or b'null')
+        except ValueError:
+            return self._json_response({'success': False, 'error': 'Body must be JSON'}, 400)
+        rows = self._event_rows(payload)
+        if rows is None:
+            return self._json_response({'success': False, 'error': 'Events need an item id'}, 400)
+
+        event_buffer.max_events = int(Sync._get_config('webhook_flush_size', 500))
+        event_buffer.max_delay = int(Sync._get_config('webhook_flush_interval_ms', 1000)) / 1000
+        event_buffer.add(request.db, rows)
+
+        return self._json_response({'success': True, 'accepted': len(rows)}, 202)
+
+    @http.route('/api/v1/rfid/webhook/stats', type='http', auth='user', methods=['GET'], csrf=False)
+    def get_webhook_stats(self, **kwargs):
+        """
+        Webhook buffer counters for this worker process.
+
+        Returns:
+            received, flushed, flushes, dropped and pending event counts
+        """
+        return self._json_response({
+            'success': True,
+            'data': event_buffer.stats(),
+        })
@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 
 from . import res_config_settings
+from . import res_company
 from . import product_template
 from . import avancir_sync
+from . import avancir_reconciliation_line
+from . import avancir_transfer_line
+from . import avancir_sync_chunk
+from . import avancir_item
+from . import avancir_item_activity
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+from odoo import api, fields, models
+
+from ..tools.dispatch import chunked
+from ..tools.mirror import item_to_avancir, normalize_item
+
+_logger = logging.getLogger(__name__)
+
+
+class AvancirItem(models.Model):
+    _name = 'avancir.item'
+    _description = 'Avancir Item (local mirror)'
+    _order = 'location, sku, id'
+
+    avancir_id = fields.Char(string='Avancir Item ID', required=True, index=True, readonly=True)
+    name = fields.Char(string='Name', readonly=True)
+    sku = fields.Char(string='SKU', index=True, readonly=True)
+    location = fields.Char(string='Location', index=True, readonly=True)
+    status = fields.Char(string='Status', index=True, readonly=True)
+    rfid_tag = fields.Char(string='RFID Tag', index=True, readonly=True)
+    last_scanned_at = fields.Datetime(string='Last Scanned', index=True, readonly=True)
+    avancir_updated_at = fields.Datetime(string='Updated in Avancir', readonly=True)
+    product_id = fields.Many2one('product.template', string='Product', ondelete='set null', readonly=True)
+    workspace_key = fields.Char(string='Workspace', index=True, readonly=True)
+    activity_ids = fields.One2many('avancir.item.activity', 'item_id', string='Activity')
+
+    _avancir_id_unique = models.Constraint(
+        'UNIQUE(avancir_id)',
+        'This Avancir item is already mirrored.',
+    )
+    _location_status_idx = models.Index('(location, status)')
+
+    # Items upserted per statement during a refresh
+    _UPSERT_CHUNK = 500
+
+    _UPSERT_COLUMNS = [
+        ('avancir_id', 'varchar'),
+        ('name', 'varchar'),
+        ('sku', 'varchar'),
+        ('location', 'varchar'),
+        ('status', 'varchar'),
+        ('rfid_tag', 'varchar'),
+        ('last_scanned_at', 'timestamp'),
+        ('avancir_updated_at', 'timestamp'),
+    ]
+
+    @api.model
+    def _upsert_rows(self, rows, workspace_key=None):
+        """
+        Insert or update normalized items in one INSERT ... ON CONFLICT.
+
+        Args:
+            rows: dicts from tools.mirror.normalize_item
+            workspace_key: Avancir workspace the items were read from
+        """
+        # ON CONFLICT cannot touch the same row twice in one statement
+        rows = list({row['avancir_id']: row for row in rows}.values())
+        if not rows:
+            return
+        columns = [name for name, _type in self._UPSERT_COLUMNS]
+        unnest = ', '.join(f'%s::{sql_type}[]' for _name, sql_type in self._UPSERT_COLUMNS)
+        params = [[row[name] for row in rows] for name in columns]
+        params.append([row['odoo_product_id'] for row in rows])
+
+        self.env.cr.execute(f"""
+            INSERT INTO avancir_item ({', '.join(columns)}, product_id, workspace_key,
+                                      create_uid, create_date, write_uid, write_date)
+            SELECT {', '.join(f'v.{name}' for name in columns)}, pt.id, %s,
+                   %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+              FROM unnest({unnest}, %s::int[]) AS v({', '.join(columns)}, odoo_product_id)
+              LEFT JOIN product_template pt ON pt.id = v.odoo_product_id
+            ON CONFLICT (avancir_id) DO UPDATE SET
+                {', '.join(f'{name} = EXCLUDED.{name}' for name in columns[1:])},
+                product_id = COALESCE(EXCLUDED.product_id, avancir_item.product_id),
+                workspace_key = EXCLUDED.workspace_key,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, [workspace_key, self.env.uid, self.env.uid, *params])
+        self.invalidate_model()
+
+    @api.model
+    def cron_refresh_mirror(self):
+        """
+        Cron job: incrementally refresh the local mirror from Avancir.
+
+        The global workspace and the workspace of every company syncing
+        to Avancir on its own are refreshed in turn (see _refresh_workspace).
+        """
+        Sync = self.env['avancir.sync']
+        if not Sync._get_config('mirror_enabled', False):
+            return
+
+        workspaces = {Sync._get_config('workspace_key', 'default'): self.env['res.company']}
+        for company in self.env['res.company'].search([
+            ('avancir_sync_enabled', '=', True), ('avancir_workspace_key', '!=', False),
+        ]):
+            workspaces.setdefault(company.avancir_workspace_key, company)
+
+        totals = {'items': 0, 'activity': 0}
+        for workspace_key, company in workspaces.items():
+            result = self._refresh_workspace(company, workspace_key)
+            totals['items'] += result['items']
+            totals['activity'] += result['activity']
+        return totals
+
+    @api.model
+    def _refresh_workspace(self, company, workspace_key):
+        """
+        Refresh the mirror from one workspace.
+
+        Items changed since the workspace's checkpoint are streamed page by
+        page and upserted in chunks; the activity history of each chunk is
+        fetched right away through the chunked history fetcher. The
+        checkpoint is the newest Avancir updated_at seen, or the start of
+        the run when the items carry none, stored in
+        avancir_inventory.mirror_items_since, suffixed with the workspace
+        key for company workspaces. It stays put when a history batch
+        failed, so the next run fetches those items again. A full refresh
+        (no checkpoint yet) also removes the workspace's mirrored items
+        Avancir no longer returns.
+
+        Args:
+            company: res.company of the workspace, empty for the global one
+            workspace_key: Avancir workspace key the mirrored items are tagged with
+        """
+        Sync = self.env['avancir.sync']
+        ICP = self.env['ir.config_parameter'].sudo()
+        checkpoint_key = 'mirror_items_since' + (f'.{company.avancir_workspace_key}' if company else '')
+        since = Sync._get_config(checkpoint_key)
+        params = {'updatedSince': since} if since else {}
+        Activity = self.env['avancir.item.activity']
+        started = fields.Datetime.now()
+        newest = None
+        seen = set()
+        item_count = 0
+        activity_count = 0
+        failed = []
+        workspace = company.name if company else 'global workspace'
+
+        _logger.info(f'Refreshing Avancir mirror for {workspace} (since {since or "the beginning"})')
+
+        for chunk in chunked(Sync._iter_avancir_items(params, company=company), self._UPSERT_CHUNK):
+            rows = [row for row in map(normalize_item, chunk) if row]
+            self._upsert_rows(rows, workspace_key)
+            item_count += len(rows)
+            if not since:
+                seen.update(row['avancir_id'] for row in rows)
+
+            history = Sync._fetch_history_chunked([row['avancir_id'] for row in rows], company, failed)
+            activity_count += Activity._insert_records(history)
+
+            for row in rows:
+                if row['avancir_updated_at'] and (newest is None or row['avancir_updated_at'] > newest):
+                    newest = row['avancir_updated_at']
+
+        if failed:
+            _logger.warning(f'History of {len(failed)} items could not be fetched from the {workspace}, '
+                            f'the mirror checkpoint stays at {since or "the beginning"}')
+        else:
+            ICP.set_param(f'avancir_inventory.{checkpoint_key}', (newest or started).isoformat() + 'Z')
+
+        if not since:
+            gone = self.search([('workspace_key', '=', workspace_key), ('avancir_id', 'not in', list(seen))])
+            if gone:
+                _logger.info(f'Removing {len(gone)} items no longer in the {workspace} from the mirror')
+                gone.unlink()
+
+        _logger.info(f'Avancir mirror refreshed for {workspace}: {item_count} items, '
+                     f'{activity_count} new activity records')
+        return {'items': item_count, 'activity': activity_count}
+
+    @api.model
+    def _iter_mirror(self, domain, chunk_size=1000):
+        """Yield mirrored items in Avancir's shape, reading in id-ordered chunks."""
+        fields_to_read = ['avancir_id', 'name', 'sku', 'location', 'status', 'rfid_tag', 'last_scanned_at']
+        last_id = 0
+        while True:
+            rows = self.search_read(domain + [('id', '>', last_id)], fields_to_read,
+                                    order='id', limit=chunk_size)
+            if not rows:
+                return
+            last_id = rows[-1]['id']
+            for row in rows:
+                yield item_to_avancir(row)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+from ..tools.mirror import activity_to_avancir, normalize_activity
+
+
+class AvancirItemActivity(models.Model):
+    _name = 'avancir.item.activity'
+    _description = 'Avancir Item Activity (local mirror)'
+    _order = 'occurred_at desc, id desc'
+
+    avancir_id = fields.Char(string='Avancir Event ID', required=True, index=True, readonly=True)
+    avancir_item_id = fields.Char(string='Avancir Item ID', required=True, index=True, readonly=True)
+    item_id = fields.Many2one('avancir.item', string='Item', ondelete='set null', index=True, readonly=True)
+    event_type = fields.Char(string='Event', index=True, readonly=True)
+    location = fields.Char(string='Location', index=True, readonly=True)
+    status = fields.Char(string='Status', readonly=True)
+    rfid_tag = fields.Char(string='RFID Tag', readonly=True)
+    occurred_at = fields.Datetime(string='Occurred At', index=True, readonly=True)
+    payload = fields.Text(string='Raw Payload', readonly=True)
+    source = fields.Selection([
+        ('poll', 'Polled'),
+        ('webhook', 'Webhook'),
+    ], string='Received Via', default='poll', required=True, readonly=True)
+
+    _avancir_id_unique = models.Constraint(
+        'UNIQUE(avancir_id)',
+        'This Avancir event is already recorded.',
+    )
+
+    _INSERT_COLUMNS = [
+        ('avancir_id', 'varchar'),
+        ('avancir_item_id', 'varchar'),
+        ('event_type', 'varchar'),
+        ('location', 'varchar'),
+        ('status', 'varchar'),
+        ('rfid_tag', 'varchar'),
+        ('occurred_at', 'timestamp'),
+        ('payload', 'text'),
+    ]
+
+    @api.model
+    def _insert_rows(self, rows, source='poll'):
+        """
+        Append normalized activity rows in one INSERT, skipping known events.
+
+        Args:
+            rows: dicts from tools.mirror.normalize_activity
+            source: How the events reached Odoo, 'poll' or 'webhook'
+
+        Returns:
+            Number of rows actually inserted
+        """
+        rows = list({row['avancir_id']: row for row in rows}.values())
+        if not rows:
+            return 0
+        columns = [name for name, _type in self._INSERT_COLUMNS]
+        unnest = ', '.join(f'%s::{sql_type}[]' for _name, sql_type in self._INSERT_COLUMNS)
+        params = [[row[name] for row in rows] for name in columns]
+
+        self.env.cr.execute(f"""
+            INSERT INTO avancir_item_activity ({', '.join(columns)}, item_id, source,
+                                               create_uid, create_date, write_uid, write_date)
+            SELECT {', '.join(f'v.{name}' for name in columns)}, ai.id, %s,
+                   %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+              FROM unnest({unnest}) AS v({', '.join(columns)})
+              LEFT JOIN avancir_item ai ON ai.avancir_id = v.avancir_item_id
+            ON CONFLICT (avancir_id) DO NOTHING
+        """, [source, self.env.uid, self.env.uid, *params])
+        self.invalidate_model()
+        return self.env.cr.rowcount
+
+    @api.model
+    def _insert_records(self, records):
+        """Normalize raw Avancir history records and append them."""
+        return self._insert_rows([row for row in map(normalize_activity, records or []) if row])
+
+    @api.model
+    def _history_for_items(self, avancir_item_ids):
+        """Mirrored history of the given Avancir items, in Avancir's shape."""
+        if not avancir_item_ids:
+            return []
+        rows = self.search_read(
+            [('avancir_item_id', 'in', list(avancir_item_ids))],
+            ['avancir_id', 'avancir_item_id', 'event_type', 'occurred_at', 'payload'],
+        )
+        return [activity_to_avancir(row) for row in rows]
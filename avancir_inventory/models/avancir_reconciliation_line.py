@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+
+class AvancirReconciliationLine(models.Model):
+    _name = 'avancir.reconciliation.line'
+    _description = 'Avancir Reconciliation Line'
+    _order = 'sync_id desc, kind, sku'
+
+    sync_id = fields.Many2one(
+        'avancir.sync',
+        string='Reconciliation',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    kind = fields.Selection([
+        ('discrepancy', 'Discrepancy'),
+        ('missing_in_avancir', 'Missing in Avancir'),
+        ('missing_in_odoo', 'Missing in Odoo'),
+    ], string='Kind', required=True, index=True)
+    sku = fields.Char(string='SKU', index=True)
+    name = fields.Char(string='Product Name')
+    product_id = fields.Many2one('product.template', string='Product', ondelete='set null')
+    avancir_id = fields.Char(string='Avancir Item ID')
+    odoo_qty = fields.Float(string='Odoo On Hand')
+    avancir_qty = fields.Integer(string='Avancir Items')
+    pos_sold = fields.Float(string='POS Sold')
+    avancir_status = fields.Char(string='Avancir Status')
+    last_scan = fields.Char(string='Last Scan')
+    company_id = fields.Many2one(related='sync_id.company_id', store=True, string='Company')
+
+    _sync_kind_idx = models.Index('(sync_id, kind)')
+
+    # Rows per INSERT when storing a reconciliation
+    _CREATE_CHUNK = 1000
+
+    @api.model
+    def _store_outcome(self, sync_record, outcome):
+        """
+        Bulk-insert the discrepancy and missing sets of a reconciliation.
+
+        Args:
+            sync_record: avancir.sync record the lines belong to
+            outcome: dict returned by tools.reconcile.reconcile_by_sku
+        """
+        def vals_list():
+            for kind in ('discrepancy', 'missing_in_avancir', 'missing_in_odoo'):
+                key = 'discrepancies' if kind == 'discrepancy' else kind
+                for row in outcome[key]:
+                    yield {
+                        'sync_id': sync_record.id,
+                        'kind': kind,
+                        'sku': row.get('sku'),
+                        'name': row.get('name'),
+                        'product_id': row.get('product_id'),
+                        'avancir_id': row.get('avancir_id') and str(row['avancir_id']),
+                        'odoo_qty': row.get('odoo_qty', 0.0),
+                        'avancir_qty': row.get('avancir_qty', 0),
+                        'pos_sold': row.get('pos_sold', 0.0),
+                        'avancir_status': row.get('avancir_status'),
+                        'last_scan': row.get('last_scan'),
+                    }
+
+        chunk = []
+        for vals in vals_list():
+            chunk.append(vals)
+            if len(chunk) >= self._CREATE_CHUNK:
+                self.create(chunk)
+                chunk = []
+        if chunk:
+            self.create(chunk)
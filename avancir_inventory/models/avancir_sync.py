@@ -1,26 +1,42 @@
 # -*- coding: utf-8 -*-
 
+import gzip
+import hashlib
 import json
 import logging
-import requests
+import os
+import time
+from contextlib import closing
 from datetime import datetime, timedelta
+from itertools import chain, islice
+
+import pytz
+from markupsafe import Markup
+from psycopg2.errors import LockNotAvailable
 
 from odoo import api, fields, models
 from odoo.exceptions import UserError
+from odoo.http import request
+from odoo.tools import config
 
-_logger = logging.getLogger(__name__)
+from ..tools.batching import AdaptiveBatcher
+from ..tools.client import AvancirClient
+from ..tools.dispatch import chunked, dispatch_ordered
+from ..tools.encoding import dumps
+from ..tools.reconcile import reconcile_by_sku
 
-# Module-level token cache (avoid Odoo ORM attribute restrictions)
-_avancir_token_cache = {
-    'token': None,
-    'expiry': None,
-}
+_logger = logging.getLogger(__name__)
 
 
 class AvancirSync(models.Model):
     _name = 'avancir.sync'
     _description = 'Avancir Sync Operations'
 
+    _BULK_ENDPOINTS = {
+        'create': '/items/bulkCreate',
+        'update': '/items/bulkUpdate',
+    }
+
     name = fields.Char(string='Sync Name', required=True)
     sync_type = fields.Selection([
         ('products', 'Products'),
@@ -28,228 +44,986 @@ class AvancirSync(models.Model):
         ('full', 'Full Sync'),
         ('transfer', 'Store Transfer'),
         ('reconciliation', 'POS Reconciliation'),
-    ], string='Sync Type', default='products')
+    ], string='Sync Type', default='products', index=True)
     state = fields.Selection([
         ('draft', 'Draft'),
         ('running', 'Running'),
         ('done', 'Done'),
         ('error', 'Error'),
-    ], string='State', default='draft')
-    start_time = fields.Datetime(string='Start Time')
+    ], string='State', default='draft', index=True)
+    start_time = fields.Datetime(string='Start Time', index=True)
     end_time = fields.Datetime(string='End Time')
     products_created = fields.Integer(string='Products Created', default=0)
     products_updated = fields.Integer(string='Products Updated', default=0)
+    products_skipped = fields.Integer(string='Products Skipped', default=0)
+    products_filtered = fields.Integer(
+        string='Products Filtered', default=0,
+        help='Products left out of the chunks of a delta sync as unchanged since the last one')
     errors = fields.Integer(string='Errors', default=0)
     error_log = fields.Text(string='Error Log')
-    company_id = fields.Many2one('res.company', string='Company')
+    error_log_attachment_id = fields.Many2one(
+        'ir.attachment', string='Full Error Log', ondelete='set null', copy=False,
+        help='Compressed copy of an error log too large to keep inline')
+    company_id = fields.Many2one('res.company', string='Company', index=True)
+    parent_id = fields.Many2one('avancir.sync', string='Parent Sync', ondelete='cascade', index=True)
+    child_ids = fields.One2many('avancir.sync', 'parent_id', string='Company Syncs')
+    warehouse_id = fields.Many2one('stock.warehouse', string='Warehouse')
+    matched_count = fields.Integer(string='Matched', default=0)
+    discrepancy_count = fields.Integer(string='Discrepancies', default=0)
+    missing_in_avancir_count = fields.Integer(string='Missing in Avancir', default=0)
+    missing_in_odoo_count = fields.Integer(string='Missing in Odoo', default=0)
+    reconciliation_line_ids = fields.One2many(
+        'avancir.reconciliation.line', 'sync_id', string='Reconciliation Lines')
+    reconciliation_line_count = fields.Integer(compute='_compute_reconciliation_line_count')
+    transfer_line_ids = fields.One2many(
+        'avancir.transfer.line', 'sync_id', string='Location Updates')
+    chunk_ids = fields.One2many('avancir.sync.chunk', 'sync_id', string='Chunks')
+    chunk_count = fields.Integer(string='Chunks', default=0)
+    checkpoint = fields.Integer(
+        string='Checkpoint', default=0,
+        help='Last chunk up to which every chunk of this product sync is finished')
+    force_push = fields.Boolean(string='Force', help='Send items even when their payload is unchanged')
+    bytes_sent = fields.Integer(string='Bytes Sent', default=0, help='Request bodies sent to Avancir, as on the wire')
+    bytes_saved = fields.Integer(string='Bytes Saved', default=0, help='Request body bytes saved by gzip compression')
+    client_metrics_summary = fields.Json(
+        string='Avancir API Metrics Data', copy=False, readonly=True,
+        help='Summary of the Avancir calls of the last execution of this sync; a resume replaces it')
+    client_metrics_html = fields.Html(
+        string='Avancir API Metrics', compute='_compute_client_metrics_html', sanitize=False,
+        help='Avancir client latency and errors per endpoint, for the last execution of this sync')
+
+    # Retention scans: newest runs of a type first
+    _type_start_idx = models.Index('(sync_type, start_time DESC)')
+
+    # Records removed per statement (and per commit) by the retention vacuum
+    _RETENTION_BATCH = 1000
+
+    @api.depends('discrepancy_count', 'missing_in_avancir_count', 'missing_in_odoo_count')
+    def _compute_reconciliation_line_count(self):
+        for record in self:
+            record.reconciliation_line_count = (
+                record.discrepancy_count + record.missing_in_avancir_count + record.missing_in_odoo_count
+            )
+
+    @api.depends('client_metrics_summary')
+    def _compute_client_metrics_html(self):
+        for record in self:
+            record.client_metrics_html = record._render_client_metrics(record.client_metrics_summary)
+
+    @api.model
+    def _render_client_metrics(self, summary):
+        """Render a ClientMetrics summary as an HTML table; False without one."""
+        if not summary:
+            return False
+        rows = Markup('').join(
+            Markup('<tr><td>%s</td><td>%s</td><td class="text-end">%s</td><td class="text-end">%s</td>'
+                   '<td class="text-end">%s</td><td class="text-end">%s</td><td class="text-end">%s</td>'
+                   '<td class="text-end">%s</td><td class="text-end">%s</td><td class="text-end">%s</td></tr>') % (
+                entry['method'], entry['endpoint'], entry['requests'], entry['errors'], entry['retries'],
+                f'{entry["mean"] * 1000:.0f}',
+                f'≤ {entry["p50"] * 1000:.0f}' if entry['p50'] is not None else '> 60000',
+                f'≤ {entry["p95"] * 1000:.0f}' if entry['p95'] is not None else '> 60000',
+                entry['bytes_sent'], entry['bytes_received'],
+            )
+            for entry in summary['endpoints']
+        )
+        return Markup(
+            '<table class="table table-sm"><thead><tr><th>Method</th><th>Endpoint</th>'
+            '<th class="text-end">Requests</th><th class="text-end">Errors</th><th class="text-end">Retries</th>'
+            '<th class="text-end">Mean ms</th><th class="text-end">p50 ms</th><th class="text-end">p95 ms</th>'
+            '<th class="text-end">Bytes Sent</th><th class="text-end">Bytes Received</th></tr></thead>'
+            '<tbody>%s</tbody></table><p>Token refreshes: %s ok, %s failed. '
+            'Refused without calling Avancir: %s by the circuit breaker, %s by the rate limit.</p>') % (
+            rows,
+            summary['token_refreshes'].get('ok', 0), summary['token_refreshes'].get('error', 0),
+            summary['rejected'].get('breaker', 0), summary['rejected'].get('rate_limit', 0),
+        )
+
+    def action_view_reconciliation_lines(self):
+        """Open the stored lines of this reconciliation."""
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id(
+            'avancir_inventory.avancir_reconciliation_line_action')
+        action['domain'] = [('sync_id', '=', self.id)]
+        action['context'] = {'search_default_group_kind': 1}
+        return action
+
+    def action_export_reconciliation_csv(self):
+        """Download every line of this reconciliation as CSV."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/avancir/reconciliation/{self.id}/csv',
+            'target': 'self',
+        }
 
     def _get_config(self, key, default=None):
         """Get configuration parameter."""
         param = self.env['ir.config_parameter'].sudo()
         return param.get_param(f'avancir_inventory.{key}', default)
 
+    def _get_client(self, company=None):
+        """
+        Build an Avancir client from the current configuration.
+
+        Requests made while serving a web request wait at most
+        rate_max_wait for a rate limit slot, so users are not held up;
+        crons, syncs and other background jobs wait up to
+        rate_max_wait_background, long enough to honor a Retry-After
+        sent by Avancir.
+
+        Args:
+            company: Optional res.company whose Avancir workspace key, if
+                set and the company syncs to Avancir on its own, replaces
+                the global one
+        """
+        company_key = company and company.avancir_sync_enabled and company.avancir_workspace_key
+        workspace_key = company_key or self._get_config('workspace_key', 'default')
+        if request:
+            rate_max_wait = float(self._get_config('rate_max_wait', 5))
+        else:
+            rate_max_wait = float(self._get_config('rate_max_wait_background', 120))
+        return AvancirClient(
+            api_url=self._get_config('api_url', 'https://avancir.app/api/v1'),
+            username=self._get_config('username'),
+            password=self._get_config('password'),
+            workspace_key=workspace_key,
+            pool_size=int(self._get_config('http_pool_size', 10)),
+            max_retries=int(self._get_config('http_max_retries', 3)),
+            backoff_factor=float(self._get_config('http_backoff_factor', 0.5)),
+            dbname=self.env.cr.dbname,
+            token_dir=os.path.join(config['data_dir'], 'avancir_tokens'),
+            rate_limit=float(self._get_config('rate_limit', 0)),
+            rate_burst=int(self._get_config('rate_burst', 10)),
+            rate_max_wait=rate_max_wait,
+            breaker_threshold=int(self._get_config('breaker_threshold', 5)),
+            breaker_reset=float(self._get_config('breaker_reset', 30)),
+            gzip_enabled=bool(self._get_config('http_gzip', False)),
+            gzip_min_bytes=int(self._get_config('http_gzip_min_bytes', 8192)),
+        )
+
     def _get_auth_token(self):
         """Get or refresh Avancir session token."""
-        global _avancir_token_cache
+        return self._get_client().get_token()
 
-        # Check if we have a valid cached token
-        cached_token = _avancir_token_cache.get('token')
-        cached_expiry = _avancir_token_cache.get('expiry')
-        if cached_token and cached_expiry and datetime.now() < cached_expiry:
-            return cached_token
+    def _make_request(self, method, endpoint, data=None, params=None, company=None):
+        """Make authenticated request to Avancir API, on ``company``'s workspace if given."""
+        return self._get_client(company).request(method, endpoint, data=data, params=params)
 
-        api_url = self._get_config('api_url', 'https://avancir.app/api/v1')
-        username = self._get_config('username')
-        password = self._get_config('password')
+    def _iter_avancir_items(self, params=None, endpoint='/items', page_size=None, prefetch=True, company=None):
+        """
+        Stream items from an Avancir list endpoint across all pages.
 
-        if not username or not password:
-            raise UserError('Avancir credentials not configured. Go to Settings > Inventory > Avancir.')
+        Args:
+            params: Query filters (location, status, ...)
+            endpoint: List endpoint to read
+            page_size: Items per page, defaults to the page_size setting
+            prefetch: Fetch the next page while the current one is consumed
+            company: Optional res.company whose workspace is read
+        """
+        if page_size is None:
+            page_size = int(self._get_config('page_size', 200))
+        return self._get_client(company).iter_items(endpoint, params, page_size=page_size, prefetch=prefetch)
 
-        try:
-            response = requests.post(
-                f'{api_url}/auth/login',
-                json={'identifier': username, 'password': password},
-                headers={'Content-Type': 'application/json'},
-                timeout=30,
-            )
-            response.raise_for_status()
-            data = response.json()
-
-            # Avancir returns idToken in data.idToken
-            token = data.get('data', {}).get('idToken') or data.get('idToken')
-            # Token valid for 1 hour, refresh at 50 minutes
-            _avancir_token_cache['token'] = token
-            _avancir_token_cache['expiry'] = datetime.now() + timedelta(minutes=50)
-
-            return token
-        except requests.exceptions.RequestException as e:
-            _logger.error(f'Avancir auth failed: {e}')
-            raise UserError(f'Failed to authenticate with Avancir: {e}')
-
-    def _make_request(self, method, endpoint, data=None, params=None):
-        """Make authenticated request to Avancir API."""
-        api_url = self._get_config('api_url', 'https://avancir.app/api/v1')
-        workspace_key = self._get_config('workspace_key', 'default')
-        token = self._get_auth_token()
-
-        headers = {
-            'Content-Type': 'application/json',
-            'x-session-token': token,
-        }
+    def _avancir_location_name(self, warehouse):
+        """Avancir location of a warehouse: its company's override, else the warehouse name."""
+        return warehouse.company_id.avancir_location_name or warehouse.name
 
-        # Add workspace key to params
-        if params is None:
-            params = {}
-        params['workspaceKey'] = workspace_key
+    def _company_for_location(self, location_name):
+        """
+        Company whose Avancir workspace holds ``location_name``: the one
+        with that location override, else the owner of a warehouse of that
+        name. Empty when none matches, i.e. the global workspace.
+        """
+        company = self.env['res.company'].sudo().search([('avancir_location_name', '=', location_name)], limit=1)
+        if not company:
+            company = self.env['stock.warehouse'].sudo().search([('name', '=', location_name)], limit=1).company_id
+        return company
 
-        url = f'{api_url}{endpoint}'
+    def _group_items_by_company(self, item_ids):
+        """
+        Split Avancir item ids by the company whose workspace they were
+        created in, found through the products linked to them.
 
-        try:
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, params=params, timeout=60)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data, params=params, timeout=60)
-            elif method.upper() == 'PATCH':
-                response = requests.patch(url, headers=headers, json=data, params=params, timeout=60)
-            else:
-                raise ValueError(f'Unsupported HTTP method: {method}')
+        Returns:
+            dict {res.company (empty for the global workspace): [item ids]}
+        """
+        products = self.env['product.template'].sudo().with_context(active_test=False).search_read(
+            [('avancir_item_id', 'in', list(item_ids))], ['avancir_item_id', 'company_id'])
+        company_by_item = {
+            product['avancir_item_id']: product['company_id'] and product['company_id'][0]
+            for product in products
+        }
+        groups = {}
+        for item_id in item_ids:
+            groups.setdefault(company_by_item.get(item_id) or False, []).append(item_id)
+        Company = self.env['res.company']
+        return {Company.browse(company_id): ids for company_id, ids in groups.items()}
+
+    # Optional product fields copied onto the Avancir item as-is
+    _AVANCIR_ITEM_FIELDS = [
+        ('default_code', 'sku'),
+        ('list_price', 'price'),
+        ('x_brand', 'brand'),
+        ('x_strain_type', 'strain_type'),
+        ('x_strain', 'strain'),
+        ('x_thc', 'thc'),
+        ('x_cbd', 'cbd'),
+        ('x_image_url', 'image_url'),
+    ]
+
+    def _iter_items(self, params=None, source='remote', company=None, **kwargs):
+        """
+        Stream items from Avancir or, with source='local', from the mirror.
 
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            _logger.error(f'Avancir API request failed: {e}')
-            raise
+        The local mirror (avancir.item) supports the location and status
+        filters and returns items in the same shape as the API. It holds
+        every workspace's items, so ``company`` only selects the workspace
+        of remote reads.
+        """
+        if source != 'local':
+            return self._iter_avancir_items(params, company=company, **kwargs)
+        params = params or {}
+        domain = [(field, '=', params[field]) for field in ('location', 'status') if params.get(field)]
+        return self.env['avancir.item']._iter_mirror(domain)
 
     def _map_product_to_avancir_item(self, product):
         """Map Odoo product to Avancir item format."""
+        return self._map_products_to_avancir_items(product)[0]
+
+    def _map_products_to_avancir_items(self, products):
+        """
+        Map a recordset of products to Avancir items in one pass.
+
+        Config values and the company -> location lookup are resolved once,
+        and every mapped field is fetched in bulk before the loop.
+
+        Returns:
+            List of item dicts, in the order of ``products``
+        """
         item_type = self._get_config('item_type', 'product')
         default_status = self._get_config('default_status', 'Active')
 
-        # Get location from warehouse if available
-        location_name = None
-        if product.company_id:
-            warehouse = self.env['stock.warehouse'].search([
-                ('company_id', '=', product.company_id.id)
-            ], limit=1)
-            if warehouse:
-                location_name = warehouse.name
+        field_map = [(f, key) for f, key in self._AVANCIR_ITEM_FIELDS if f in products._fields]
+        products.fetch(['name', 'company_id', 'categ_id'] + [f for f, _key in field_map])
+        products.categ_id.fetch(['name'])
+
+        # Location: the company's Avancir location, else its first warehouse
+        location_by_company = {}
+        company_ids = products.company_id.ids
+        if company_ids:
+            warehouses = self.env['stock.warehouse'].search_read(
+                [('company_id', 'in', company_ids)], ['company_id', 'name'])
+            for warehouse in warehouses:
+                location_by_company.setdefault(warehouse['company_id'][0], warehouse['name'])
+            for company in products.company_id:
+                if company.avancir_location_name:
+                    location_by_company[company.id] = company.avancir_location_name
+
+        items = []
+        for product in products:
+            item = {
+                'name': product.name,
+                'type': {'property_name': item_type},
+                'status': {'display_name': default_status},
+            }
 
-        item = {
-            'name': product.name,
-            'type': {'property_name': item_type},
-            'status': {'display_name': default_status},
-        }
+            location_name = location_by_company.get(product.company_id.id)
+            if location_name:
+                item['location'] = {'display_name': location_name}
+
+            # Map custom fields
+            for field_name, key in field_map:
+                value = product[field_name]
+                if value:
+                    item[key] = value
+            if product.categ_id:
+                item['category'] = product.categ_id.name
+
+            # Store Odoo product ID for reference
+            item['odoo_product_id'] = str(product.id)
+            items.append(item)
+
+        return items
+
+    def _map_batch_isolating_errors(self, products, error_messages):
+        """
+        Map a batch with the bulk mapper, retrying product by product when
+        it fails so one bad record does not sink the whole batch.
+
+        Returns:
+            List of (product, item) pairs; item is None for products that failed
+        """
+        try:
+            return list(zip(products, self._map_products_to_avancir_items(products)))
+        except Exception:
+            pairs = []
+            for product in products:
+                try:
+                    pairs.append((product, self._map_product_to_avancir_item(product)))
+                except Exception as e:
+                    pairs.append((product, None))
+                    error_messages.append(f'Product {product.id}: {e}')
+                    _logger.error(f'Error mapping product {product.id}: {e}')
+            return pairs
+
+    @staticmethod
+    def _avancir_payload_hash(item):
+        """Stable digest of a mapped Avancir payload."""
+        payload = json.dumps(item, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _iter_product_batches(self, products, batch_size, kind, error_messages, force=False):
+        """
+        Map and hash products into bulk batches in the Odoo thread.
+
+        Products whose payload digest matches avancir_payload_hash are left
+        out of the batch and only counted as unchanged, unless ``force``.
+        Their ids are returned too, so the run can mark them synced.
+
+        Yields:
+            dict with kind, products, items, hashes, mapping_errors,
+            unchanged and unchanged_ids
+        """
+        for i in range(0, len(products), batch_size):
+            batch = products[i:i + batch_size]
+            mapped_ids = []
+            items = []
+            hashes = {}
+            mapping_errors = 0
+            unchanged_ids = []
+
+            for product, item in self._map_batch_isolating_errors(batch, error_messages):
+                if item is None:
+                    mapping_errors += 1
+                    continue
+
+                digest = self._avancir_payload_hash(item)
+                if (not force and product.avancir_item_id
+                        and digest == product.avancir_payload_hash):
+                    unchanged_ids.append(product.id)
+                    continue
+                if kind == 'update':
+                    item['id'] = product.avancir_item_id
+                items.append(item)
+                mapped_ids.append(product.id)
+                hashes[product.id] = digest
+
+            yield {
+                'kind': kind,
+                'products': batch.browse(mapped_ids),
+                'items': items,
+                'hashes': hashes,
+                'mapping_errors': mapping_errors,
+                'unchanged': len(unchanged_ids),
+                'unchanged_ids': unchanged_ids,
+            }
+
+    @staticmethod
+    def _match_created_ids(products, created_items):
+        """
+        Pair bulkCreate results with the products that were sent.
+
+        Avancir echoes odoo_product_id back; fall back to response order.
+        """
+        item_ids = {}
+        by_odoo_id = {}
+        for item in created_items:
+            odoo_id = str(item.get('odoo_product_id') or '')
+            if odoo_id:
+                by_odoo_id[odoo_id] = item
+        for position, product in enumerate(products):
+            item = by_odoo_id.get(str(product.id))
+            if item is None and not by_odoo_id and position < len(created_items):
+                item = created_items[position]
+            item_id = item and (item.get('_id') or item.get('id'))
+            if item_id:
+                item_ids[product.id] = item_id
+        return item_ids
+
+    def sync_all_products(self, company_id=None, batch_size=None, concurrency=None,
+                          incremental=False, force=False, dry_run=False, exclude_company_ids=None,
+                          parent_id=None, batchers=None):
+        """
+        Sync products to Avancir using the bulk API.
+
+        Products without an avancir_item_id go through /items/bulkCreate and
+        get the returned ids stored; the others go through /items/bulkUpdate.
+        Items whose payload digest is unchanged since the last push are
+        skipped without a network call.
+        The run is planned as persisted chunks of batch_size products and
+        executed by _run_chunks, which commits after every chunk so an
+        interrupted run can be resumed. Within a chunk, the size of each
+        bulk call adapts to Avancir's responses (see _get_batchers).
 
-        if location_name:
-            item['location'] = {'display_name': location_name}
-
-        # Map custom fields
-        if product.default_code:
-            item['sku'] = product.default_code
-        if product.list_price:
-            item['price'] = product.list_price
-        if product.x_brand:
-            item['brand'] = product.x_brand
-        if product.x_strain_type:
-            item['strain_type'] = product.x_strain_type
-        if product.x_strain:
-            item['strain'] = product.x_strain
-        if product.x_thc:
-            item['thc'] = product.x_thc
-        if product.x_cbd:
-            item['cbd'] = product.x_cbd
-        if product.x_image_url:
-            item['image_url'] = product.x_image_url
-        if product.categ_id:
-            item['category'] = product.categ_id.name
-
-        # Store Odoo product ID for reference
-        item['odoo_product_id'] = str(product.id)
-
-        return item
-
-    def sync_all_products(self, company_id=None, batch_size=100):
-        """Sync all products to Avancir using bulk API."""
+        Args:
+            company_id: Optional res.company ID to restrict the sync to
+            batch_size: Products per chunk, defaults to the batch_max_size setting
+            concurrency: Parallel bulk calls, defaults to the sync_concurrency setting
+            incremental: Only send products never synced or changed since
+                their avancir_last_sync; the rest are counted as skipped
+            force: Send items even when their payload digest is unchanged
+            dry_run: Map and hash only; report what would be sent without
+                calling Avancir or writing anything
+            exclude_company_ids: Skip the products of these companies
+                (products without a company are kept)
+            parent_id: avancir.sync record of the orchestrated run this one belongs to
+            batchers: AdaptiveBatchers shared with the other runs of the
+                orchestration, which saves their sizes itself
+
+        Returns:
+            dict with created, updated, skipped and errors counts
+            (would_create/would_update instead for a dry run)
+        """
         sync_enabled = self._get_config('sync_enabled', False)
-        if not sync_enabled:
+        if not sync_enabled and not dry_run:
             _logger.info('Avancir sync is disabled')
-            return {'created': 0, 'updated': 0, 'errors': 0}
+            return {'created': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
 
-        # Create sync record
+        if batch_size is None:
+            batch_size = int(self._get_config('batch_max_size', 500))
+
+        domain = [('active', '=', True), ('sale_ok', '=', True)]
+        if company_id:
+            domain.append(('company_id', '=', company_id))
+        elif exclude_company_ids:
+            domain.append(('company_id', 'not in', exclude_company_ids))
+
+        sync_time = fields.Datetime.now()
+        Product = self.env['product.template']
+        if incremental:
+            total = Product.search_count(domain)
+            products = Product._avancir_search_changed(domain)
+        else:
+            products = Product.search(domain)
+            total = len(products)
+        to_create = products.filtered(lambda p: not p.avancir_item_id)
+        to_update = products - to_create
+
+        skipped = total - len(products)
+
+        if dry_run:
+            error_messages = []
+            errors = 0
+            would = {'create': 0, 'update': 0}
+            jobs = chain(
+                self._iter_product_batches(to_create, batch_size, 'create', error_messages, force),
+                self._iter_product_batches(to_update, batch_size, 'update', error_messages, force),
+            )
+            for job in jobs:
+                would[job['kind']] += len(job['items'])
+                skipped += job['unchanged']
+                errors += job['mapping_errors']
+            _logger.info(f'Avancir dry run: {would["create"]} to create, {would["update"]} to update, '
+                         f'{skipped} unchanged, {errors} mapping errors')
+            return {
+                'dry_run': True,
+                'would_create': would['create'],
+                'would_update': would['update'],
+                'skipped': skipped,
+                'errors': errors,
+            }
+
+        scope = self.env['res.company'].browse(company_id).name if company_id else 'Global' if exclude_company_ids else ''
         sync_record = self.create({
-            'name': f'Product Sync {datetime.now().strftime("%Y-%m-%d %H:%M")}',
+            'name': f'{"Delta" if incremental else "Product"} Sync {scope + " " if scope else ""}'
+                    f'{datetime.now().strftime("%Y-%m-%d %H:%M")}',
             'sync_type': 'products',
             'state': 'running',
-            'start_time': fields.Datetime.now(),
+            'start_time': sync_time,
             'company_id': company_id,
+            'parent_id': parent_id,
+            'products_skipped': skipped,
+            'products_filtered': skipped,
+            'force_push': force,
         })
+        sync_record._plan_chunks(to_create, to_update, batch_size)
+
+        _logger.info(f'Starting Avancir sync: {len(to_create)} to create, {len(to_update)} to update, '
+                     f'{skipped} unchanged, {sync_record.chunk_count} chunks')
+
+        return sync_record._run_chunks(concurrency, batchers)
+
+    def _plan_chunks(self, to_create, to_update, batch_size):
+        """Persist the run as numbered chunks of product ids and commit the plan."""
+        self.ensure_one()
+        commands = []
+        for kind, products in (('create', to_create), ('update', to_update)):
+            for i in range(0, len(products), batch_size):
+                batch = products[i:i + batch_size]
+                commands.append(fields.Command.create({
+                    'sequence': len(commands) + 1,
+                    'kind': kind,
+                    'product_ids': [fields.Command.set(batch.ids)],
+                    'product_count': len(batch),
+                }))
+        self.write({'chunk_ids': commands, 'chunk_count': len(commands), 'checkpoint': 0})
+        self._commit_checkpoint()
+
+    def _commit_checkpoint(self):
+        """Commit the finished work so an interruption cannot roll it back."""
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
+
+    def _chunk_job(self, chunk, error_messages):
+        """Map one chunk into a bulk batch (see _iter_product_batches)."""
+        products = chunk.product_ids.exists()
+        if chunk.kind == 'create':
+            # Products an interrupted attempt already got ids for are done
+            products = products.filtered(lambda p: not p.avancir_item_id)
+        job = next(self._iter_product_batches(
+            products, len(products) or 1, chunk.kind, error_messages, self.force_push), None)
+        job = job or {'kind': chunk.kind, 'products': products, 'items': [], 'hashes': {},
+                      'mapping_errors': 0, 'unchanged': 0, 'unchanged_ids': []}
+        job['chunk'] = chunk
+        return job
+
+    def _get_batchers(self):
+        """
+        Adaptive batch size controllers for the bulk endpoints.
 
-        domain = [('active', '=', True), ('sale_ok', '=', True)]
-        if company_id:
-            domain.append(('company_id', '=', company_id))
+        Each starts from the size the previous run settled on for its
+        endpoint, stored in avancir_inventory.batch_size.<endpoint>.
+        """
+        bounds = {
+            'min_size': int(self._get_config('batch_min_size', 10)),
+            'max_size': int(self._get_config('batch_max_size', 500)),
+            'target_latency': float(self._get_config('batch_target_latency', 5)),
+            'max_bytes': int(self._get_config('batch_max_bytes', 1048576)),
+        }
+        return {
+            kind: AdaptiveBatcher(int(self._get_config(self._batch_size_key(kind), 100)), **bounds)
+            for kind in self._BULK_ENDPOINTS
+        }
 
-        products = self.env['product.template'].search(domain)
-        total = len(products)
-        created = 0
-        updated = 0
-        errors = 0
-        error_messages = []
+    def _batch_size_key(self, kind):
+        """Config key of the learned batch size, e.g. batch_size.items.bulkCreate."""
+        return 'batch_size' + self._BULK_ENDPOINTS[kind].replace('/', '.')
 
-        _logger.info(f'Starting Avancir sync for {total} products')
+    def _save_batch_sizes(self, batchers):
+        """Remember the settled batch size of each endpoint for the next run."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        for kind, batcher in batchers.items():
+            key = f'avancir_inventory.{self._batch_size_key(kind)}'
+            if ICP.get_param(key) != str(batcher.size):
+                ICP.set_param(key, batcher.size)
 
-        # Process in batches
-        for i in range(0, total, batch_size):
-            batch = products[i:i + batch_size]
-            items = []
+    def _run_chunks(self, concurrency=None, batchers=None):
+        """
+        Send the unfinished chunks of a product sync, committing after each.
+
+        Chunks are mapped in the Odoo thread, sent through a bounded thread
+        pool and folded back in order. A chunk goes out as one or more bulk
+        calls sized by the endpoint's AdaptiveBatcher; if a call fails, the
+        items sent before it are still recorded. Each finished chunk is committed
+        together with the ids and digests it stored and the checkpoint, so
+        a run cut short by a time limit or a crash resumes after its last
+        finished chunk and never re-sends one. Failed chunks are retried
+        by the next resume.
+
+        The batchers live in memory for the run. Their sizes are saved once
+        at the end, and only when the run created them: runs sharing the
+        batchers of a parent sync leave that to the parent, so parallel
+        cursors never write the same config parameter.
 
-            for product in batch:
-                try:
-                    item = self._map_product_to_avancir_item(product)
-                    items.append(item)
-                except Exception as e:
-                    errors += 1
-                    error_messages.append(f'Product {product.id}: {e}')
-                    _logger.error(f'Error mapping product {product.id}: {e}')
+        Args:
+            concurrency: Parallel bulk calls, defaults to the sync_concurrency setting
+            batchers: Shared AdaptiveBatchers, defaults to new ones from _get_batchers
 
-            if items:
+        Returns:
+            dict with created, updated, skipped and errors counts for the run
+        """
+        self.ensure_one()
+        if concurrency is None:
+            concurrency = int(self._get_config('sync_concurrency', 4))
+
+        chunks = self.chunk_ids.filtered(lambda c: c.state != 'done').sorted('sequence')
+        sync_time = self.start_time
+        client = self._get_client(self.company_id)
+        error_messages = []
+        if self.error_log:
+            error_messages.append(self.error_log)
+
+        own_batchers = batchers is None
+        if own_batchers:
+            batchers = self._get_batchers()
+        endpoints = self._BULK_ENDPOINTS
+        # A resumed run adds to the bytes counted before it stopped
+        bytes_sent, bytes_saved = self.bytes_sent, self.bytes_saved
+
+        def send_batch(job):
+            # Runs in a pool thread: network only, no ORM access
+            batcher = batchers[job['kind']]
+            endpoint = endpoints[job['kind']]
+            items = job['items']
+            data = []
+            sent = 0
+            while sent < len(items):
+                batch = items[sent:sent + batcher.size]
+                body = dumps({'items': batch})
+                nbytes = len(body)
+                started = time.monotonic()
                 try:
-                    # Use bulk create endpoint
-                    result = self._make_request('POST', '/items/bulkCreate', {'items': items})
-                    batch_created = len(result.get('data', []))
-                    created += batch_created
-                    _logger.info(f'Batch {i // batch_size + 1}: Created {batch_created} items')
+                    result = client.request('POST', endpoint, body)
                 except Exception as e:
-                    errors += len(items)
-                    error_messages.append(f'Batch {i // batch_size + 1}: {e}')
-                    _logger.error(f'Bulk create failed: {e}')
-
-            # Update sync record progress
-            sync_record.write({
-                'products_created': created,
-                'products_updated': updated,
-                'errors': errors,
+                    batcher.record(len(batch), time.monotonic() - started, nbytes, ok=False)
+                    return {'data': data, 'sent': sent, 'error': e}
+                batcher.record(len(batch), time.monotonic() - started, nbytes)
+                data.extend(result.get('data', []) if isinstance(result, dict) else result or [])
+                sent += len(batch)
+            return {'data': data, 'sent': sent, 'error': None}
+
+        jobs = (self._chunk_job(chunk, error_messages) for chunk in chunks)
+        for job, result, exc in dispatch_ordered(send_batch, jobs, concurrency):
+            chunk, kind, mapped, items = job['chunk'], job['kind'], job['products'], job['items']
+            if exc:
+                result = {'data': [], 'sent': 0, 'error': exc}
+            exc = result['error']
+            # Avancir already holds what unchanged products would send: record
+            # them as synced so the next delta run does not pick them up again
+            mapped.browse(job['unchanged_ids'])._avancir_mark_synced(sync_time)
+            # Items go out in product order: the first `sent` products made it
+            sent = mapped[:result['sent']]
+            created = updated = 0
+            errors = job['mapping_errors']
+            if kind == 'create' and sent:
+                item_ids = self._match_created_ids(sent, result['data'])
+                sent.browse(list(item_ids))._avancir_mark_synced(sync_time, item_ids, job['hashes'])
+                created = len(item_ids)
+                _logger.info(f'Chunk {chunk.sequence}/{self.chunk_count}: Created {created} items')
+            elif sent:
+                sent._avancir_mark_synced(sync_time, payload_hashes=job['hashes'])
+                updated = len(sent)
+                _logger.info(f'Chunk {chunk.sequence}/{self.chunk_count}: Updated {updated} items')
+            if exc:
+                errors += len(items) - len(sent)
+                error_messages.append(f'Chunk {chunk.sequence} ({kind}): {exc}')
+                _logger.error(f'Bulk {kind} failed for chunk {chunk.sequence}: {exc}')
+                (mapped - sent).write({'avancir_sync_error': str(exc)})
+
+            chunk.write({
+                'state': 'failed' if exc else 'done',
+                'attempts': chunk.attempts + 1,
+                'error_count': errors,
+                'error': str(exc) if exc else False,
+                # A retry finds the products sent before the failure unchanged:
+                # only the first attempt tells which ones were skipped
+                'skipped_count': chunk.skipped_count if chunk.attempts else job['unchanged'],
+            })
+            # The checkpoint is the last chunk before the first unfinished one
+            unfinished = self.chunk_ids.filtered(lambda c: c.state != 'done')
+            self.write({
+                'checkpoint': min(unfinished.mapped('sequence')) - 1 if unfinished else self.chunk_count,
+                'products_created': self.products_created + created,
+                'products_updated': self.products_updated + updated,
+                'products_skipped': self.products_filtered + sum(self.chunk_ids.mapped('skipped_count')),
+                'errors': sum(self.chunk_ids.mapped('error_count')),
+                'bytes_sent': bytes_sent + client.bytes_sent,
+                'bytes_saved': bytes_saved + client.bytes_saved,
             })
+            self._commit_checkpoint()
 
-        # Finalize sync record
-        sync_record.write({
-            'state': 'done' if errors == 0 else 'error',
+        failed = self.chunk_ids.filtered(lambda c: c.state == 'failed')
+        self.write({
+            'state': 'error' if failed or self.errors else 'done',
             'end_time': fields.Datetime.now(),
             'error_log': '\n'.join(error_messages) if error_messages else False,
+            'client_metrics_summary': client.metrics.summary(),
+        })
+        if own_batchers:
+            self._save_batch_sizes(batchers)
+
+        _logger.info(f'Avancir sync complete: {self.products_created} created, {self.products_updated} updated, '
+                     f'{self.products_skipped} skipped, {self.errors} errors, '
+                     f'{self.bytes_sent} bytes sent ({self.bytes_saved} saved by compression)')
+
+        return {
+            'created': self.products_created,
+            'updated': self.products_updated,
+            'skipped': self.products_skipped,
+            'errors': self.errors,
+        }
+
+    def _sync_selected_products(self, products):
+        """
+        Push a selection of products to Avancir right away, in bulk.
+
+        Products are mapped in one batch per company, split into
+        /items/bulkCreate and /items/bulkUpdate calls sized by the adaptive
+        batchers, and sent on each company's workspace. Unlike the chunked
+        sync, every selected product is sent even if unchanged.
+
+        Returns:
+            dict with created and updated product recordsets and failed,
+            a dict {product: error message}
+        """
+        sync_time = fields.Datetime.now()
+        batchers = self._get_batchers()
+        endpoints = self._BULK_ENDPOINTS
+        concurrency = int(self._get_config('sync_concurrency', 4))
+        failed = {}
+
+        def jobs():
+            for company, group in products.grouped('company_id').items():
+                client = self._get_client(company)
+                error_messages = []
+                pairs = self._map_batch_isolating_errors(group, error_messages)
+                by_kind = {'create': [], 'update': []}
+                for product, item in pairs:
+                    if item is None:
+                        failed[product] = next(
+                            (m for m in error_messages if m.startswith(f'Product {product.id}:')), 'Mapping failed')
+                        continue
+                    digest = self._avancir_payload_hash(item)
+                    if product.avancir_item_id:
+                        item['id'] = product.avancir_item_id
+                    by_kind['update' if product.avancir_item_id else 'create'].append((product, item, digest))
+                for kind, entries in by_kind.items():
+                    for batch in chunked(entries, batchers[kind].size):
+                        yield {
+                            'client': client,
+                            'kind': kind,
+                            'products': group.browse([product.id for product, _item, _digest in batch]),
+                            'items': [item for _product, item, _digest in batch],
+                            'hashes': {product.id: digest for product, _item, digest in batch},
+                        }
+
+        def send(job):
+            # Runs in a pool thread: network only, no ORM access
+            body = dumps({'items': job['items']})
+            nbytes = len(body)
+            batcher = batchers[job['kind']]
+            started = time.monotonic()
+            try:
+                result = job['client'].request('POST', endpoints[job['kind']], body)
+            except Exception:
+                batcher.record(len(job['items']), time.monotonic() - started, nbytes, ok=False)
+                raise
+            batcher.record(len(job['items']), time.monotonic() - started, nbytes)
+            return result
+
+        created = products.browse()
+        updated = products.browse()
+        for job, result, exc in dispatch_ordered(send, jobs(), concurrency):
+            sent = job['products']
+            if exc:
+                failed.update(dict.fromkeys(sent, str(exc)))
+            elif job['kind'] == 'create':
+                item_ids = self._match_created_ids(sent, result.get('data', []))
+                done = sent.browse(list(item_ids))
+                done._avancir_mark_synced(sync_time, item_ids, job['hashes'])
+                created |= done
+                failed.update(dict.fromkeys(sent - done, 'Avancir returned no item id'))
+            else:
+                sent._avancir_mark_synced(sync_time, payload_hashes=job['hashes'])
+                updated |= sent
+
+        # One grouped write per distinct error
+        by_message = {}
+        for product, message in failed.items():
+            by_message.setdefault(message, products.browse())
+            by_message[message] |= product
+        for message, group in by_message.items():
+            group.write({'avancir_sync_error': message})
+
+        self._save_batch_sizes(batchers)
+        return {'created': created, 'updated': updated, 'failed': failed}
+
+    def _claim_for_resume(self):
+        """
+        Take over a product sync to resume it; False if it is not ours to resume.
+
+        The sync row is locked without waiting, so two resumes cannot both
+        pass the check, and a run still checkpointing within the
+        sync_resume_after setting (minutes) is left to the worker running
+        it. A claimed sync is marked running and committed, which refreshes
+        its write_date: other workers then see it as in progress.
+        """
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute('SELECT id FROM avancir_sync WHERE id = %s FOR UPDATE NOWAIT', [self.id])
+        except LockNotAvailable:
+            return False
+        self.invalidate_recordset(['state', 'write_date'])
+        stale_after = int(self._get_config('sync_resume_after', 30))
+        if self.state == 'running' and self.write_date >= fields.Datetime.now() - timedelta(minutes=stale_after):
+            return False
+        self.write({'state': 'running'})
+        self._commit_checkpoint()
+        return True
+
+    def action_resume_sync(self):
+        """Send the unfinished chunks of an interrupted or failed product sync."""
+        for sync in self:
+            if sync.sync_type != 'products' or not sync.chunk_ids.filtered(lambda c: c.state != 'done'):
+                raise UserError(f'{sync.name} has nothing left to send.')
+            if not sync._claim_for_resume():
+                raise UserError(f'{sync.name} is still running. It can be resumed once it has made '
+                                f'no progress for {self._get_config("sync_resume_after", 30)} minutes.')
+            sync._run_chunks()
+            if sync.parent_id:
+                sync.parent_id._rollup_children()
+        return True
+
+    @api.model
+    def sync_all_companies(self, incremental=False, force=False, concurrency=None):
+        """
+        Sync each Avancir-enabled company as its own job, in parallel.
+
+        Every company with avancir_sync_enabled gets a child product sync
+        on its own workspace key and location, run in its own thread and
+        cursor so a slow store does not hold up the others. Products
+        without a company are shared by all stores and keep a single
+        Avancir id, so they are synced once, to the global workspace, as
+        one more child, together with the products of the companies that
+        are not enabled, as the global sync would. Results roll up into a
+        parent avancir.sync record. Without any enabled company this is a
+        single global sync.
+
+        Args:
+            incremental: Passed to every child sync_all_products
+            force: Passed to every child sync_all_products
+            concurrency: Companies synced at once, defaults to the
+                company_concurrency setting. The sync_concurrency bulk calls
+                are shared among them, at least one each.
+
+        Returns:
+            dict with created, updated, skipped and errors counts
+        """
+        companies = self.env['res.company'].search([('avancir_sync_enabled', '=', True)])
+        if not companies:
+            return self.sync_all_products(incremental=incremental, force=force)
+        if not self._get_config('sync_enabled', False):
+            _logger.info('Avancir sync is disabled')
+            return {'created': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+
+        if concurrency is None:
+            concurrency = int(self._get_config('company_concurrency', 4))
+        bulk_concurrency = max(1, int(self._get_config('sync_concurrency', 4)) // max(1, concurrency))
+
+        parent = self.create({
+            'name': f'Store Sync {datetime.now().strftime("%Y-%m-%d %H:%M")}',
+            'sync_type': 'products',
+            'state': 'running',
+            'start_time': fields.Datetime.now(),
         })
+        # Children write to their own cursors and must see the parent
+        parent._commit_checkpoint()
+
+        _logger.info(f'Starting Avancir sync for {len(companies)} companies '
+                     f'({concurrency} at a time, {bulk_concurrency} bulk calls each)')
+
+        registry = self.env.registry
+        uid, context = self.env.uid, dict(self.env.context)
+        # One set of batchers learns from every store's calls; only this
+        # cursor saves their sizes, after the children are done
+        batchers = parent._get_batchers()
+
+        def run(company_id):
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, uid, context)
+                    return env['avancir.sync'].sync_all_products(
+                        company_id=company_id, exclude_company_ids=None if company_id else companies.ids,
+                        concurrency=bulk_concurrency,
+                        incremental=incremental, force=force, parent_id=parent.id, batchers=batchers)
+            except Exception as exc:
+                # The child committed its plan as running; a fresh cursor
+                # marks it failed so it does not hold the parent running
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, uid, context)
+                    env['avancir.sync'].search([
+                        ('parent_id', '=', parent.id),
+                        ('company_id', '=', company_id),
+                        ('state', '=', 'running'),
+                    ]).write({'state': 'error', 'end_time': fields.Datetime.now(), 'error_log': str(exc)})
+                raise
+
+        names = {company.id: company.name for company in companies}
+        names[False] = 'Shared and other products'
+        error_messages = []
+        for company_id, _result, exc in dispatch_ordered(run, [*companies.ids, False], concurrency):
+            if exc:
+                error_messages.append(f'{names[company_id]}: {exc}')
+                _logger.error(f'Avancir sync failed for {names[company_id]}: {exc}')
+
+        parent._save_batch_sizes(batchers)
+        # Start a new transaction so the children's commits are visible
+        parent._commit_checkpoint()
+        return parent._rollup_children(error_messages)
 
-        _logger.info(f'Avancir sync complete: {created} created, {updated} updated, {errors} errors')
+    def _rollup_children(self, error_messages=None):
+        """
+        Sum the child syncs into this parent record and set its state.
 
+        A failed child settles the parent as an error even while a sibling
+        is still running (e.g. being resumed); the parent is only running
+        while children are and none has failed.
+        """
+        self.ensure_one()
+        self.invalidate_recordset()
+        children = self.child_ids
+        totals = {
+            'products_created': sum(children.mapped('products_created')),
+            'products_updated': sum(children.mapped('products_updated')),
+            'products_skipped': sum(children.mapped('products_skipped')),
+            'errors': sum(children.mapped('errors')) + len(error_messages or []),
+            'bytes_sent': sum(children.mapped('bytes_sent')),
+            'bytes_saved': sum(children.mapped('bytes_saved')),
+        }
+        failed = error_messages or children.filtered(lambda c: c.state == 'error')
+        running = children.filtered(lambda c: c.state == 'running')
+        self.write({
+            **totals,
+            'state': 'error' if failed else 'running' if running else 'done',
+            'end_time': False if running and not failed else fields.Datetime.now(),
+            'error_log': '\n'.join(error_messages) if error_messages else self.error_log,
+        })
+        _logger.info(f'Avancir store sync complete: {totals["products_created"]} created, '
+                     f'{totals["products_updated"]} updated, {totals["errors"]} errors')
         return {
-            'created': created,
-            'updated': updated,
-            'errors': errors,
+            'created': totals['products_created'],
+            'updated': totals['products_updated'],
+            'skipped': totals['products_skipped'],
+            'errors': totals['errors'],
         }
 
+    @api.model
+    def _resume_interrupted_syncs(self):
+        """
+        Resume product syncs that stopped making progress while running.
+
+        A run is considered interrupted once its last checkpoint is older
+        than the sync_resume_after setting (minutes), so a run still in
+        progress in another worker is left alone. Runs another worker
+        claimed in the meantime are skipped (see _claim_for_resume).
+        """
+        stale_after = int(self._get_config('sync_resume_after', 30))
+        interrupted = self.search([
+            ('sync_type', '=', 'products'),
+            ('state', '=', 'running'),
+            ('chunk_ids.state', 'in', ('pending', 'failed')),
+            ('write_date', '<', fields.Datetime.now() - timedelta(minutes=stale_after)),
+        ])
+        resumed = self.browse()
+        for sync in interrupted:
+            if not sync._claim_for_resume():
+                continue
+            _logger.info(f'Resuming interrupted Avancir sync {sync.name} after chunk {sync.checkpoint}')
+            sync._run_chunks()
+            resumed |= sync
+        for parent in resumed.parent_id:
+            parent._rollup_children()
+        return resumed
+
     @api.model
     def cron_sync_products(self):
         """Cron job to sync products to Avancir."""
         _logger.info('Running scheduled Avancir product sync')
-        return self.sync_all_products()
+        if self._get_config('sync_enabled', False):
+            self._resume_interrupted_syncs()
+        return self.sync_all_companies(incremental=True)
 
     # ================================================================
     # INVENTORY TRANSFERS BETWEEN STORES
@@ -260,6 +1034,11 @@ class AvancirSync(models.Model):
         Transfer inventory between stores.
         Creates Odoo stock.picking and updates Avancir item locations.
 
+        All stock moves are created in one multi-record create. Avancir
+        location updates are queued as avancir.transfer.line records and
+        sent after the transaction commits, so no lock is held while
+        waiting on Avancir; failed lines can be retried on their own.
+
         Args:
             source_warehouse_id: ID of source stock.warehouse
             dest_warehouse_id: ID of destination stock.warehouse
@@ -267,7 +1046,7 @@ class AvancirSync(models.Model):
             quantities: Optional dict {product_id: qty}, defaults to 1 each
 
         Returns:
-            dict with transfer_id, items_transferred, avancir_updated
+            dict with transfer_id, items_transferred, avancir_queued
         """
         if quantities is None:
             quantities = {pid: 1 for pid in product_ids}
@@ -301,46 +1080,54 @@ class AvancirSync(models.Model):
 
         picking = self.env['stock.picking'].create(picking_vals)
         products = self.env['product.template'].browse(product_ids)
-        items_transferred = 0
-        avancir_updated = 0
-        errors = []
+        products.fetch(['name', 'uom_id', 'avancir_item_id'])
 
+        move_vals_list = []
+        line_vals_list = []
         for product in products:
-            qty = quantities.get(product.id, 1)
             # Get product variant
             variant = product.product_variant_id
             if not variant:
                 continue
 
-            # Create stock move
-            move_vals = {
+            move_vals_list.append({
                 'name': product.name,
                 'product_id': variant.id,
-                'product_uom_qty': qty,
+                'product_uom_qty': quantities.get(product.id, 1),
                 'product_uom': product.uom_id.id,
                 'picking_id': picking.id,
                 'location_id': source_wh.lot_stock_id.id,
                 'location_dest_id': dest_wh.lot_stock_id.id,
-            }
-            self.env['stock.move'].create(move_vals)
-            items_transferred += 1
-
-            # Update Avancir location
+            })
             if product.avancir_item_id:
-                try:
-                    self._make_request('PATCH', f'/items/{product.avancir_item_id}', {
-                        'location': {'display_name': dest_wh.name}
-                    })
-                    avancir_updated += 1
-                except Exception as e:
-                    errors.append(f'Avancir update failed for {product.name}: {e}')
-                    _logger.error(f'Avancir location update failed: {e}')
+                line_vals_list.append({
+                    'product_id': product.id,
+                    'avancir_item_id': product.avancir_item_id,
+                    'location_name': self._avancir_location_name(dest_wh),
+                })
+
+        self.env['stock.move'].create(move_vals_list)
+        items_transferred = len(move_vals_list)
 
         # Confirm the picking
         picking.action_confirm()
         picking.action_assign()
 
-        _logger.info(f'Transfer complete: {items_transferred} items, {avancir_updated} Avancir updates')
+        sync_record = self.browse()
+        if line_vals_list:
+            sync_record = self.create({
+                'name': f'Transfer {picking.name}: {source_wh.name} -> {dest_wh.name}',
+                'sync_type': 'transfer',
+                'state': 'running',
+                'start_time': fields.Datetime.now(),
+                'company_id': source_wh.company_id.id,
+                'warehouse_id': dest_wh.id,
+                'transfer_line_ids': [fields.Command.create(vals) for vals in line_vals_list],
+            })
+            sync_record._push_transfer_lines_after_commit()
+
+        _logger.info(f'Transfer complete: {items_transferred} items, '
+                     f'{len(line_vals_list)} Avancir updates queued')
 
         return {
             'transfer_id': picking.id,
@@ -348,22 +1135,194 @@ class AvancirSync(models.Model):
             'source_warehouse': source_wh.name,
             'dest_warehouse': dest_wh.name,
             'items_transferred': items_transferred,
-            'avancir_updated': avancir_updated,
-            'errors': errors,
+            'avancir_queued': len(line_vals_list),
+            'sync_record_id': sync_record.id,
         }
 
+    def _push_transfer_lines_after_commit(self):
+        """Send this transfer's pending location updates once the transaction commits."""
+        self.ensure_one()
+        registry = self.env.registry
+        uid, sync_id = self.env.uid, self.id
+
+        def push():
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, {})
+                env['avancir.sync'].browse(sync_id)._push_transfer_lines()
+
+        self.env.cr.postcommit.add(push)
+
+    def _push_transfer_lines(self, lines=None):
+        """
+        Send Avancir location updates for transfer lines and record the outcome.
+
+        Lines go out in /items/bulkUpdate chunks through the bounded pool,
+        on the workspace of their product's company, where the item was
+        created; a chunk the bulk endpoint rejects is retried item by item,
+        so each line ends up done or failed on its own.
+
+        Args:
+            lines: avancir.transfer.line records, defaults to the pending
+                and failed lines of these transfers
+        """
+        if lines is None:
+            lines = self.transfer_line_ids.filtered(lambda l: l.state != 'done')
+        if not lines:
+            return
+
+        chunk_size = int(self._get_config('transfer_batch_size', 100))
+        concurrency = int(self._get_config('sync_concurrency', 4))
+        jobs = []
+        for company, company_lines in lines.grouped(lambda l: l.product_id.company_id).items():
+            client = self._get_client(company)
+            rows = [(line.id, line.avancir_item_id, line.location_name) for line in company_lines]
+            jobs.extend((client, rows[i:i + chunk_size]) for i in range(0, len(rows), chunk_size))
+
+        def send(job):
+            # Runs in a pool thread: network only, returns {line_id: error or None}
+            client, chunk = job
+            try:
+                client.request('POST', '/items/bulkUpdate', {'items': [
+                    {'id': item_id, 'location': {'display_name': location}}
+                    for _line_id, item_id, location in chunk
+                ]})
+                return {line_id: None for line_id, _item_id, _location in chunk}
+            except Exception as bulk_error:
+                _logger.warning(f'Bulk location update failed ({bulk_error}), retrying item by item')
+            results = {}
+            for line_id, item_id, location in chunk:
+                try:
+                    client.request('PATCH', f'/items/{item_id}', {'location': {'display_name': location}})
+                    results[line_id] = None
+                except Exception as e:
+                    results[line_id] = str(e)
+            return results
+
+        done_ids = []
+        failed = {}
+        for _job, results, _exc in dispatch_ordered(send, jobs, concurrency):
+            for line_id, error in results.items():
+                if error is None:
+                    done_ids.append(line_id)
+                else:
+                    failed.setdefault(error, []).append(line_id)
+
+        Line = self.env['avancir.transfer.line']
+        for attempts in set(lines.mapped('attempts')):
+            lines.filtered(lambda l: l.attempts == attempts).write({'attempts': attempts + 1})
+        Line.browse(done_ids).write({'state': 'done', 'error': False})
+        for error, line_ids in failed.items():
+            _logger.error(f'Avancir location update failed for {len(line_ids)} items: {error}')
+            Line.browse(line_ids).write({'state': 'failed', 'error': error})
+
+        for sync_record in lines.sync_id:
+            sync_lines = sync_record.transfer_line_ids
+            updated = len(sync_lines.filtered(lambda l: l.state == 'done'))
+            failed_count = len(sync_lines.filtered(lambda l: l.state == 'failed'))
+            sync_record.write({
+                'state': 'error' if failed_count else 'done',
+                'end_time': fields.Datetime.now(),
+                'products_updated': updated,
+                'errors': failed_count,
+            })
+
+    def action_retry_failed_transfer_lines(self):
+        """Resend only the location updates that failed."""
+        for sync_record in self:
+            failed = sync_record.transfer_line_ids.filtered(lambda l: l.state == 'failed')
+            sync_record._push_transfer_lines(failed)
+        return True
+
     # ================================================================
     # END-OF-DAY POS RECONCILIATION
     # ================================================================
 
-    def reconcile_pos_inventory(self, warehouse_id, pos_sales_data=None):
+    def _get_odoo_stock_by_sku(self, warehouse):
+        """
+        On-hand quantity per SKU for a warehouse's stock location.
+
+        Products come from one search_read, quantities from one grouped
+        read of stock.quant under warehouse.lot_stock_id.
+
+        Returns:
+            dict {sku: {'product_id', 'name', 'qty_available'}}
+        """
+        products = self.env['product.template'].search_read([
+            ('company_id', '=', warehouse.company_id.id),
+            ('active', '=', True),
+            ('default_code', '!=', False),
+        ], ['name', 'default_code'])
+
+        qty_by_template = {}
+        for product, quantity in self.env['stock.quant']._read_group(
+            [('location_id', 'child_of', warehouse.lot_stock_id.id)], ['product_id'], ['quantity:sum'],
+        ):
+            template_id = product.product_tmpl_id.id
+            qty_by_template[template_id] = qty_by_template.get(template_id, 0.0) + quantity
+
+        return {
+            product['default_code']: {
+                'product_id': product['id'],
+                'name': product['name'],
+                'qty_available': qty_by_template.get(product['id'], 0.0),
+            }
+            for product in products
+        }
+
+    def _get_pos_sales_by_sku(self, warehouse, day=None):
+        """
+        Net quantity sold per SKU out of a warehouse on a given day.
+
+        Built from done stock moves between the warehouse stock location
+        and customer locations, which covers POS orders and sales
+        deliveries alike; customer returns are subtracted. One grouped
+        read per direction, keyed by default_code.
+
+        Args:
+            warehouse: stock.warehouse record
+            day: date to aggregate, defaults to today in the user's timezone
+
+        Returns:
+            dict {sku: qty_sold}
+        """
+        tz = pytz.timezone(self.env.user.tz or 'UTC')
+        day = day or fields.Date.context_today(self)
+        local_start = tz.localize(datetime.combine(day, datetime.min.time()))
+        date_from = local_start.astimezone(pytz.utc).replace(tzinfo=None)
+        date_to = (local_start + timedelta(days=1)).astimezone(pytz.utc).replace(tzinfo=None)
+
+        base_domain = [
+            ('state', '=', 'done'),
+            ('date', '>=', date_from),
+            ('date', '<', date_to),
+            ('product_id.default_code', '!=', False),
+        ]
+        stock = warehouse.lot_stock_id.id
+        sold = {}
+        for sign, direction in (
+            (1, [('location_id', 'child_of', stock), ('location_dest_id.usage', '=', 'customer')]),
+            (-1, [('location_id.usage', '=', 'customer'), ('location_dest_id', 'child_of', stock)]),
+        ):
+            for product, qty in self.env['stock.move']._read_group(
+                base_domain + direction, ['product_id'], ['product_qty:sum'],
+            ):
+                sold[product.default_code] = sold.get(product.default_code, 0.0) + sign * qty
+        return {sku: qty for sku, qty in sold.items() if qty}
+
+    def reconcile_pos_inventory(self, warehouse_id, pos_sales_data=None, day=None, source='remote'):
         """
         Reconcile end-of-day POS sales with Avancir physical inventory.
 
+        Odoo on-hand stock is read per SKU with one grouped quant read and
+        joined in a single pass against the streamed Avancir items.
+
         Args:
             warehouse_id: ID of stock.warehouse to reconcile
             pos_sales_data: Optional dict of {sku: qty_sold} from POS
-                           If not provided, will attempt to fetch from Avancir
+                           If not provided, it is aggregated from the day's
+                           outgoing stock moves of the warehouse
+            day: Day to aggregate sales for, defaults to today
+            source: 'remote' reads Avancir live, 'local' reads the mirror
 
         Returns:
             dict with reconciliation results
@@ -381,104 +1340,51 @@ class AvancirSync(models.Model):
             'state': 'running',
             'start_time': fields.Datetime.now(),
             'company_id': warehouse.company_id.id,
+            'warehouse_id': warehouse.id,
         })
+        # The failure below raises, which rolls back the transaction: the
+        # record must already be committed for its error state to remain
+        sync_record._commit_checkpoint()
+
+        odoo_by_sku = self._get_odoo_stock_by_sku(warehouse)
+        if pos_sales_data is None:
+            pos_sales_data = self._get_pos_sales_by_sku(warehouse, day)
 
-        # Get current Avancir inventory for this location
+        # Stream current Avancir inventory for this location through the join
         try:
-            avancir_items = self._make_request('GET', '/items', params={
-                'location': warehouse.name,
-                'limit': 1000,
-            })
+            outcome = reconcile_by_sku(
+                odoo_by_sku,
+                self._iter_items({'location': self._avancir_location_name(warehouse)},
+                                 source=source, company=warehouse.company_id),
+                pos_sales_data,
+            )
         except Exception as e:
-            sync_record.write({'state': 'error', 'error_log': str(e)})
+            sync_record.write({'state': 'error', 'end_time': fields.Datetime.now(), 'error_log': str(e)})
+            sync_record._commit_checkpoint()
             raise UserError(f'Failed to fetch Avancir inventory: {e}')
 
-        items_data = avancir_items.get('data', [])
-        _logger.info(f'Fetched {len(items_data)} items from Avancir for {warehouse.name}')
-
-        # Build Avancir inventory map by SKU
-        avancir_by_sku = {}
-        for item in items_data:
-            sku = item.get('sku')
-            if sku:
-                avancir_by_sku[sku] = {
-                    'avancir_id': item.get('id'),
-                    'name': item.get('name'),
-                    'status': item.get('status', {}).get('display_name'),
-                    'rfid_tag': item.get('rfid_tag'),
-                    'last_scan': item.get('last_scanned_at'),
-                }
-
-        # Get Odoo products for this warehouse's company
-        products = self.env['product.template'].search([
-            ('company_id', '=', warehouse.company_id.id),
-            ('active', '=', True),
-            ('default_code', '!=', False),
-        ])
-
-        # Build Odoo inventory map
-        odoo_by_sku = {}
-        for product in products:
-            if product.default_code:
-                odoo_by_sku[product.default_code] = {
-                    'product_id': product.id,
-                    'name': product.name,
-                    'qty_available': product.qty_available,
-                }
-
-        # Compare and find discrepancies
-        discrepancies = []
-        matched = 0
-        missing_in_avancir = []
-        missing_in_odoo = []
-
-        for sku, odoo_data in odoo_by_sku.items():
-            if sku in avancir_by_sku:
-                matched += 1
-                avancir_data = avancir_by_sku[sku]
-                # Check if item was sold (status changed or missing RFID scan today)
-                if pos_sales_data and sku in pos_sales_data:
-                    qty_sold = pos_sales_data[sku]
-                    discrepancies.append({
-                        'sku': sku,
-                        'name': odoo_data['name'],
-                        'odoo_qty': odoo_data['qty_available'],
-                        'pos_sold': qty_sold,
-                        'avancir_status': avancir_data['status'],
-                        'last_scan': avancir_data['last_scan'],
-                    })
-            else:
-                missing_in_avancir.append({
-                    'sku': sku,
-                    'name': odoo_data['name'],
-                    'product_id': odoo_data['product_id'],
-                })
+        matched = outcome['matched']
+        discrepancies = outcome['discrepancies']
+        missing_in_avancir = outcome['missing_in_avancir']
+        missing_in_odoo = outcome['missing_in_odoo']
 
-        for sku, avancir_data in avancir_by_sku.items():
-            if sku not in odoo_by_sku:
-                missing_in_odoo.append({
-                    'sku': sku,
-                    'name': avancir_data['name'],
-                    'avancir_id': avancir_data['avancir_id'],
-                })
+        self.env['avancir.reconciliation.line']._store_outcome(sync_record, outcome)
 
         # Update sync record
         sync_record.write({
             'state': 'done',
             'end_time': fields.Datetime.now(),
-            'products_created': matched,
-            'products_updated': len(discrepancies),
+            'matched_count': matched,
+            'discrepancy_count': len(discrepancies),
+            'missing_in_avancir_count': len(missing_in_avancir),
+            'missing_in_odoo_count': len(missing_in_odoo),
             'errors': len(missing_in_avancir) + len(missing_in_odoo),
-            'error_log': json.dumps({
-                'missing_in_avancir': missing_in_avancir[:50],
-                'missing_in_odoo': missing_in_odoo[:50],
-            }, indent=2) if missing_in_avancir or missing_in_odoo else False,
         })
 
         result = {
             'warehouse': warehouse.name,
             'total_odoo_products': len(odoo_by_sku),
-            'total_avancir_items': len(avancir_by_sku),
+            'total_avancir_items': outcome['total_avancir_items'],
             'matched': matched,
             'discrepancies': discrepancies,
             'missing_in_avancir': missing_in_avancir,
@@ -492,52 +1398,135 @@ class AvancirSync(models.Model):
 
         return result
 
-    def get_avancir_inventory_by_location(self, location_name, status_filter=None):
+    @api.model
+    def cron_reconcile_all_warehouses(self, day=None, concurrency=None):
+        """
+        Cron job: end-of-day reconciliation of every warehouse.
+
+        Warehouses are reconciled in parallel, each in its own thread and
+        cursor, so one slow store does not hold up the rest and each
+        store's result is committed on its own.
+
+        Args:
+            day: Sales day to reconcile; the cron runs overnight, so it
+                defaults to yesterday
+            concurrency: Parallel warehouses, defaults to the reconcile_concurrency setting
+        """
+        if not self._get_config('sync_enabled', False):
+            _logger.info('Avancir sync is disabled')
+            return []
+        if concurrency is None:
+            concurrency = int(self._get_config('reconcile_concurrency', 4))
+
+        day = day or fields.Date.context_today(self) - timedelta(days=1)
+        warehouse_ids = self.env['stock.warehouse'].search([]).ids
+        _logger.info(f'Running scheduled Avancir reconciliation for {len(warehouse_ids)} warehouses')
+
+        registry = self.env.registry
+        uid, context = self.env.uid, dict(self.env.context)
+
+        def reconcile(warehouse_id):
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                return env['avancir.sync'].reconcile_pos_inventory(warehouse_id, day=day)
+
+        results = []
+        for warehouse_id, result, exc in dispatch_ordered(reconcile, warehouse_ids, concurrency):
+            if exc:
+                _logger.error(f'Reconciliation failed for warehouse {warehouse_id}: {exc}')
+                continue
+            results.append(result)
+        return results
+
+    def get_avancir_inventory_by_location(self, location_name, status_filter=None, source='remote'):
         """
         Get all Avancir items for a specific location.
 
         Args:
-            location_name: Name of the location/warehouse
+            location_name: Name of the location/warehouse; it also selects
+                the workspace (see _company_for_location)
             status_filter: Optional status to filter by (e.g., 'Active', 'Needs Tags')
+            source: 'remote' reads Avancir live, 'local' reads the mirror
 
         Returns:
             List of items from Avancir
         """
-        params = {
-            'location': location_name,
-            'limit': 1000,
-        }
+        params = {'location': location_name}
         if status_filter:
             params['status'] = status_filter
 
-        result = self._make_request('GET', '/items', params=params)
-        return result.get('data', [])
+        return list(self._iter_items(params, source=source, company=self._company_for_location(location_name)))
 
-    def update_avancir_item_status(self, avancir_item_id, new_status):
+    def update_avancir_item_status(self, avancir_item_id, new_status, company=None):
         """
         Update the status of an item in Avancir.
 
         Args:
             avancir_item_id: ID of the item in Avancir
             new_status: New status display name (e.g., 'Sold', 'Transferred', 'Active')
+            company: res.company whose workspace holds the item, defaults to
+                the company of the product linked to it
 
         Returns:
             Updated item data
         """
+        if company is None:
+            company = next(iter(self._group_items_by_company([avancir_item_id])))
         return self._make_request('PATCH', f'/items/{avancir_item_id}', {
             'status': {'display_name': new_status}
-        })
+        }, company=company)
 
     # ================================================================
     # ITEM HISTORY / ACTIVITY FETCHING
     # ================================================================
 
-    def get_item_history(self, item_ids):
+    def _fetch_history_chunked(self, item_ids, company=None, failed=None):
+        """
+        Fetch history for a stream of item ids in fixed-size batches.
+
+        Batches of history_batch_size ids are sent to /items/history/batch
+        concurrently through the pooled client and merged in order. A batch
+        that fails is logged and left out, like a failed single call; its
+        ids are added to ``failed`` so the caller knows the result is partial.
+
+        Args:
+            item_ids: Iterable of Avancir item IDs, consumed lazily
+            company: Optional res.company whose workspace holds the items
+            failed: Optional list collecting the ids whose history failed
+
+        Returns:
+            List of history/activity records from Avancir
+        """
+        client = self._get_client(company)
+        batch_size = int(self._get_config('history_batch_size', 100))
+        concurrency = int(self._get_config('sync_concurrency', 4))
+
+        def fetch(batch):
+            # Runs in a pool thread: network only, no ORM access
+            result = client.request('POST', '/items/history/batch', {'itemIds': batch})
+            return result.get('data', []) if isinstance(result, dict) else result
+
+        history = []
+        for batch, records, exc in dispatch_ordered(fetch, chunked(item_ids, batch_size), concurrency):
+            if exc:
+                _logger.error(f'Failed to fetch item history for {len(batch)} items: {exc}')
+                if failed is not None:
+                    failed.extend(batch)
+                continue
+            history.extend(records or [])
+        return history
+
+    def get_item_history(self, item_ids, source='remote', failed=None):
         """
         Fetch activity history from Avancir for given items.
 
+        Items are fetched from the workspace of the company of their
+        product, the global one for items no product links to.
+
         Args:
             item_ids: List of Avancir item IDs
+            source: 'remote' reads Avancir live, 'local' reads the mirror
+            failed: Optional list collecting the ids whose history failed
 
         Returns:
             List of history/activity records from Avancir
@@ -545,21 +1534,21 @@ class AvancirSync(models.Model):
         if not item_ids:
             return []
 
-        try:
-            result = self._make_request('POST', '/items/history/batch', {
-                'itemIds': item_ids
-            })
-            return result.get('data', []) if isinstance(result, dict) else result
-        except Exception as e:
-            _logger.error(f'Failed to fetch item history: {e}')
-            return []
+        if source == 'local':
+            return self.env['avancir.item.activity']._history_for_items(item_ids)
+        history = []
+        for company, ids in self._group_items_by_company(item_ids).items():
+            history.extend(self._fetch_history_chunked(ids, company, failed))
+        return history
 
-    def get_item_history_single(self, item_id):
+    def get_item_history_single(self, item_id, source='remote', failed=None):
         """
         Fetch activity history for a single item from Avancir.
 
         Args:
             item_id: Avancir item ID
+            source: 'remote' reads Avancir live, 'local' reads the mirror
+            failed: Optional list the item id is added to if the call fails
 
         Returns:
             List of history records for this item
@@ -567,37 +1556,138 @@ class AvancirSync(models.Model):
         if not item_id:
             return []
 
+        if source == 'local':
+            return self.env['avancir.item.activity']._history_for_items([item_id])
+
+        company = next(iter(self._group_items_by_company([item_id])))
         try:
-            result = self._make_request('GET', f'/items/{item_id}/history')
+            result = self._make_request('GET', f'/items/{item_id}/history', company=company)
             return result.get('data', []) if isinstance(result, dict) else result
         except Exception as e:
             _logger.error(f'Failed to fetch history for item {item_id}: {e}')
+            if failed is not None:
+                failed.append(item_id)
             return []
 
-    def get_item_history_by_location(self, location_name, limit=50):
+    def get_item_history_by_location(self, location_name, limit=50, source='remote', failed=None):
         """
         Get history for all items at a location.
 
+        Item ids are streamed from the paginated inventory reader straight
+        into the chunked history fetcher, so neither the inventory nor the
+        id list is loaded up front. Both read the workspace of the company
+        the location belongs to (see _company_for_location).
+
         Args:
             location_name: Name of the location/warehouse
             limit: Maximum number of items to fetch history for
+            source: 'remote' reads Avancir live, 'local' reads the mirror
+            failed: Optional list collecting the ids whose history failed
 
         Returns:
             List of history records from Avancir
         """
-        # First get items at location
-        items = self.get_avancir_inventory_by_location(location_name)
-        if not items:
-            return []
+        if source == 'local':
+            items = self.env['avancir.item'].search_read(
+                [('location', '=', location_name)], ['avancir_id'], order='id', limit=limit)
+            return self.env['avancir.item.activity']._history_for_items(
+                [item['avancir_id'] for item in items])
+
+        # Stream items at location, stopping once we have enough; a limit
+        # within one page has no next page worth prefetching
+        company = self._company_for_location(location_name)
+        page_size = int(self._get_config('page_size', 200))
+        pages = self._iter_avancir_items({'location': location_name}, page_size=min(limit, page_size),
+                                         prefetch=limit > page_size, company=company)
+        # Closed once the limit is reached, which stops a page prefetch in flight
+        with closing(pages):
+            # Extract item IDs (handle both 'id' and '_id' formats)
+            item_ids = (item.get('_id') or item.get('id') for item in islice(pages, limit))
+            return self._fetch_history_chunked((item_id for item_id in item_ids if item_id), company, failed)
 
-        # Extract item IDs (handle both 'id' and '_id' formats)
-        item_ids = []
-        for item in items[:limit]:
-            item_id = item.get('_id') or item.get('id')
-            if item_id:
-                item_ids.append(item_id)
+    # ================================================================
+    # HISTORY RETENTION
+    # ================================================================
 
-        if not item_ids:
-            return []
+    def _get_retention(self, sync_type):
+        """
+        Retention limits of a sync type: (max age in days, max count).
 
-        return self.get_item_history(item_ids)
+        avancir_inventory.retention_days.<sync_type> and
+        retention_count.<sync_type> override the global retention_days and
+        retention_count settings. 0 disables a limit.
+        """
+        days = self._get_config(f'retention_days.{sync_type}') or self._get_config('retention_days', 180)
+        count = self._get_config(f'retention_count.{sync_type}') or self._get_config('retention_count', 0)
+        return int(days), int(count)
+
+    def _expired_sync_ids(self, sync_type):
+        """Ids of finished top-level runs of a type beyond its age or count limit."""
+        days, count = self._get_retention(sync_type)
+        # Company runs go with their parent (ondelete cascade)
+        domain = [('sync_type', '=', sync_type), ('parent_id', '=', False), ('state', '!=', 'running')]
+        expired = set()
+        if days:
+            cutoff = fields.Datetime.now() - timedelta(days=days)
+            expired.update(self.search(domain + [
+                '|', ('start_time', '<', cutoff),
+                '&', ('start_time', '=', False), ('create_date', '<', cutoff),
+            ]).ids)
+        if count:
+            expired.update(self.search(domain, order='start_time desc, id desc', offset=count).ids)
+        return sorted(expired)
+
+    def _archive_large_error_logs(self):
+        """Move error logs over error_log_max_chars into gzip attachments, keeping the head inline."""
+        max_chars = int(self._get_config('error_log_max_chars', 10000))
+        if max_chars <= 0:
+            return 0
+        self.env.cr.execute("""
+            SELECT id FROM avancir_sync
+             WHERE length(error_log) > %s AND error_log_attachment_id IS NULL AND state != 'running'
+        """, [max_chars])
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        for batch in chunked(ids, self._RETENTION_BATCH):
+            for sync in self.browse(batch):
+                attachment = self.env['ir.attachment'].create({
+                    'name': f'avancir_sync_{sync.id}_error_log.txt.gz',
+                    'raw': gzip.compress(sync.error_log.encode('utf-8')),
+                    'mimetype': 'application/gzip',
+                    'res_model': self._name,
+                    'res_id': sync.id,
+                })
+                sync.write({
+                    'error_log': sync.error_log[:max_chars] + '\n... (truncated, download the full log)',
+                    'error_log_attachment_id': attachment.id,
+                })
+            self._commit_checkpoint()
+        return len(ids)
+
+    @api.autovacuum
+    def _gc_sync_history(self):
+        """
+        Enforce the sync history retention policy.
+
+        Runs past their type's age or count limit are deleted in batches,
+        committing after each, with their lines, chunks and company runs.
+        Remaining large error logs are compressed into attachments.
+        """
+        removed = 0
+        for sync_type, _label in self._fields['sync_type'].selection:
+            for batch in chunked(self._expired_sync_ids(sync_type), self._RETENTION_BATCH):
+                self.browse(batch).unlink()
+                removed += len(batch)
+                self._commit_checkpoint()
+        archived = self._archive_large_error_logs()
+        _logger.info(f'Avancir sync history cleanup: {removed} runs removed, {archived} error logs compressed')
+
+    def action_download_error_log(self):
+        """Download the compressed full error log."""
+        self.ensure_one()
+        if not self.error_log_attachment_id:
+            raise UserError('This sync has no archived error log.')
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{self.error_log_attachment_id.id}?download=true',
+            'target': 'self',
+        }
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields, models
+
+
+class AvancirSyncChunk(models.Model):
+    _name = 'avancir.sync.chunk'
+    _description = 'Avancir Product Sync Chunk'
+    _order = 'sync_id desc, sequence'
+
+    sync_id = fields.Many2one(
+        'avancir.sync',
+        string='Sync',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    sequence = fields.Integer(string='Chunk', required=True)
+    kind = fields.Selection([
+        ('create', 'Create'),
+        ('update', 'Update'),
+    ], string='Operation', required=True)
+    product_ids = fields.Many2many(
+        'product.template',
+        'avancir_sync_chunk_product_rel',
+        'chunk_id',
+        'product_id',
+        string='Products',
+    )
+    product_count = fields.Integer(string='Products')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Attempts', default=0)
+    error_count = fields.Integer(string='Errors', default=0)
+    skipped_count = fields.Integer(
+        string='Skipped', default=0,
+        help='Products left out as unchanged by the first attempt at this chunk')
+    error = fields.Text(string='Error')
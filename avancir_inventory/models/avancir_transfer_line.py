@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields, models
+
+
+class AvancirTransferLine(models.Model):
+    _name = 'avancir.transfer.line'
+    _description = 'Avancir Transfer Location Update'
+    _order = 'sync_id desc, id'
+
+    sync_id = fields.Many2one(
+        'avancir.sync',
+        string='Transfer',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+    product_id = fields.Many2one('product.template', string='Product', ondelete='set null')
+    avancir_item_id = fields.Char(string='Avancir Item ID', required=True)
+    location_name = fields.Char(string='Destination Location', required=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Updated'),
+        ('failed', 'Failed'),
+    ], string='State', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Attempts', default=0)
+    error = fields.Text(string='Error')
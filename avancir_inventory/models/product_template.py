@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from odoo import api, fields, models
+from odoo.tools import SQL
 
 
 class ProductTemplate(models.Model):
@@ -19,6 +20,76 @@ class ProductTemplate(models.Model):
         string='Avancir Sync Error',
         copy=False,
     )
+    avancir_payload_hash = fields.Char(
+        string='Avancir Payload Hash',
+        copy=False,
+        help='Digest of the last payload sent to Avancir, used to skip unchanged items',
+    )
+
+    @api.model
+    def _avancir_search_changed(self, domain):
+        """
+        Search ``domain`` for the products never synced or modified since
+        their last sync.
+
+        The comparison of the two columns runs in the database, so a delta
+        run only loads the ids of the changed products.
+        """
+        self.flush_model(['write_date', 'avancir_last_sync'])
+        query = self._search(domain)
+        last_sync = SQL.identifier(query.table, 'avancir_last_sync')
+        query.add_where(SQL('(%s IS NULL OR %s > %s)',
+                            last_sync, SQL.identifier(query.table, 'write_date'), last_sync))
+        self.env.cr.execute(query.select())
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _avancir_mark_synced(self, sync_time, item_ids=None, payload_hashes=None):
+        """
+        Record a successful push for these products with grouped writes.
+
+        Args:
+            sync_time: Datetime stored as avancir_last_sync
+            item_ids: Optional dict {product_id: avancir_item_id} for new items
+            payload_hashes: Optional dict {product_id: digest} of the payloads sent
+        """
+        if not self:
+            return
+        # Raw SQL: an ORM write would move write_date past avancir_last_sync
+        # and the next incremental sync would see every pushed product as changed
+        self.flush_recordset(['avancir_last_sync', 'avancir_sync_error'])
+        self.env.cr.execute("""
+            UPDATE product_template
+               SET avancir_last_sync = %s, avancir_sync_error = NULL
+             WHERE id IN %s
+        """, [sync_time, tuple(self.ids)])
+        self.invalidate_recordset(['avancir_last_sync', 'avancir_sync_error'])
+        # Distinct per-product values: one statement each for the whole set
+        if item_ids:
+            self._avancir_bulk_set('avancir_item_id', item_ids)
+        if payload_hashes:
+            self._avancir_bulk_set('avancir_payload_hash', payload_hashes)
+
+    @api.model
+    def _avancir_forget_items(self, companies):
+        """Clear the Avancir ids and digests of the products of ``companies``."""
+        products = self.sudo().with_context(active_test=False).search([
+            ('company_id', 'in', companies.ids),
+            ('avancir_item_id', '!=', False),
+        ])
+        products.write({'avancir_item_id': False, 'avancir_payload_hash': False, 'avancir_last_sync': False})
+        return products
+
+    def _avancir_bulk_set(self, field_name, values):
+        """Write a distinct value per product in a single UPDATE."""
+        assert field_name in ('avancir_item_id', 'avancir_payload_hash')
+        self.browse(list(values)).flush_recordset([field_name])
+        self.env.cr.execute(f"""
+            UPDATE product_template AS pt
+               SET {field_name} = v.value
+              FROM unnest(%s::int[], %s::varchar[]) AS v(id, value)
+             WHERE pt.id = v.id
+        """, [list(values), [str(v) for v in values.values()]])
+        self.browse(list(values)).invalidate_recordset([field_name])
 
     def action_sync_to_avancir(self):
         """Sync this product to Avancir."""
@@ -33,17 +104,19 @@ class ProductTemplate(models.Model):
                 result = sync_model._make_request(
                     'PATCH',
                     f'/items/{self.avancir_item_id}',
-                    item
+                    item,
+                    company=self.company_id,
                 )
             else:
                 # Create new item
-                result = sync_model._make_request('POST', '/items', item)
+                result = sync_model._make_request('POST', '/items', item, company=self.company_id)
                 if result.get('data', {}).get('id'):
                     self.avancir_item_id = result['data']['id']
 
             self.write({
                 'avancir_last_sync': fields.Datetime.now(),
                 'avancir_sync_error': False,
+                'avancir_payload_hash': sync_model._avancir_payload_hash(item),
             })
 
             return {
@@ -68,3 +141,26 @@ class ProductTemplate(models.Model):
                     'sticky': True,
                 }
             }
+
+    def action_sync_selection_to_avancir(self):
+        """Sync the selected products to Avancir in bulk and summarize the outcome."""
+        outcome = self.env['avancir.sync']._sync_selected_products(self)
+        failed = outcome['failed']
+
+        lines = [f"Created: {len(outcome['created'])}, Updated: {len(outcome['updated'])}, "
+                 f"Failed: {len(failed)}"]
+        for product, message in list(failed.items())[:10]:
+            lines.append(f'{product.display_name}: {message}')
+        if len(failed) > 10:
+            lines.append(f'... and {len(failed) - 10} more (see Avancir Sync Error on each product)')
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Sync Complete' if not failed else 'Sync Finished With Errors',
+                'message': '\n'.join(lines),
+                'type': 'success' if not failed else 'warning',
+                'sticky': bool(failed),
+            }
+        }
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+
+class ResCompany(models.Model):
+    _inherit = 'res.company'
+
+    avancir_sync_enabled = fields.Boolean(
+        string='Sync to Avancir',
+        help='Sync this company\'s products as a separate job of the scheduled Avancir sync, '
+             'on its own workspace and location. Products of companies without it go with '
+             'the shared products to the global workspace.',
+    )
+    avancir_workspace_key = fields.Char(
+        string='Avancir Workspace Key',
+        help='Avancir workspace of this store, used while Sync to Avancir is on. '
+             'Leave empty to use the global workspace key.',
+    )
+    avancir_location_name = fields.Char(
+        string='Avancir Location',
+        help='Location display name sent with this company\'s items. '
+             'Defaults to the name of the company\'s first warehouse.',
+    )
+
+    def _avancir_workspace(self):
+        """Workspace key this company's products sync to, False for the global one."""
+        self.ensure_one()
+        return self.avancir_sync_enabled and self.avancir_workspace_key or False
+
+    def write(self, vals):
+        if not {'avancir_sync_enabled', 'avancir_workspace_key'} & set(vals):
+            return super().write(vals)
+        before = {company.id: company._avancir_workspace() for company in self}
+        res = super().write(vals)
+        moved = self.filtered(lambda company: company._avancir_workspace() != before[company.id])
+        if moved:
+            # Avancir ids are per workspace: the products are created anew
+            # in the new one rather than updated under ids it does not know
+            self.env['product.template']._avancir_forget_items(moved)
+        return res
@@ -48,6 +48,263 @@ class ResConfigSettings(models.TransientModel):
         default=24,
     )
 
+    avancir_http_pool_size = fields.Integer(
+        string='Connection Pool Size',
+        config_parameter='avancir_inventory.http_pool_size',
+        default=10,
+        help='Number of keep-alive connections kept open to Avancir per worker',
+    )
+    avancir_http_max_retries = fields.Integer(
+        string='Max Retries',
+        config_parameter='avancir_inventory.http_max_retries',
+        default=3,
+        help='Retries on 429/5xx responses and connection errors',
+    )
+    avancir_http_backoff_factor = fields.Float(
+        string='Retry Backoff (seconds)',
+        config_parameter='avancir_inventory.http_backoff_factor',
+        default=0.5,
+        help='Base delay for exponential backoff. A Retry-After header takes precedence.',
+    )
+    avancir_http_gzip = fields.Boolean(
+        string='Compress Requests',
+        config_parameter='avancir_inventory.http_gzip',
+        default=False,
+        help='Send large request bodies gzipped. If Avancir answers 415, the worker '
+             'falls back to plain JSON.',
+    )
+    avancir_http_gzip_min_bytes = fields.Integer(
+        string='Compress Above (bytes)',
+        config_parameter='avancir_inventory.http_gzip_min_bytes',
+        default=8192,
+        help='Smaller request bodies are sent uncompressed',
+    )
+    avancir_rate_limit = fields.Float(
+        string='Rate Limit (requests/s)',
+        config_parameter='avancir_inventory.rate_limit',
+        default=0,
+        help='Most requests per second each worker sends to Avancir. 0 disables the limit.',
+    )
+    avancir_rate_burst = fields.Integer(
+        string='Rate Limit Burst',
+        config_parameter='avancir_inventory.rate_burst',
+        default=10,
+        help='Requests that may go out back to back before the rate limit applies',
+    )
+    avancir_rate_max_wait = fields.Float(
+        string='Max Queue Wait (seconds)',
+        config_parameter='avancir_inventory.rate_max_wait',
+        default=5,
+        help='A request made from the web interface or the API that would wait longer than '
+             'this for a slot fails immediately instead',
+    )
+    avancir_rate_max_wait_background = fields.Float(
+        string='Max Queue Wait, Background (seconds)',
+        config_parameter='avancir_inventory.rate_max_wait_background',
+        default=120,
+        help='Same limit for crons and background syncs. Keep it above the Retry-After delays '
+             'Avancir sends so that background jobs wait them out instead of failing.',
+    )
+    avancir_breaker_threshold = fields.Integer(
+        string='Circuit Breaker Threshold',
+        config_parameter='avancir_inventory.breaker_threshold',
+        default=5,
+        help='Consecutive failed calls (connection errors, 429, 5xx) that open the circuit breaker',
+    )
+    avancir_breaker_reset = fields.Integer(
+        string='Circuit Breaker Cooldown (seconds)',
+        config_parameter='avancir_inventory.breaker_reset',
+        default=30,
+        help='How long an open breaker rejects calls before letting one probe request through',
+    )
+    avancir_metrics_token = fields.Char(
+        string='Metrics Token',
+        config_parameter='avancir_inventory.metrics_token',
+        help='Bearer token for the Prometheus endpoint /api/v1/rfid/metrics. '
+             'The endpoint is disabled while empty.',
+    )
+    avancir_breaker_status = fields.Char(
+        string='Circuit Breaker',
+        compute='_compute_avancir_breaker_status',
+        help='State of the circuit breaker of the Avancir account in this worker process, '
+             'shared by every workspace',
+    )
+
+    avancir_sync_concurrency = fields.Integer(
+        string='Parallel Bulk Requests',
+        config_parameter='avancir_inventory.sync_concurrency',
+        default=4,
+        help='Number of /items/bulkCreate batches sent to Avancir at the same time. Use 1 for serial sync.',
+    )
+
+    avancir_page_size = fields.Integer(
+        string='Page Size',
+        config_parameter='avancir_inventory.page_size',
+        default=200,
+        help='Items requested per page when reading Avancir lists',
+    )
+
+    avancir_batch_min_size = fields.Integer(
+        string='Min Batch Size',
+        config_parameter='avancir_inventory.batch_min_size',
+        default=10,
+        help='Smallest bulk call the adaptive batcher shrinks to, also its growth step',
+    )
+    avancir_batch_max_size = fields.Integer(
+        string='Max Batch Size',
+        config_parameter='avancir_inventory.batch_max_size',
+        default=500,
+        help='Largest bulk call, also the number of products per committed sync chunk',
+    )
+    avancir_batch_target_latency = fields.Float(
+        string='Target Batch Latency (seconds)',
+        config_parameter='avancir_inventory.batch_target_latency',
+        default=5,
+        help='Bulk calls slower than this halve the batch size; faster ones grow it',
+    )
+    avancir_batch_max_bytes = fields.Integer(
+        string='Max Batch Payload (bytes)',
+        config_parameter='avancir_inventory.batch_max_bytes',
+        default=1048576,
+        help='Batches are kept under this request body size',
+    )
+
+    avancir_company_concurrency = fields.Integer(
+        string='Parallel Stores',
+        config_parameter='avancir_inventory.company_concurrency',
+        default=4,
+        help='Companies synced at the same time when stores sync separately. '
+             'They share the parallel bulk requests, at least one each.',
+    )
+
+    avancir_sync_resume_after = fields.Integer(
+        string='Resume Interrupted Syncs After (minutes)',
+        config_parameter='avancir_inventory.sync_resume_after',
+        default=30,
+        help='A product sync with no finished chunk for this long is resumed by the next scheduled sync',
+    )
+
+    avancir_reconcile_concurrency = fields.Integer(
+        string='Parallel Reconciliations',
+        config_parameter='avancir_inventory.reconcile_concurrency',
+        default=4,
+        help='Warehouses reconciled at the same time by the nightly reconciliation',
+    )
+
+    avancir_transfer_batch_size = fields.Integer(
+        string='Transfer Batch Size',
+        config_parameter='avancir_inventory.transfer_batch_size',
+        default=100,
+        help='Location updates sent per /items/bulkUpdate call after a store transfer',
+    )
+
+    avancir_api_audit_sample_rate = fields.Float(
+        string='API Audit Sample Rate',
+        config_parameter='avancir_inventory.api_audit_sample_rate',
+        default=0.01,
+        help='Fraction (0 to 1) of RFID API calls written to the audit log. Nothing is stored in the database.',
+    )
+
+    avancir_cache_ttl_inventory = fields.Integer(
+        string='Inventory Cache TTL (seconds)',
+        config_parameter='avancir_inventory.cache_ttl_inventory',
+        default=10,
+        help='How long /api/v1/rfid/inventory responses are reused. 0 disables caching.',
+    )
+    avancir_cache_ttl_history = fields.Integer(
+        string='History Cache TTL (seconds)',
+        config_parameter='avancir_inventory.cache_ttl_history',
+        default=30,
+        help='How long item history responses are reused. 0 disables caching.',
+    )
+    avancir_cache_max_entries = fields.Integer(
+        string='Cache Size',
+        config_parameter='avancir_inventory.cache_max_entries',
+        default=1000,
+        help='Maximum cached responses per worker; least recently used entries are evicted first',
+    )
+
+    avancir_history_batch_size = fields.Integer(
+        string='History Batch Size',
+        config_parameter='avancir_inventory.history_batch_size',
+        default=100,
+        help='Item ids per /items/history/batch call; batches are fetched in parallel',
+    )
+    avancir_history_max_items = fields.Integer(
+        string='Max Items per History Request',
+        config_parameter='avancir_inventory.history_max_items',
+        default=5000,
+        help='Upper bound for the limit parameter of /api/v1/rfid/history/location',
+    )
+
+    avancir_mirror_enabled = fields.Boolean(
+        string='Local Mirror',
+        config_parameter='avancir_inventory.mirror_enabled',
+        default=False,
+        help='Keep a local copy of Avancir items and RFID activity, refreshed incrementally, '
+             'so reports and the RFID API (source=local) can query it without calling Avancir',
+    )
+
+    avancir_webhook_secret = fields.Char(
+        string='Webhook Secret',
+        config_parameter='avancir_inventory.webhook_secret',
+        help='Shared secret Avancir sends in the X-Avancir-Secret header to /api/v1/rfid/webhook. '
+             'The webhook is disabled while empty.',
+    )
+    avancir_webhook_flush_size = fields.Integer(
+        string='Webhook Flush Size',
+        config_parameter='avancir_inventory.webhook_flush_size',
+        default=500,
+        help='Buffered webhook events written to the database in one insert',
+    )
+    avancir_webhook_flush_interval_ms = fields.Integer(
+        string='Webhook Flush Interval (ms)',
+        config_parameter='avancir_inventory.webhook_flush_interval_ms',
+        default=1000,
+        help='Longest time a received event waits in the buffer before being written',
+    )
+
+    avancir_retention_days = fields.Integer(
+        string='Keep Sync History (days)',
+        config_parameter='avancir_inventory.retention_days',
+        default=180,
+        help='Sync runs older than this are deleted. 0 keeps them regardless of age.',
+    )
+    avancir_retention_count = fields.Integer(
+        string='Keep Runs per Type',
+        config_parameter='avancir_inventory.retention_count',
+        default=0,
+        help='Only the newest runs of each sync type are kept. 0 means no limit.',
+    )
+    avancir_error_log_max_chars = fields.Integer(
+        string='Inline Error Log Size',
+        config_parameter='avancir_inventory.error_log_max_chars',
+        default=10000,
+        help='Longer error logs are moved to a compressed attachment. 0 keeps them inline.',
+    )
+
+    def _compute_avancir_breaker_status(self):
+        snapshot = self.env['avancir.sync']._get_client().breaker.snapshot()
+        if snapshot['state'] == 'closed':
+            status = 'Closed (requests flowing)'
+        elif snapshot['state'] == 'half_open':
+            status = 'Half-open (probing for recovery)'
+        else:
+            status = f"Open, next probe in {snapshot['retry_in']}s: {snapshot['last_error']}"
+        if snapshot['failures'] and snapshot['state'] == 'closed':
+            status += f" - {snapshot['failures']} recent failure(s)"
+        for settings in self:
+            settings.avancir_breaker_status = status
+
+    def action_reset_avancir_breaker(self):
+        """Close the circuit breaker so requests go out again right away."""
+        self.ensure_one()
+        self.env['avancir.sync']._get_client().breaker.reset()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'reload',
+        }
+
     def action_test_avancir_connection(self):
         """Test the Avancir API connection."""
         self.ensure_one()
@@ -81,14 +338,32 @@ class ResConfigSettings(models.TransientModel):
         """Manually trigger product sync to Avancir."""
         self.ensure_one()
         sync_model = self.env['avancir.sync']
-        result = sync_model.sync_all_products()
+        result = sync_model.sync_all_companies()
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': 'Sync Complete',
-                'message': f"Created: {result.get('created', 0)}, Updated: {result.get('updated', 0)}, Errors: {result.get('errors', 0)}",
+                'message': f"Created: {result.get('created', 0)}, Updated: {result.get('updated', 0)}, "
+                           f"Skipped: {result.get('skipped', 0)}, Errors: {result.get('errors', 0)}",
                 'type': 'success' if result.get('errors', 0) == 0 else 'warning',
                 'sticky': True,
             }
         }
+
+    def action_preview_avancir_sync(self):
+        """Report what an incremental sync would send, without calling Avancir."""
+        self.ensure_one()
+        result = self.env['avancir.sync'].sync_all_products(incremental=True, dry_run=True)
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Sync Preview',
+                'message': f"Would create: {result.get('would_create', 0)}, "
+                           f"Would update: {result.get('would_update', 0)}, "
+                           f"Unchanged: {result.get('skipped', 0)}, Errors: {result.get('errors', 0)}",
+                'type': 'info',
+                'sticky': True,
+            }
+        }
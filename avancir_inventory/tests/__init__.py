@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_avancir_benchmark
+from . import test_avancir_client
+from . import test_avancir_sync
+from . import test_avancir_tools
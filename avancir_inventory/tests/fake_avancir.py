@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+In-process fake of the Avancir API, for tests and benchmarks.
+
+Serves the endpoints the module calls (auth/login, items with offset or
+cursor pagination, item create, PATCH, bulkCreate, bulkUpdate, item
+history and history/batch) from memory, on a local port, in a daemon
+thread. Latency, injected errors, a server-side rate limit and gzip
+support are configurable, and every request is counted::
+
+    with FakeAvancir(latency=0.02, error_rate=0.01) as fake:
+        fake.seed_items(1000, location='WH')
+        ...point avancir_inventory.api_url at fake.url...
+        fake.stats()
+"""
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+API_PREFIX = '/api/v1'
+
+ITEM_PATH = re.compile(r'^/items/(?P<item_id>[^/]+)$')
+ITEM_HISTORY_PATH = re.compile(r'^/items/(?P<item_id>[^/]+)/history$')
+
+
+class FakeAvancir:
+    """
+    Fake Avancir server.
+
+    Args:
+        latency: Seconds added to every response
+        error_rate: Share of requests (0 to 1) answered with error_status
+        error_status: Status of injected errors
+        rate_limit: Requests per second accepted before answering 429 with
+            Retry-After; 0 disables the limit
+        pagination: 'offset' (meta.total) or 'cursor' (meta.nextCursor)
+        accept_gzip: False answers 415 to gzipped request bodies
+        history_per_item: Activity records generated for each item
+        max_page_size: Largest page served by GET /items
+        seed: Seed of the error injection
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=503, rate_limit=0,
+                 pagination='offset', accept_gzip=True, history_per_item=3,
+                 max_page_size=1000, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit = rate_limit
+        self.pagination = pagination
+        self.accept_gzip = accept_gzip
+        self.history_per_item = history_per_item
+        self.max_page_size = max_page_size
+        self.items = {}
+        self.tokens = set()
+        self._random = random.Random(seed)
+        self._fail_next = []
+        self._window = (0, 0)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self.reset_stats()
+
+    # ------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------
+
+    def start(self):
+        fake = self
+
+        class Handler(_Handler):
+            server_fake = fake
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='fake-avancir', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self):
+        """Base URL to store in avancir_inventory.api_url."""
+        return f'http://127.0.0.1:{self._server.server_port}{API_PREFIX}'
+
+    # ------------------------------------------------------------
+    # Data and fault control
+    # ------------------------------------------------------------
+
+    def seed_items(self, count, location='WH/Stock', sku_prefix='SKU', status='Active'):
+        """
+        Add ``count`` items at ``location`` and return their ids.
+
+        SKUs are ``sku_prefix`` followed by the item's 7-digit position in
+        this call, so callers can create matching Odoo products.
+        """
+        now = _timestamp()
+        ids = []
+        with self._lock:
+            for n in range(count):
+                item_id = uuid.uuid4().hex
+                self.items[item_id] = {
+                    'id': item_id,
+                    'name': f'{sku_prefix} item {n}',
+                    'sku': f'{sku_prefix}{n:07d}',
+                    'location': {'display_name': location},
+                    'status': {'display_name': status},
+                    'rfid_tag': item_id[:24].upper(),
+                    'last_scanned_at': now,
+                    'updated_at': now,
+                }
+                ids.append(item_id)
+        return ids
+
+    def clear(self):
+        """Drop every item; issued tokens stay valid."""
+        with self._lock:
+            self.items.clear()
+
+    def fail_next(self, count=1, status=503):
+        """Answer the next ``count`` API requests (not logins) with ``status``."""
+        with self._lock:
+            self._fail_next.extend([status] * count)
+
+    def expire_tokens(self):
+        """Invalidate every session token, as a server-side expiry would."""
+        with self._lock:
+            self.tokens.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self._requests = Counter()
+            self._statuses = Counter()
+            self._bytes_in = 0
+            self._bytes_out = 0
+            self._gzipped = 0
+            self._started = time.monotonic()
+
+    def stats(self):
+        """Request counters since the last reset_stats()."""
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            total = sum(self._requests.values())
+            return {
+                'requests': total,
+                'by_endpoint': dict(self._requests),
+                'statuses': dict(self._statuses),
+                'bytes_in': self._bytes_in,
+                'bytes_out': self._bytes_out,
+                'gzipped_requests': self._gzipped,
+                'elapsed': elapsed,
+                'requests_per_second': total / elapsed if elapsed else 0.0,
+            }
+
+    # ------------------------------------------------------------
+    # Request handling, called from the handler threads
+    # ------------------------------------------------------------
+
+    def _record(self, endpoint, status, bytes_in, bytes_out, gzipped):
+        with self._lock:
+            self._requests[endpoint] += 1
+            self._statuses[status] += 1
+            self._bytes_in += bytes_in
+            self._bytes_out += bytes_out
+            self._gzipped += gzipped
+
+    def _injected_error(self):
+        """Status of an error to inject into this request, or None."""
+        with self._lock:
+            if self._fail_next:
+                return self._fail_next.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def _throttled(self):
+        """Seconds until the next request is accepted, or 0 to accept this one."""
+        if not self.rate_limit:
+            return 0
+        with self._lock:
+            second = int(time.monotonic())
+            window, count = self._window
+            if window != second:
+                window, count = second, 0
+            if count >= self.rate_limit:
+                return 1
+            self._window = (window, count + 1)
+        return 0
+
+    def handle(self, method, path, query, body, token):
+        """Route one request and return (endpoint, status, payload, headers)."""
+        if path == '/auth/login' and method == 'POST':
+            token = uuid.uuid4().hex
+            with self._lock:
+                self.tokens.add(token)
+            return 'auth/login', 200, {'data': {'idToken': token}}, {}
+
+        if token not in self.tokens:
+            return 'unauthorized', 401, {'error': 'Invalid session token'}, {}
+        retry_after = self._throttled()
+        if retry_after:
+            return 'throttled', 429, {'error': 'Too many requests'}, {'Retry-After': str(retry_after)}
+        status = self._injected_error()
+        if status:
+            return 'injected', status, {'error': 'Injected error'}, {}
+
+        if path == '/items' and method == 'GET':
+            return 'items', 200, self._list_items(query), {}
+        if path == '/items' and method == 'POST':
+            return 'items/create', 200, {'data': self._create_item(body)}, {}
+        if path == '/items/bulkCreate' and method == 'POST':
+            return 'items/bulkCreate', 200, {'data': [self._create_item(item) for item in body['items']]}, {}
+        if path == '/items/bulkUpdate' and method == 'POST':
+            missing = [item.get('id') for item in body['items'] if item.get('id') not in self.items]
+            if missing:
+                return 'items/bulkUpdate', 404, {'error': f'Unknown items: {missing[:10]}'}, {}
+            return 'items/bulkUpdate', 200, {'data': [self._update_item(item['id'], item)
+                                                      for item in body['items']]}, {}
+        if path == '/items/history/batch' and method == 'POST':
+            history = [record for item_id in body.get('itemIds', []) for record in self._history(item_id)]
+            return 'items/history/batch', 200, {'data': history}, {}
+
+        match = ITEM_HISTORY_PATH.match(path)
+        if match and method == 'GET':
+            return 'items/history', 200, {'data': self._history(match['item_id'])}, {}
+        match = ITEM_PATH.match(path)
+        if match and method == 'PATCH':
+            if match['item_id'] not in self.items:
+                return 'items/patch', 404, {'error': 'Item not found'}, {}
+            return 'items/patch', 200, {'data': self._update_item(match['item_id'], body)}, {}
+
+        return 'not_found', 404, {'error': f'No route for {method} {path}'}, {}
+
+    def _list_items(self, query):
+        limit = min(int(query.get('limit', 200)), self.max_page_size)
+        with self._lock:
+            items = list(self.items.values())
+        for field in ('location', 'status'):
+            if query.get(field):
+                items = [item for item in items if (item.get(field) or {}).get('display_name') == query[field]]
+        if query.get('updatedSince'):
+            items = [item for item in items if item['updated_at'] > query['updatedSince']]
+
+        if self.pagination == 'cursor':
+            start = int(query.get('cursor') or 0)
+            page = items[start:start + limit]
+            next_cursor = str(start + limit) if start + limit < len(items) else None
+            return {'data': page, 'meta': {'nextCursor': next_cursor}}
+        offset = int(query.get('offset', 0))
+        return {'data': items[offset:offset + limit], 'meta': {'total': len(items)}}
+
+    def _create_item(self, values):
+        item_id = uuid.uuid4().hex
+        item = {**values, 'id': item_id, 'updated_at': _timestamp()}
+        with self._lock:
+            self.items[item_id] = item
+        return item
+
+    def _update_item(self, item_id, values):
+        with self._lock:
+            item = self.items[item_id]
+            item.update(values, updated_at=_timestamp())
+            return dict(item)
+
+    def _history(self, item_id):
+        """Deterministic activity records of an item."""
+        item = self.items.get(item_id)
+        if item is None:
+            return []
+        location = (item.get('location') or {}).get('display_name')
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        return [{
+            'id': f'{item_id}-{n}',
+            'itemId': item_id,
+            'type': 'scan',
+            'location': location,
+            'timestamp': (start + timedelta(hours=n)).isoformat().replace('+00:00', 'Z'),
+        } for n in range(self.history_per_item)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        fake = self.server_fake
+        url = urlsplit(self.path)
+        path = url.path[len(API_PREFIX):] if url.path.startswith(API_PREFIX) else url.path
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        raw = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        gzipped = self.headers.get('Content-Encoding') == 'gzip'
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        if gzipped and not fake.accept_gzip:
+            endpoint, status, payload, headers = 'unsupported_encoding', 415, {'error': 'gzip not accepted'}, {}
+        else:
+            try:
+                body = json.loads(gzip.decompress(raw) if gzipped else raw) if raw else {}
+            except ValueError:
+                endpoint, status, payload, headers = 'bad_request', 400, {'error': 'Invalid JSON'}, {}
+            else:
+                try:
+                    endpoint, status, payload, headers = fake.handle(
+                        method, path, query, body, self.headers.get('x-session-token'))
+                except (AttributeError, KeyError, TypeError, ValueError) as e:
+                    endpoint, status, payload, headers = 'bad_request', 400, {'error': repr(e)}, {}
+
+        data = json.dumps(payload).encode()
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            data = gzip.compress(data, compresslevel=1)
+            headers = {**headers, 'Content-Encoding': 'gzip'}
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        fake._record(endpoint, status, len(raw), len(data), gzipped)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
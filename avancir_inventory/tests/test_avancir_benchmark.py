@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput benchmarks of the Avancir integration against FakeAvancir.
+
+Not part of the standard test run. Run them with::
+
+    odoo-bin -d <db> -i avancir_inventory --test-tags avancir_benchmark --stop-after-init
+
+AVANCIR_BENCH_SIZES (default 1000,10000,100000) sets the item counts and
+AVANCIR_BENCH_LATENCY (seconds, default 0) the fake server's latency.
+Each measurement logs its wall time, Avancir requests per second, SQL
+queries and peak Python memory (tracemalloc, which also slows the run
+down); a summary table is logged at the end.
+"""
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from odoo.tests import HttpCase, tagged
+
+from .fake_avancir import FakeAvancir
+
+_logger = logging.getLogger(__name__)
+
+SIZES = [int(size) for size in os.environ.get('AVANCIR_BENCH_SIZES', '1000,10000,100000').split(',')]
+LATENCY = float(os.environ.get('AVANCIR_BENCH_LATENCY', 0))
+
+# Item ids passed to /api/v1/rfid/history, bounded by the URL length
+HISTORY_IDS = 200
+CREATE_BATCH = 1000
+
+
+@tagged('-standard', 'post_install', '-at_install', 'avancir_benchmark')
+class TestAvancirBenchmark(HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeAvancir(latency=LATENCY).start()
+        cls.addClassCleanup(cls.fake.stop)
+
+        ICP = cls.env['ir.config_parameter'].sudo()
+        for key, value in {
+            'api_url': cls.fake.url,
+            'username': 'benchmark',
+            'password': 'benchmark',
+            'workspace_key': 'benchmark',
+            'sync_enabled': 'True',
+            'http_gzip': 'True',
+            'api_audit_sample_rate': '0',
+            # Measure the upstream calls, not the response cache
+            'cache_ttl_inventory': '0',
+            'cache_ttl_history': '0',
+            'history_max_items': str(max(SIZES)),
+        }.items():
+            ICP.set_param(f'avancir_inventory.{key}', value)
+
+        cls.Sync = cls.env['avancir.sync']
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.store = cls.env['stock.warehouse'].create({'name': 'Benchmark Store', 'code': 'BNCH'})
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        lines = [f'{"benchmark":<40} {"items":>7} {"seconds":>8} {"requests":>8} {"req/s":>8} '
+                 f'{"queries":>8} {"peak MiB":>8}']
+        for row in cls.results:
+            lines.append(f'{row["name"]:<40} {row["size"]:>7} {row["seconds"]:>8.2f} {row["requests"]:>8} '
+                         f'{row["requests_per_second"]:>8.1f} {row["queries"]:>8} {row["peak_mib"]:>8.1f}')
+        _logger.info('Avancir benchmark results:\n%s', '\n'.join(lines))
+        super().tearDownClass()
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+
+    @contextmanager
+    def _isolated(self):
+        """Roll back what one benchmark size created, here and on the fake server."""
+        with self.env.cr.savepoint() as savepoint:
+            try:
+                yield
+            finally:
+                savepoint.rollback()
+        self.env.invalidate_all()
+        self.fake.clear()
+
+    def _create_products(self, size, prefix, item_ids=None):
+        """Create ``size`` sellable products with SKUs matching FakeAvancir.seed_items."""
+        Product = self.env['product.template'].with_context(tracking_disable=True)
+        products = Product.browse()
+        for start in range(0, size, CREATE_BATCH):
+            vals_list = []
+            for n in range(start, min(size, start + CREATE_BATCH)):
+                vals = {
+                    'name': f'{prefix} product {n}',
+                    'default_code': f'{prefix}{n:07d}',
+                    'sale_ok': True,
+                    'company_id': self.env.company.id,
+                }
+                if item_ids:
+                    vals['avancir_item_id'] = item_ids[n]
+                vals_list.append(vals)
+            products |= Product.create(vals_list)
+        self.env.flush_all()
+        return products
+
+    def _measure(self, name, size, func):
+        """Run ``func`` once and record its time, Avancir requests, queries and peak memory."""
+        self.env.flush_all()
+        self.fake.reset_stats()
+        queries = self.cr.sql_log_count
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            result = func()
+            self.env.flush_all()
+        finally:
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        stats = self.fake.stats()
+        row = {
+            'name': name,
+            'size': size,
+            'seconds': seconds,
+            'requests': stats['requests'],
+            'requests_per_second': stats['requests'] / seconds if seconds else 0.0,
+            'queries': self.cr.sql_log_count - queries,
+            'peak_mib': peak / 2 ** 20,
+            'statuses': stats['statuses'],
+        }
+        self.results.append(row)
+        _logger.info('%s, %d items: %.2fs, %d requests (%.1f/s), %d queries, %.1f MiB peak, statuses %s',
+                     name, size, seconds, row['requests'], row['requests_per_second'],
+                     row['queries'], row['peak_mib'], row['statuses'])
+        return result
+
+    def _get_json(self, url):
+        response = self.url_open(url, timeout=3600)
+        self.assertEqual(response.status_code, 200, response.text[:500])
+        return response.json()
+
+    # ------------------------------------------------------------
+    # Benchmarks
+    # ------------------------------------------------------------
+
+    def test_sync_all_products(self):
+        for size in SIZES:
+            with self.subTest(size=size), self._isolated():
+                self._create_products(size, 'SYNC')
+                result = self._measure('sync_all_products (create)', size,
+                                       lambda: self.Sync.sync_all_products(incremental=True))
+                self.assertGreaterEqual(result['created'], size)
+                result = self._measure('sync_all_products (update)', size,
+                                       lambda: self.Sync.sync_all_products(force=True))
+                self.assertGreaterEqual(result['updated'], size)
+
+    def test_reconcile_pos_inventory(self):
+        for size in SIZES:
+            with self.subTest(size=size), self._isolated():
+                self._create_products(size, 'REC')
+                self.fake.seed_items(size, location=self.warehouse.name, sku_prefix='REC')
+                sales = {f'REC{n:07d}': 1 for n in range(0, size, 10)}
+                result = self._measure('reconcile_pos_inventory', size,
+                                       lambda: self.Sync.reconcile_pos_inventory(
+                                           self.warehouse.id, pos_sales_data=sales))
+                self.assertEqual(result['matched'], size)
+
+    def test_transfer_inventory(self):
+        for size in SIZES:
+            with self.subTest(size=size), self._isolated():
+                item_ids = self.fake.seed_items(size, location=self.warehouse.name, sku_prefix='TRF')
+                products = self._create_products(size, 'TRF', item_ids)
+                result = self._measure('transfer_inventory', size,
+                                       lambda: self.Sync.transfer_inventory(
+                                           self.warehouse.id, self.store.id, products.ids))
+                # The location updates normally go out after the commit,
+                # which a test transaction never reaches
+                transfer = self.Sync.browse(result['sync_record_id'])
+                self._measure('transfer location updates', size, transfer._push_transfer_lines)
+                self.assertEqual(transfer.products_updated, size)
+
+    def test_rfid_controllers(self):
+        location = 'Benchmark Location'
+        path = quote(location)
+        for size in SIZES:
+            with self.subTest(size=size), self._isolated():
+                item_ids = self.fake.seed_items(size, location=location, sku_prefix='API')
+                data = self._measure('GET /api/v1/rfid/inventory', size,
+                                     lambda: self._get_json(f'/api/v1/rfid/inventory/{path}'))
+                self.assertEqual(len(data['data']), size)
+                data = self._measure('GET /api/v1/rfid/history/location', size,
+                                     lambda: self._get_json(f'/api/v1/rfid/history/location/{path}?limit={size}'))
+                self.assertEqual(data['history_count'], size * self.fake.history_per_item)
+                ids = ','.join(item_ids[:HISTORY_IDS])
+                data = self._measure('GET /api/v1/rfid/history', min(size, HISTORY_IDS),
+                                     lambda: self._get_json(f'/api/v1/rfid/history?item_ids={ids}'))
+                self.assertEqual(data['history_count'], min(size, HISTORY_IDS) * self.fake.history_per_item)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of AvancirClient against FakeAvancir: retries, Retry-After, token
+expiry, the 415 fallback of gzipped bodies and the account-wide guards.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+from odoo.tools import mute_logger
+
+from ..tools import client as client_module
+from ..tools.client import AvancirClient, backoff_delay, parse_retry_after
+from ..tools.metrics import client_metrics
+from ..tools.resilience import AvancirUnavailable
+from .fake_avancir import FakeAvancir
+
+
+@tagged('post_install', '-at_install')
+class TestAvancirClient(BaseCase):
+
+    def _start_fake(self, **kwargs):
+        fake = FakeAvancir(**kwargs).start()
+        self.addCleanup(fake.stop)
+        self.addCleanup(client_module._gzip_rejected.discard, fake.url)
+        return fake
+
+    def _client(self, fake, **kwargs):
+        # One username per test: the rate limiter and breaker are shared per account
+        options = {
+            'api_url': fake.url,
+            'username': self.id(),
+            'password': 'secret',
+            'dbname': 'avancir_test',
+            'backoff_factor': 0.01,
+            **kwargs,
+        }
+        return AvancirClient(**options)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('2'), 2.0)
+        self.assertEqual(parse_retry_after('-5'), 0.0)
+        self.assertIsNone(parse_retry_after(''))
+        self.assertIsNone(parse_retry_after('soon'))
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        self.assertAlmostEqual(parse_retry_after(format_datetime(when, usegmt=True)), 30, delta=2)
+
+    def test_backoff_delay(self):
+        self.assertEqual(backoff_delay(0, 0.5, retry_after=3), 3)
+        self.assertEqual(backoff_delay(0, 0.5, retry_after=3600), client_module.MAX_BACKOFF)
+        self.assertLessEqual(backoff_delay(10, 0.5), client_module.MAX_BACKOFF)
+        self.assertGreaterEqual(backoff_delay(1, 0.5), 1.0)
+
+    def test_transient_error_retried(self):
+        fake = self._start_fake()
+        fake.fail_next(2, status=503)
+        result = self._client(fake).request('GET', '/items')
+        self.assertEqual(result['data'], [])
+        self.assertEqual(fake.stats()['statuses'], {503: 2, 200: 2})
+
+    @mute_logger('odoo.addons.avancir_inventory.tools.client')
+    def test_post_not_retried_after_server_error(self):
+        """A 500 may have been processed: a POST is not replayed."""
+        fake = self._start_fake()
+        fake.fail_next(1, status=500)
+        with self.assertRaises(Exception):
+            self._client(fake).request('POST', '/items', {'name': 'Item'})
+        self.assertEqual(fake.stats()['statuses'], {200: 1, 500: 1})
+        self.assertEqual(fake.items, {})
+
+    def test_expired_token_refreshed(self):
+        fake = self._start_fake()
+        client = self._client(fake)
+        client.request('GET', '/items')
+        fake.expire_tokens()
+        client.request('GET', '/items')
+        stats = fake.stats()
+        self.assertEqual(stats['by_endpoint']['auth/login'], 2)
+        self.assertEqual(stats['statuses'][401], 1)
+
+    def test_gzip_rejected_falls_back_to_json(self):
+        fake = self._start_fake(accept_gzip=False)
+        client = self._client(fake, gzip_enabled=True, gzip_min_bytes=0)
+        client.request('POST', '/items', {'name': 'First'})
+        client.request('POST', '/items', {'name': 'Second'})
+
+        stats = fake.stats()
+        self.assertEqual(stats['gzipped_requests'], 1, 'only the first body went out gzipped')
+        self.assertEqual(stats['statuses'][415], 1)
+        self.assertEqual(sorted(item['name'] for item in fake.items.values()), ['First', 'Second'])
+
+    def test_gzip_accepted(self):
+        fake = self._start_fake()
+        client = self._client(fake, gzip_enabled=True, gzip_min_bytes=0)
+        client.request('POST', '/items/bulkCreate', {'items': [{'name': f'Item {n}'} for n in range(200)]})
+        self.assertEqual(fake.stats()['gzipped_requests'], 1)
+        self.assertEqual(len(fake.items), 200)
+        self.assertGreater(client.bytes_saved, 0)
+
+    def test_retry_after_honored(self):
+        """Background callers wait out the Retry-After of a 429 and succeed."""
+        fake = self._start_fake(rate_limit=2)
+        client = self._client(fake, rate_max_wait=5)
+        started = time.monotonic()
+        for _i in range(6):
+            client.request('GET', '/items')
+        self.assertIn(429, fake.stats()['statuses'])
+        self.assertGreaterEqual(time.monotonic() - started, 0.5)
+
+    def test_retry_after_fails_fast_past_max_wait(self):
+        """Interactive callers get AvancirUnavailable rather than waiting out a long Retry-After."""
+        fake = self._start_fake(rate_limit=2)
+        client = self._client(fake, rate_max_wait=0.1)
+        with self.assertRaises(AvancirUnavailable):
+            for _i in range(6):
+                client.request('GET', '/items')
+
+    @mute_logger('odoo.addons.avancir_inventory.tools.client')
+    def test_breaker_opens_on_failures(self):
+        fake = self._start_fake()
+        client = self._client(fake, max_retries=0, breaker_threshold=2, breaker_reset=60)
+        fake.fail_next(2, status=503)
+        for _i in range(2):
+            with self.assertRaises(Exception):
+                client.request('GET', '/items')
+        requests_before = fake.stats()['requests']
+        with self.assertRaises(AvancirUnavailable):
+            client.request('GET', '/items')
+        self.assertEqual(fake.stats()['requests'], requests_before, 'the open breaker sends nothing')
+        client.breaker.reset()
+        client.request('GET', '/items')
+
+    def test_guards_shared_across_workspaces(self):
+        fake = self._start_fake()
+        first = self._client(fake, workspace_key='store-1')
+        second = self._client(fake, workspace_key='store-2')
+        self.assertIs(first.breaker, second.breaker)
+        self.assertIs(first.limiter, second.limiter)
+        self.assertNotEqual(first._token_key(), second._token_key())
+
+    def test_metrics_per_client(self):
+        fake = self._start_fake()
+        first = self._client(fake)
+        second = self._client(fake)
+        before = sum(row['requests'] for row in client_metrics.summary()['endpoints'])
+        first.request('GET', '/items')
+        second.request('GET', '/items')
+        second.request('GET', '/items')
+
+        def requests(metrics):
+            return sum(row['requests'] for row in metrics.summary()['endpoints'] if row['endpoint'] == '/items')
+        self.assertEqual(requests(first.metrics), 1)
+        self.assertEqual(requests(second.metrics), 2)
+        after = sum(row['requests'] for row in client_metrics.summary()['endpoints'])
+        self.assertGreaterEqual(after - before, 3, 'calls still count in the process-wide metrics')
+
+    def test_iter_items(self):
+        fake = self._start_fake(max_page_size=10)
+        fake.seed_items(25, location='Store')
+        fake.seed_items(5, location='Elsewhere')
+        items = list(self._client(fake).iter_items('/items', {'location': 'Store'}, page_size=10))
+        self.assertEqual(len(items), 25)
+        self.assertEqual(fake.stats()['by_endpoint']['items'], 3)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the chunked product sync against FakeAvancir: chunk planning,
+delta skipping, resuming failed chunks and the resume guards.
+"""
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import mute_logger
+
+from .fake_avancir import FakeAvancir
+
+# Loggers reporting the failures the tests inject
+FAILURE_LOGGERS = ('odoo.addons.avancir_inventory.tools.client', 'odoo.addons.avancir_inventory.models.avancir_sync')
+
+
+@tagged('post_install', '-at_install')
+class TestAvancirSync(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.fake = FakeAvancir().start()
+        cls.addClassCleanup(cls.fake.stop)
+
+        ICP = cls.env['ir.config_parameter'].sudo()
+        for key, value in {
+            'api_url': cls.fake.url,
+            'username': 'sync-test',
+            'password': 'sync-test',
+            'workspace_key': 'sync-test',
+            'sync_enabled': 'True',
+            # One call per chunk, no replay: injected errors fail the chunk they hit
+            'http_max_retries': '0',
+            'sync_concurrency': '1',
+            'batch_size.items.bulkCreate': '100',
+            'batch_size.items.bulkUpdate': '100',
+        }.items():
+            ICP.set_param(f'avancir_inventory.{key}', value)
+
+        cls.Sync = cls.env['avancir.sync']
+        cls.company = cls.env['res.company'].create({'name': 'Avancir Test Store'})
+        cls.products = cls.env['product.template'].create([{
+            'name': f'Avancir test product {n:02d}',
+            'default_code': f'AVT{n:02d}',
+            'sale_ok': True,
+            'company_id': cls.company.id,
+        } for n in range(25)]).sorted('name')
+
+    def setUp(self):
+        super().setUp()
+        self.fake.clear()
+        self.fake.reset_stats()
+
+    def _modify(self, products, vals):
+        """Edit products as if after their last sync."""
+        products.write(vals)
+        # The test transaction never moves write_date past the sync time
+        # (cr.now() is the transaction start), so move the sync back instead
+        products.flush_recordset()
+        self.env.cr.execute("""
+            UPDATE product_template SET avancir_last_sync = avancir_last_sync - interval '1 hour'
+             WHERE id IN %s
+        """, [tuple(products.ids)])
+        products.invalidate_recordset(['avancir_last_sync'])
+
+    def _sync(self, **kwargs):
+        result = self.Sync.sync_all_products(company_id=self.company.id, batch_size=10, **kwargs)
+        record = self.Sync.search([('company_id', '=', self.company.id)], order='id desc', limit=1)
+        return result, record
+
+    def test_chunks_planned_and_sent(self):
+        result, record = self._sync()
+
+        self.assertEqual(result, {'created': 25, 'updated': 0, 'skipped': 0, 'errors': 0})
+        self.assertEqual(record.chunk_count, 3)
+        self.assertEqual(record.chunk_ids.mapped('product_count'), [10, 10, 5])
+        self.assertEqual(set(record.chunk_ids.mapped('state')), {'done'})
+        self.assertEqual(record.checkpoint, 3)
+        self.assertEqual(record.state, 'done')
+        self.assertEqual(self.fake.stats()['by_endpoint']['items/bulkCreate'], 3)
+        self.assertTrue(all(self.products.mapped('avancir_item_id')))
+        self.assertEqual(set(self.products.mapped('avancir_item_id')) - set(self.fake.items), set())
+        self.assertTrue(record.client_metrics_html)
+
+    def test_delta_sync_skips_synced_products(self):
+        self._sync()
+        self._modify(self.products[:3], {'list_price': 99})
+
+        result, record = self._sync(incremental=True)
+        self.assertEqual(result, {'created': 0, 'updated': 3, 'skipped': 22, 'errors': 0})
+        self.assertEqual(record.chunk_count, 1)
+        self.assertEqual(record.products_filtered, 22)
+
+        result, _record = self._sync(incremental=True)
+        self.assertEqual(result['skipped'], 25)
+
+    def test_unchanged_payload_marked_synced(self):
+        self._sync()
+        # An edit that does not change what is sent to Avancir
+        self._modify(self.products, {'description_sale': 'Not sent to Avancir'})
+        result, record = self._sync(incremental=True)
+        self.assertEqual(result['skipped'], 25)
+        self.assertEqual(record.products_filtered, 0)
+
+        _result, record = self._sync(incremental=True)
+        self.assertEqual(record.products_filtered, 25, 'unchanged payloads are not selected again')
+
+    def test_unchanged_payloads_skipped(self):
+        self._sync()
+        self.fake.reset_stats()
+        result, record = self._sync()
+        self.assertEqual(result, {'created': 0, 'updated': 0, 'skipped': 25, 'errors': 0})
+        self.assertEqual(sum(record.chunk_ids.mapped('skipped_count')), 25)
+        self.assertEqual(self.fake.stats()['requests'], 0)
+
+    def test_workspace_switch_recreates_items(self):
+        self._sync()
+        self.company.write({'avancir_sync_enabled': True, 'avancir_workspace_key': 'store-switch'})
+        self.assertFalse(any(self.products.mapped('avancir_item_id')))
+        self.assertFalse(any(self.products.mapped('avancir_payload_hash')))
+
+        result, _record = self._sync(incremental=True)
+        self.assertEqual(result, {'created': 25, 'updated': 0, 'skipped': 0, 'errors': 0})
+
+    @mute_logger(*FAILURE_LOGGERS)
+    def test_failed_chunk_resumed(self):
+        self.fake.fail_next(1, status=500)
+        result, record = self._sync()
+
+        self.assertEqual(result['created'], 15)
+        self.assertEqual(result['errors'], 10)
+        self.assertEqual(record.state, 'error')
+        self.assertEqual(record.chunk_ids.mapped('state'), ['failed', 'done', 'done'])
+        self.assertEqual(record.checkpoint, 0)
+        failed = record.chunk_ids[0].product_ids
+        self.assertFalse(any(failed.mapped('avancir_item_id')))
+        self.assertTrue(all(failed.mapped('avancir_sync_error')))
+
+        record.action_resume_sync()
+        self.assertEqual(record.state, 'done')
+        self.assertEqual(record.checkpoint, 3)
+        self.assertEqual(record.products_created, 25)
+        self.assertEqual(record.errors, 0)
+        self.assertEqual(record.chunk_ids[0].attempts, 2)
+        self.assertTrue(all(self.products.mapped('avancir_item_id')))
+        self.assertFalse(any(self.products.mapped('avancir_sync_error')))
+        self.assertEqual(len(self.fake.items), 25)
+
+    @mute_logger(*FAILURE_LOGGERS)
+    def test_skipped_not_recounted_on_resume(self):
+        self._sync()
+        # Half of each chunk changes, the other half is skipped as unchanged
+        self.products[::2].write({'list_price': 42})
+        self.fake.fail_next(1, status=500)
+        result, record = self._sync()
+        self.assertEqual(result['skipped'], 12)
+        self.assertEqual(record.chunk_ids[0].state, 'failed')
+
+        record.action_resume_sync()
+        self.assertEqual(record.state, 'done')
+        self.assertEqual(record.products_skipped, 12)
+        self.assertEqual(record.products_updated, 13)
+
+    @mute_logger(*FAILURE_LOGGERS)
+    def test_resume_refused_while_running(self):
+        self.fake.fail_next(1, status=500)
+        _result, record = self._sync()
+        # Another worker just checkpointed this run
+        record.write({'state': 'running'})
+        with self.assertRaises(UserError):
+            record.action_resume_sync()
+        self.assertEqual(record.chunk_ids[0].state, 'failed')
+
+        self.env['ir.config_parameter'].sudo().set_param('avancir_inventory.sync_resume_after', '0')
+        record.action_resume_sync()
+        self.assertEqual(record.state, 'done')
+
+    @mute_logger(*FAILURE_LOGGERS)
+    def test_resume_interrupted_syncs(self):
+        self.fake.fail_next(1, status=500)
+        _result, record = self._sync()
+        record.write({'state': 'running'})
+        self.assertFalse(self.Sync._resume_interrupted_syncs(), 'a fresh run is left alone')
+
+        self.env['ir.config_parameter'].sudo().set_param('avancir_inventory.sync_resume_after', '0')
+        self.assertEqual(self.Sync._resume_interrupted_syncs(), record)
+        self.assertEqual(record.state, 'done')
+
+    def test_nothing_to_resume(self):
+        _result, record = self._sync()
+        with self.assertRaises(UserError):
+            record.action_resume_sync()
+
+    def test_mirror_full_refresh(self):
+        Item = self.env['avancir.item']
+        self.fake.seed_items(5)
+        Item._refresh_workspace(self.env['res.company'], 'sync-test')
+        self.assertEqual(Item.search_count([('workspace_key', '=', 'sync-test')]), 5)
+        self.assertTrue(self.Sync._get_config('mirror_items_since'))
+
+        removed = next(iter(self.fake.items))
+        del self.fake.items[removed]
+        self.env['ir.config_parameter'].sudo().set_param('avancir_inventory.mirror_items_since', False)
+        Item._refresh_workspace(self.env['res.company'], 'sync-test')
+        mirrored = Item.search([('workspace_key', '=', 'sync-test')])
+        self.assertEqual(len(mirrored), 4)
+        self.assertNotIn(removed, mirrored.mapped('avancir_id'))
+
+    def test_mirror_checkpoint_without_updated_at(self):
+        self.fake.seed_items(3)
+        for item in self.fake.items.values():
+            item.pop('updated_at')
+        self.env['avancir.item']._refresh_workspace(self.env['res.company'], 'sync-test')
+        self.assertTrue(self.Sync._get_config('mirror_items_since'), 'the run start is the checkpoint')
+
+    def test_background_client_waits_out_retry_after(self):
+        """Outside a web request the client may wait as long as a Retry-After asks."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('avancir_inventory.rate_max_wait', '5')
+        ICP.set_param('avancir_inventory.rate_max_wait_background', '120')
+        self.assertEqual(self.Sync._get_client().rate_max_wait, 120)
@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+Unit tests of the pure-Python Avancir tools: token store, rate limiter,
+circuit breaker, adaptive batching, response cache, pagination, webhook
+event buffer and SKU reconciliation. None of them touches the database.
+"""
+import shutil
+import tempfile
+import threading
+import time
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools import token_store as token_store_module
+from ..tools.batching import AdaptiveBatcher
+from ..tools.cache import ResponseCache
+from ..tools.event_buffer import EventBuffer
+from ..tools.pagination import iter_items, iter_pages
+from ..tools.reconcile import reconcile_by_sku
+from ..tools.resilience import AvancirUnavailable, CircuitBreaker, TokenBucket
+from ..tools.token_store import TokenStore
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll ``condition`` until it holds or ``timeout`` seconds have passed."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@tagged('post_install', '-at_install')
+class TestTokenStore(BaseCase):
+
+    KEY = ('db', 'https://avancir.test/api/v1', 'user', 'default')
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp(prefix='avancir-tokens-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.logins = 0
+
+    def login(self):
+        self.logins += 1
+        return f'token-{self.logins}'
+
+    def test_token_cached_in_memory(self):
+        store = TokenStore()
+        self.assertEqual(store.get(self.KEY, self.login, self.directory), 'token-1')
+        self.assertEqual(store.get(self.KEY, self.login, self.directory), 'token-1')
+        self.assertEqual(self.logins, 1)
+
+    def test_token_shared_through_file(self):
+        """A second worker picks up the token the first one wrote."""
+        TokenStore().get(self.KEY, self.login, self.directory)
+        self.assertEqual(TokenStore().get(self.KEY, self.login, self.directory), 'token-1')
+        self.assertEqual(self.logins, 1)
+
+    def test_stale_token_replaced(self):
+        store = TokenStore()
+        token = store.get(self.KEY, self.login, self.directory)
+        self.assertEqual(store.get(self.KEY, self.login, self.directory, stale_token=token), 'token-2')
+        # Another worker holding the same rejected token gets the new one without a login
+        self.assertEqual(TokenStore().get(self.KEY, self.login, self.directory, stale_token=token), 'token-2')
+        self.assertEqual(self.logins, 2)
+
+    def test_concurrent_refresh_logs_in_once(self):
+        store = TokenStore()
+        barrier = threading.Barrier(8)
+
+        def slow_login():
+            time.sleep(0.05)
+            return self.login()
+
+        def get():
+            barrier.wait()
+            return store.get(self.KEY, slow_login, self.directory)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get())) for _i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['token-1'] * 8)
+        self.assertEqual(self.logins, 1)
+
+    def test_refresh_skipped_while_file_locked(self):
+        """A non-blocking refresh gives up while another worker holds the lock file."""
+        if token_store_module.fcntl is None:
+            self.skipTest('fcntl is not available')
+        holder = TokenStore()
+        fd = holder._file_lock(self.directory, self.KEY)
+        try:
+            result = TokenStore()._refresh(self.KEY, self.login, self.directory, blocking=False)
+        finally:
+            holder._file_unlock(fd)
+        self.assertIsNone(result)
+        self.assertEqual(self.logins, 0)
+
+    def test_refresh_ahead_of_expiry(self):
+        """A token close to expiry is still served while a new one is fetched in the background."""
+        store = TokenStore()
+        store._write_file(self.directory, self.KEY, 'old-token', time.time() + 60)
+        self.assertEqual(store.get(self.KEY, self.login, self.directory), 'old-token')
+        self.assertTrue(wait_until(lambda: store._memory[self.KEY][0] == 'token-1'))
+        self.assertEqual(TokenStore().get(self.KEY, self.login, self.directory), 'token-1')
+        self.assertEqual(self.logins, 1)
+
+
+@tagged('post_install', '-at_install')
+class TestResilience(BaseCase):
+
+    def test_breaker_opens_and_probes(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.before_call()
+        breaker.record_failure('HTTP 503')
+        self.assertEqual(breaker.snapshot()['state'], 'closed')
+        breaker.record_failure('HTTP 503')
+        self.assertEqual(breaker.snapshot()['state'], 'open')
+        with self.assertRaises(AvancirUnavailable):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        breaker.before_call()
+        self.assertEqual(breaker.snapshot()['state'], 'half_open')
+        with self.assertRaises(AvancirUnavailable, msg='only one probe at a time'):
+            breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.snapshot(), {'state': 'closed', 'failures': 0, 'retry_in': None,
+                                              'last_error': 'HTTP 503'})
+
+    def test_breaker_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure('timeout')
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_failure('timeout')
+        self.assertEqual(breaker.snapshot()['state'], 'open')
+
+    def test_breaker_cancelled_probe_frees_slot(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure('timeout')
+        breaker.before_call()
+        breaker.cancel_probe()
+        breaker.before_call()
+
+    def test_bucket_without_rate_never_waits(self):
+        bucket = TokenBucket(rate=0)
+        for _i in range(100):
+            bucket.acquire(0)
+
+    def test_bucket_fails_fast_past_max_wait(self):
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.acquire(0)
+        with self.assertRaises(AvancirUnavailable):
+            bucket.acquire(0.01)
+        # The refused slot was given back: the next one is about 0.1s away
+        started = time.monotonic()
+        bucket.acquire(1)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_bucket_pause(self):
+        """A pause (Retry-After) holds callers back even without a rate limit."""
+        bucket = TokenBucket(rate=0)
+        bucket.pause(0.1)
+        with self.assertRaises(AvancirUnavailable):
+            bucket.acquire(0.01)
+        started = time.monotonic()
+        bucket.acquire(1)
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+
+@tagged('post_install', '-at_install')
+class TestAdaptiveBatcher(BaseCase):
+
+    def test_grows_after_fast_success(self):
+        batcher = AdaptiveBatcher(100, min_size=10, max_size=500, target_latency=5)
+        self.assertEqual(batcher.record(100, 0.1, 1000), 110)
+
+    def test_halves_after_error_or_slow_call(self):
+        batcher = AdaptiveBatcher(100, min_size=10, max_size=500, target_latency=5)
+        self.assertEqual(batcher.record(100, 0.1, 1000, ok=False), 50)
+        self.assertEqual(batcher.record(50, 6, 500), 25)
+
+    def test_stays_within_bounds(self):
+        batcher = AdaptiveBatcher(1000, min_size=10, max_size=200)
+        self.assertEqual(batcher.size, 200)
+        for _i in range(10):
+            batcher.record(10, 0.1, 100, ok=False)
+        self.assertEqual(batcher.size, 10)
+
+    def test_byte_budget_caps_size(self):
+        batcher = AdaptiveBatcher(100, min_size=10, max_size=500, max_bytes=1000)
+        # 50 bytes per item: at most 20 items fit the budget
+        self.assertEqual(batcher.record(10, 0.1, 500), 20)
+
+
+@tagged('post_install', '-at_install')
+class TestResponseCache(BaseCase):
+
+    def test_hit_until_expiry(self):
+        cache = ResponseCache()
+        calls = []
+        fetch = lambda: calls.append(1) or len(calls)
+        self.assertEqual(cache.get_or_fetch('key', 0.05, fetch), 1)
+        self.assertEqual(cache.get_or_fetch('key', 0.05, fetch), 1)
+        time.sleep(0.06)
+        self.assertEqual(cache.get_or_fetch('key', 0.05, fetch), 2)
+        self.assertEqual(cache.get_or_fetch('key', 0, fetch), 3, 'a TTL of 0 bypasses the cache')
+
+    def test_concurrent_misses_coalesced(self):
+        cache = ResponseCache()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch('key', 30, fetch)))
+                   for _i in range(5)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(wait_until(lambda: cache.stats()['coalesced'] == 4))
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_not_cached(self):
+        cache = ResponseCache()
+
+        def fail():
+            raise ValueError('Avancir is down')
+
+        with self.assertRaises(ValueError):
+            cache.get_or_fetch('key', 30, fail)
+        self.assertEqual(cache.get_or_fetch('key', 30, lambda: 'value'), 'value')
+
+    def test_rejected_values_not_cached(self):
+        cache = ResponseCache()
+        partial = ([], ['item-1'])
+        cache.get_or_fetch('key', 30, lambda: partial, cacheable=lambda result: not result[1])
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_entries=2)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get_or_fetch(key, 30, lambda: key)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.get_or_fetch('a', 30, lambda: 'refetched'), 'a')
+        self.assertEqual(cache.get_or_fetch('b', 30, lambda: 'refetched'), 'refetched')
+
+
+@tagged('post_install', '-at_install')
+class TestPagination(BaseCase):
+
+    @staticmethod
+    def offset_server(count, with_total=True, max_page_size=None):
+        def fetch(params):
+            offset, limit = params['offset'], min(params['limit'], max_page_size or params['limit'])
+            response = {'data': [{'id': n} for n in range(offset, min(offset + limit, count))]}
+            if with_total:
+                response['meta'] = {'total': count}
+            return response
+        return fetch
+
+    def test_offset_pagination(self):
+        for prefetch in (True, False):
+            items = list(iter_items(self.offset_server(25), page_size=10, prefetch=prefetch))
+            self.assertEqual([item['id'] for item in items], list(range(25)))
+
+    def test_server_page_cap(self):
+        """Pages shorter than requested do not end the stream while total says more are left."""
+        items = list(iter_items(self.offset_server(500, max_page_size=100), page_size=200))
+        self.assertEqual([item['id'] for item in items], list(range(500)))
+
+    def test_short_page_ends_without_total(self):
+        items = list(iter_items(self.offset_server(25, with_total=False), page_size=10))
+        self.assertEqual(len(items), 25)
+
+    def test_stops_on_total(self):
+        """A full last page ends the iteration when meta.total says so."""
+        calls = []
+        fetch = self.offset_server(20)
+        pages = list(iter_pages(lambda params: calls.append(params) or fetch(params), page_size=10))
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_cursor_pagination(self):
+        def fetch(params):
+            start = int(params.get('cursor') or 0)
+            return {'data': [{'id': start}], 'meta': {'nextCursor': str(start + 1) if start < 4 else None}}
+
+        self.assertEqual([item['id'] for item in iter_items(fetch, page_size=1)], [0, 1, 2, 3, 4])
+
+    def test_stops_when_offset_ignored(self):
+        calls = []
+
+        def fetch(params):
+            calls.append(params)
+            return {'data': [{'id': n} for n in range(10)]}
+
+        for prefetch in (True, False):
+            calls.clear()
+            with self.assertLogs('odoo.addons.avancir_inventory.tools.pagination', 'WARNING'):
+                items = list(iter_items(fetch, page_size=10, prefetch=prefetch))
+            self.assertEqual(len(items), 10)
+            self.assertEqual(len(calls), 2)
+
+    def test_close_stops_prefetch(self):
+        calls = []
+        fetch = self.offset_server(100)
+        items = iter_items(lambda params: calls.append(params) or fetch(params), page_size=10)
+        self.assertEqual([next(items)['id'] for _i in range(5)], list(range(5)))
+        items.close()
+        self.assertFalse([thread for thread in threading.enumerate()
+                          if thread.name.startswith('avancir-page')])
+        self.assertEqual(len(calls), 2, 'only the page prefetched before closing was read')
+
+    def test_page_cap(self):
+        endless = self.offset_server(10 ** 9, with_total=False)
+        with self.assertLogs('odoo.addons.avancir_inventory.tools.pagination', 'WARNING'):
+            pages = list(iter_pages(endless, page_size=10, max_pages=5))
+        self.assertEqual(len(pages), 5)
+
+
+@tagged('post_install', '-at_install')
+class TestEventBuffer(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.flushed = []
+        self.lock = threading.Lock()
+
+    def flush(self, key, events):
+        with self.lock:
+            self.flushed.append((key, list(events)))
+
+    def test_flush_by_size(self):
+        buffer = EventBuffer(self.flush, max_events=3, max_delay=60)
+        buffer.add('db', [1, 2])
+        time.sleep(0.05)
+        self.assertEqual(self.flushed, [], 'below max_events and max_delay, nothing is flushed')
+        buffer.add('db', [3])
+        self.assertTrue(wait_until(lambda: self.flushed))
+        self.assertEqual(self.flushed, [('db', [1, 2, 3])])
+
+    def test_flush_by_age(self):
+        buffer = EventBuffer(self.flush, max_events=100, max_delay=0.05)
+        buffer.add('db1', [1])
+        buffer.add('db2', [2])
+        self.assertTrue(wait_until(lambda: len(self.flushed) == 2))
+        self.assertEqual(sorted(self.flushed), [('db1', [1]), ('db2', [2])])
+        self.assertEqual(buffer.stats()['pending'], 0)
+
+    def test_flush_all_in_batches(self):
+        buffer = EventBuffer(self.flush, max_events=2, max_delay=60)
+        # Fill the buffer without waking the background thread up
+        buffer._pending['db'] = [1, 2, 3, 4, 5]
+        buffer._oldest['db'] = time.monotonic()
+        buffer.flush_all()
+        self.assertEqual(self.flushed, [('db', [1, 2]), ('db', [3, 4]), ('db', [5])])
+        self.assertEqual(buffer.stats()['flushes'], 3)
+
+    def test_failed_flush_counted_as_dropped(self):
+        def fail(key, events):
+            raise RuntimeError('database unavailable')
+
+        buffer = EventBuffer(fail, max_events=10, max_delay=60)
+        buffer._pending['db'] = [1, 2, 3]
+        buffer._oldest['db'] = time.monotonic()
+        with self.assertLogs('odoo.addons.avancir_inventory.tools.event_buffer', 'ERROR'):
+            buffer.flush_all()
+        self.assertEqual(buffer.stats()['dropped'], 3)
+
+
+@tagged('post_install', '-at_install')
+class TestReconcileBySku(BaseCase):
+
+    def test_reconcile(self):
+        odoo = {
+            'A': {'product_id': 1, 'name': 'Alpha', 'qty_available': 2.0},
+            'B': {'product_id': 2, 'name': 'Beta', 'qty_available': 1.0},
+            'C': {'product_id': 3, 'name': 'Gamma', 'qty_available': 0.0},
+        }
+        items = iter([
+            {'id': 'a1', 'sku': 'A', 'status': {'display_name': 'Active'}},
+            {'id': 'a2', 'sku': 'A', 'status': {'display_name': 'Sold'}, 'last_scanned_at': '2024-01-01'},
+            {'id': 'b1', 'sku': 'B'},
+            {'id': 'x1', 'sku': 'X', 'name': 'Unknown'},
+            {'id': 'n1'},
+        ])
+        result = reconcile_by_sku(odoo, items, pos_sales={'A': 1, 'C': 1})
+
+        self.assertEqual(result['matched'], 2)
+        self.assertEqual(result['total_avancir_items'], 3)
+        self.assertEqual(result['discrepancies'], [{
+            'sku': 'A', 'name': 'Alpha', 'product_id': 1, 'odoo_qty': 2.0, 'avancir_qty': 2,
+            'pos_sold': 1, 'avancir_id': 'a2', 'avancir_status': 'Sold', 'last_scan': '2024-01-01',
+        }])
+        self.assertEqual(result['missing_in_avancir'], [{'sku': 'C', 'name': 'Gamma', 'product_id': 3}])
+        self.assertEqual(result['missing_in_odoo'], [{'sku': 'X', 'name': 'Unknown', 'avancir_id': 'x1'}])
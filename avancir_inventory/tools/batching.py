@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive batch sizing for Avancir bulk endpoints.
+
+The batch size follows AIMD: it grows by a fixed step after each fast,
+successful request and is halved after an error, a request slower than
+the target latency or a payload over the byte budget. It also never
+exceeds what the observed bytes per item allow under the budget.
+"""
+import threading
+
+DECREASE_FACTOR = 0.5
+
+
+class AdaptiveBatcher:
+    """Thread-safe AIMD controller for the size of one endpoint's batches."""
+
+    def __init__(self, initial, min_size=10, max_size=500, target_latency=5.0, max_bytes=1048576, step=None):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.step = step or self.min_size
+        self._size = self._clamp(initial)
+        self._bytes_per_item = None
+        self._lock = threading.Lock()
+
+    def _clamp(self, size):
+        return int(min(self.max_size, max(self.min_size, size)))
+
+    @property
+    def size(self):
+        with self._lock:
+            return self._size
+
+    def record(self, count, seconds, nbytes, ok=True):
+        """
+        Feed back one request and adjust the batch size.
+
+        Args:
+            count: Items in the request
+            seconds: Wall time of the request
+            nbytes: Serialized payload size
+            ok: False if the request failed
+        """
+        with self._lock:
+            if count:
+                per_item = nbytes / count
+                # Smoothed, so one unusual batch does not swing the byte cap
+                self._bytes_per_item = (per_item if self._bytes_per_item is None
+                                        else 0.8 * self._bytes_per_item + 0.2 * per_item)
+            if not ok or seconds > self.target_latency or nbytes > self.max_bytes:
+                size = self._size * DECREASE_FACTOR
+            else:
+                size = self._size + self.step
+            if self._bytes_per_item:
+                size = min(size, self.max_bytes / self._bytes_per_item)
+            self._size = self._clamp(size)
+            return self._size
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+In-process TTL/LRU cache for Avancir read responses.
+
+Concurrent misses on the same key are coalesced: one caller fetches from
+Avancir and the others wait for its result. Errors are never cached, nor
+values the caller marks as not cacheable (e.g. partial results).
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ResponseCache:
+    """Size-bounded LRU cache with per-entry TTL and single-flight misses."""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(*parts, **params):
+        """Build a hashable key from positional parts and query params."""
+        return parts + tuple(sorted((k, str(v)) for k, v in params.items() if v is not None))
+
+    def get_or_fetch(self, key, ttl, fetch, cacheable=None):
+        """
+        Return the cached value for ``key`` or compute it with ``fetch()``.
+
+        Args:
+            key: Hashable cache key
+            ttl: Seconds the value stays fresh; 0 bypasses the cache
+            fetch: Callable producing the value on a miss
+            cacheable: Optional predicate; a fetched value it rejects is
+                handed to the waiting callers but not stored
+        """
+        if ttl <= 0:
+            return fetch()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1]
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                self._stats['misses'] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if cacheable is None or cacheable(value):
+                self._entries[key] = (time.monotonic() + ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        future.set_result(value)
+        return value
+
+    def stats(self):
+        """Counters for monitoring: hits, misses, coalesced, evictions, size."""
+        with self._lock:
+            return {**self._stats, 'size': len(self._entries), 'max_entries': self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
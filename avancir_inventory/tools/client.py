@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Pooled HTTP client for the Avancir API.
+
+The client holds no ORM state: it is built from configuration read in the
+Odoo thread and can then be used from worker threads.
+"""
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from odoo.exceptions import UserError
+
+from .encoding import dumps, gzip_bytes
+from .metrics import ClientMetrics, client_metrics
+from .pagination import iter_items
+from .resilience import AvancirUnavailable, get_guards
+from .token_store import token_store
+
+_logger = logging.getLogger(__name__)
+
+# Statuses worth retrying. 429/503 mean the request was not processed, so
+# they are retried for every method; the others only for idempotent ones.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+NOT_PROCESSED_STATUSES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({'GET', 'PATCH', 'PUT', 'DELETE'})
+
+MAX_BACKOFF = 60
+
+# Process-wide sessions, one per pool size
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+# API URLs that answered 415 to a gzipped body; they get plain JSON from then on
+_gzip_rejected = set()
+
+
+def get_session(pool_size=10):
+    """Return the shared keep-alive session for the given pool size."""
+    session = _sessions.get(pool_size)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(pool_size)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=pool_size,
+                pool_maxsize=pool_size,
+                max_retries=0,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[pool_size] = session
+    return session
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def response_size(response):
+    """Bytes of a response on the wire: Content-Length, else the decoded body size."""
+    length = response.headers.get('Content-Length', '')
+    return int(length) if length.isdigit() else len(response.content)
+
+
+def backoff_delay(attempt, backoff_factor, retry_after=None):
+    """Seconds to wait before retry number ``attempt`` (0-based)."""
+    if retry_after is not None:
+        return min(retry_after, MAX_BACKOFF)
+    delay = backoff_factor * (2 ** attempt)
+    return min(delay + random.uniform(0, backoff_factor), MAX_BACKOFF)
+
+
+class AvancirClient:
+    """
+    Thread-safe Avancir API client on top of a shared connection pool.
+
+    Requests pass through the account's rate limiter and circuit breaker
+    (tools.resilience), shared by all clients of the worker process, and
+    every attempt is recorded in ``metrics``, the client's own registry,
+    which forwards it to the process-wide tools.metrics.client_metrics.
+
+    Request bodies of at least ``gzip_min_bytes`` are sent gzipped when
+    ``gzip_enabled`` is set, until Avancir rejects one with 415. The JSON
+    and on-the-wire sizes of every body sent are counted in
+    ``bytes_json`` and ``bytes_sent``.
+    """
+
+    def __init__(self, api_url, username, password, workspace_key='default',
+                 pool_size=10, max_retries=3, backoff_factor=0.5, timeout=60,
+                 dbname=None, token_dir=None, rate_limit=0, rate_burst=10,
+                 rate_max_wait=5, breaker_threshold=5, breaker_reset=30,
+                 gzip_enabled=False, gzip_min_bytes=8192):
+        self.api_url = api_url.rstrip('/')
+        self.dbname = dbname
+        self.token_dir = token_dir
+        self.username = username
+        self.password = password
+        self.workspace_key = workspace_key
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.rate_max_wait = rate_max_wait
+        self.gzip_enabled = gzip_enabled
+        self.gzip_min_bytes = gzip_min_bytes
+        self.bytes_json = 0
+        self.bytes_sent = 0
+        self._stats_lock = threading.Lock()
+        self.metrics = ClientMetrics(parent=client_metrics)
+        self.limiter, self.breaker = get_guards(self._guard_key())
+        self.limiter.configure(rate_limit, rate_burst)
+        self.breaker.configure(breaker_threshold, breaker_reset)
+
+    @property
+    def session(self):
+        return get_session(self.pool_size)
+
+    def _token_key(self):
+        return (self.dbname, self.api_url, self.username, self.workspace_key)
+
+    def _guard_key(self):
+        # Avancir limits and fails per account, whatever the workspace
+        return (self.dbname, self.api_url, self.username)
+
+    def get_token(self, stale_token=None):
+        """
+        Get or refresh the Avancir session token.
+
+        Args:
+            stale_token: A token the server rejected. It is replaced unless
+                another thread or worker already swapped it for a fresh one.
+        """
+        if not self.username or not self.password:
+            raise UserError('Avancir credentials not configured. Go to Settings > Inventory > Avancir.')
+        return token_store.get(self._token_key(), self._login, self.token_dir, stale_token)
+
+    def _login(self):
+        """Call /auth/login and return the session token."""
+        started = time.monotonic()
+        response = None
+        try:
+            response = self.session.post(
+                f'{self.api_url}/auth/login',
+                json={'identifier': self.username, 'password': self.password},
+                headers={'Content-Type': 'application/json'},
+                timeout=30,
+            )
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            self.metrics.observe('/auth/login', 'POST', response.status_code if response is not None else None,
+                                   time.monotonic() - started)
+            self.metrics.token_refresh(ok=False)
+            _logger.error(f'Avancir auth failed: {e}')
+            raise UserError(f'Failed to authenticate with Avancir: {e}')
+        self.metrics.observe('/auth/login', 'POST', response.status_code, time.monotonic() - started,
+                               bytes_received=response_size(response))
+        self.metrics.token_refresh()
+
+        # Avancir returns idToken in data.idToken
+        return data.get('data', {}).get('idToken') or data.get('idToken')
+
+    def _should_retry(self, method, status):
+        if status in NOT_PROCESSED_STATUSES:
+            return True
+        return status in RETRY_STATUSES and method in IDEMPOTENT_METHODS
+
+    def _acquire(self):
+        """Pass the circuit breaker and the rate limiter before a call."""
+        try:
+            self.breaker.before_call()
+        except AvancirUnavailable:
+            self.metrics.rejected('breaker')
+            raise
+        try:
+            self.limiter.acquire(self.rate_max_wait)
+        except AvancirUnavailable:
+            self.breaker.cancel_probe()
+            self.metrics.rejected('rate_limit')
+            raise
+
+    def _compress_body(self, body):
+        """Return (body, compressed), gzipping a JSON body large enough to be worth it."""
+        if (body is not None and self.gzip_enabled and len(body) >= self.gzip_min_bytes
+                and self.api_url not in _gzip_rejected):
+            return gzip_bytes(body), True
+        return body, False
+
+    def _count_bytes(self, json_size, sent_size):
+        with self._stats_lock:
+            self.bytes_json += json_size
+            self.bytes_sent += sent_size
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_json - self.bytes_sent
+
+    def request(self, method, endpoint, data=None, params=None):
+        """
+        Make an authenticated request, retrying transient failures.
+
+        Args:
+            data: JSON-serializable body, or bytes already encoded with
+                tools.encoding.dumps. Ignored for GET.
+        """
+        method = method.upper()
+        if method not in ('GET', 'POST', 'PATCH'):
+            raise ValueError(f'Unsupported HTTP method: {method}')
+
+        params = dict(params or {})
+        params['workspaceKey'] = self.workspace_key
+        url = f'{self.api_url}{endpoint}'
+        json_body = None
+        if method != 'GET' and data is not None:
+            json_body = data if isinstance(data, bytes) else dumps(data)
+        body, compressed = self._compress_body(json_body)
+        token = self.get_token()
+        reauthenticated = False
+        attempt = 0
+
+        while True:
+            self._acquire()
+            headers = {
+                'Content-Type': 'application/json',
+                'Accept-Encoding': 'gzip, deflate',
+                'x-session-token': token,
+            }
+            if compressed:
+                headers['Content-Encoding'] = 'gzip'
+            if body is not None:
+                self._count_bytes(len(json_body), len(body))
+            sent = len(body) if body is not None else 0
+            started = time.monotonic()
+            try:
+                response = self.session.request(
+                    method, url,
+                    headers=headers,
+                    params=params,
+                    data=body,
+                    timeout=self.timeout,
+                )
+            except (requests.exceptions.ConnectTimeout, requests.exceptions.ConnectionError) as e:
+                self.metrics.observe(endpoint, method, None, time.monotonic() - started, sent)
+                self.breaker.record_failure(e)
+                # Only a connect timeout is sure not to have reached the server
+                retryable = (method in IDEMPOTENT_METHODS
+                             or isinstance(e, requests.exceptions.ConnectTimeout))
+                if retryable and attempt < self.max_retries:
+                    self.metrics.retry(endpoint, method, 'connection')
+                    delay = backoff_delay(attempt, self.backoff_factor)
+                    _logger.warning(f'Avancir {method} {endpoint} connection failed ({e}), '
+                                    f'retrying in {delay:.1f}s')
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                _logger.error(f'Avancir API request failed: {e}')
+                raise
+            except requests.exceptions.RequestException as e:
+                self.metrics.observe(endpoint, method, None, time.monotonic() - started, sent)
+                self.breaker.record_failure(e)
+                _logger.error(f'Avancir API request failed: {e}')
+                raise
+            self.metrics.observe(endpoint, method, response.status_code, time.monotonic() - started,
+                                   sent, response_size(response))
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code in RETRY_STATUSES:
+                self.breaker.record_failure(f'HTTP {response.status_code}')
+                if response.status_code == 429 and retry_after:
+                    # Avancir asked every caller to slow down, not just this one
+                    self.limiter.pause(min(retry_after, MAX_BACKOFF))
+            else:
+                self.breaker.record_success()
+
+            if response.status_code == 415 and compressed:
+                # This Avancir does not take gzipped bodies: resend as plain JSON
+                _logger.info(f'Avancir rejected a gzipped body on {endpoint}, sending plain JSON from now on')
+                _gzip_rejected.add(self.api_url)
+                body, compressed = json_body, False
+                self.metrics.retry(endpoint, method, 415)
+                continue
+
+            if response.status_code == 401 and not reauthenticated:
+                # Token expired server-side: log in again and replay once
+                _logger.info('Avancir session token rejected, re-authenticating')
+                token = self.get_token(stale_token=token)
+                reauthenticated = True
+                self.metrics.retry(endpoint, method, 401)
+                continue
+
+            if self._should_retry(method, response.status_code) and attempt < self.max_retries:
+                if response.status_code == 429 and retry_after:
+                    # The limiter pause holds the retry, and fails it fast
+                    # when the pause is longer than rate_max_wait (see
+                    # avancir.sync._get_client for interactive callers)
+                    delay = 0
+                else:
+                    delay = backoff_delay(attempt, self.backoff_factor, retry_after)
+                _logger.warning(f'Avancir {method} {endpoint} returned {response.status_code}, '
+                                f'retrying in {delay:.1f}s')
+                self.metrics.retry(endpoint, method, response.status_code)
+                attempt += 1
+                time.sleep(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                _logger.error(f'Avancir API request failed: {e}')
+                raise
+
+    def iter_items(self, endpoint, params=None, page_size=200, prefetch=True):
+        """Stream every item of a paginated list endpoint, one page in memory."""
+        def fetch(page_params):
+            return self.request('GET', endpoint, params=page_params)
+        return iter_items(fetch, params, page_size=page_size, prefetch=prefetch)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded concurrent dispatch of Avancir calls.
+
+Jobs are prepared by the caller (usually in the Odoo thread) and only the
+network call runs in the pool, so no ORM access ever happens off-thread.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+def chunked(iterable, size):
+    """Lazily group an iterable into lists of at most ``size`` elements."""
+    chunk = []
+    for element in iterable:
+        chunk.append(element)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def dispatch_ordered(func, jobs, concurrency=4):
+    """
+    Run ``func(job)`` for every job with at most ``concurrency`` in flight.
+
+    Jobs are pulled lazily from the iterable, so only a window of
+    ``2 * concurrency`` prepared jobs is held in memory.
+
+    Yields:
+        (job, result, exception) tuples in submission order
+    """
+    if concurrency <= 1:
+        for job in jobs:
+            try:
+                yield job, func(job), None
+            except Exception as e:
+                yield job, None, e
+        return
+
+    window = concurrency * 2
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='avancir') as executor:
+        for job in jobs:
+            pending.append((job, executor.submit(func, job)))
+            if len(pending) >= window:
+                yield _collect(*pending.popleft())
+        while pending:
+            yield _collect(*pending.popleft())
+
+
+def _collect(job, future):
+    try:
+        return job, future.result(), None
+    except Exception as e:
+        return job, None, e
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+JSON encoding and gzip compression of Avancir request bodies.
+
+orjson is used when it is installed, the standard json module otherwise.
+Compression writes into a buffer kept per thread, so the bulk calls of a
+sync do not allocate a new one for every request.
+"""
+import gzip
+import io
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+_local = threading.local()
+
+
+def dumps(data):
+    """Serialize ``data`` to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return _encoder.encode(data).encode()
+
+
+def _buffer():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        buffer = _local.buffer = io.BytesIO()
+    buffer.seek(0)
+    buffer.truncate()
+    return buffer
+
+
+def gzip_bytes(body, level=6):
+    """Gzip ``body`` in this thread's reusable buffer and return the result."""
+    buffer = _buffer()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=level, mtime=0) as stream:
+        stream.write(body)
+    return buffer.getvalue()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+In-process buffer for inbound Avancir webhook events.
+
+Requests append events and return immediately; a single background
+thread hands them to a flush callable in batches, once a key (database)
+has ``max_events`` pending or its oldest event has waited ``max_delay``
+seconds. A burst of scans thus becomes a few bulk inserts instead of one
+transaction per event.
+
+Pending events live in worker memory only: a crash loses at most one
+flush window, which the mirror refresh backfills from Avancir.
+"""
+import logging
+import threading
+import time
+
+from .dispatch import chunked
+
+_logger = logging.getLogger(__name__)
+
+
+class EventBuffer:
+    """Per-key event buffer flushed by size or age from a background thread."""
+
+    def __init__(self, flush, max_events=500, max_delay=1.0):
+        """
+        Args:
+            flush: Callable(key, events) persisting one batch
+            max_events: Pending events of a key that trigger an immediate flush,
+                also the largest batch handed to ``flush``
+            max_delay: Seconds an event may wait before its key is flushed
+        """
+        self._flush = flush
+        self.max_events = max_events
+        self.max_delay = max_delay
+        self._pending = {}
+        self._oldest = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stats = {'received': 0, 'flushed': 0, 'flushes': 0, 'dropped': 0}
+
+    def add(self, key, events):
+        """Queue events for ``key``; never blocks on the database."""
+        if not events:
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='avancir-event-buffer', daemon=True)
+                self._thread.start()
+            pending = self._pending.setdefault(key, [])
+            if not pending:
+                self._oldest[key] = time.monotonic()
+            pending.extend(events)
+            self._stats['received'] += len(events)
+            self._cond.notify()
+
+    def _take_due(self, force=False):
+        """Detach the batches that are full or old enough; caller holds the lock."""
+        now = time.monotonic()
+        due = [
+            key for key, pending in self._pending.items()
+            if force or len(pending) >= self.max_events or now - self._oldest[key] >= self.max_delay
+        ]
+        batches = [(key, self._pending.pop(key)) for key in due]
+        for key in due:
+            del self._oldest[key]
+        return batches
+
+    def _next_deadline(self):
+        """Seconds until the oldest pending key is due, None when idle."""
+        if not self._oldest:
+            return None
+        return max(0.0, min(self._oldest.values()) + self.max_delay - time.monotonic())
+
+    def _run(self):
+        while True:
+            with self._cond:
+                batches = self._take_due()
+                while not batches:
+                    self._cond.wait(self._next_deadline())
+                    batches = self._take_due()
+            self._write(batches)
+
+    def _write(self, batches):
+        for key, events in batches:
+            for batch in chunked(events, self.max_events):
+                try:
+                    self._flush(key, batch)
+                except Exception:
+                    _logger.exception(f'Failed to flush {len(batch)} Avancir events for {key}')
+                    with self._cond:
+                        self._stats['dropped'] += len(batch)
+                    continue
+                with self._cond:
+                    self._stats['flushed'] += len(batch)
+                    self._stats['flushes'] += 1
+
+    def flush_all(self):
+        """Flush everything pending in the calling thread (shutdown, tests)."""
+        with self._cond:
+            batches = self._take_due(force=True)
+        self._write(batches)
+
+    def stats(self):
+        """Counters for monitoring: received, flushed, flushes, dropped, pending."""
+        with self._cond:
+            pending = sum(len(events) for events in self._pending.values())
+            return {**self._stats, 'pending': pending}
+
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Latency and error metrics of the Avancir client.
+
+Counters are kept per worker process, like the response cache and the
+webhook buffer stats. Endpoints are recorded as templates (item ids
+replaced by ``{id}``) so the number of series stays bounded.
+"""
+import re
+import threading
+from collections import defaultdict
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# A path segment containing a digit is an id, not part of the route
+_ID_SEGMENT = re.compile(r'/(?=[^/]*\d)[^/]+')
+
+
+def endpoint_label(endpoint):
+    """Turn ``/items/6f3a.../history`` into ``/items/{id}/history``."""
+    return _ID_SEGMENT.sub('/{id}', endpoint)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class ClientMetrics:
+    """
+    Thread-safe counters and latency histograms of Avancir API calls.
+
+    A registry created with a ``parent`` forwards everything it records to
+    it, so one client's calls can be summarized on their own while still
+    counting in the process-wide registry.
+    """
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # (endpoint, method) -> [bucket counts..., +Inf count], sum of seconds
+            self._buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+            self._latency_sum = defaultdict(float)
+            # (endpoint, method, status) -> count; status is 'error' without a response
+            self._statuses = defaultdict(int)
+            # (endpoint, method, reason) -> count
+            self._retries = defaultdict(int)
+            # (endpoint, method) -> bytes
+            self._bytes_sent = defaultdict(int)
+            self._bytes_received = defaultdict(int)
+            # reason ('breaker' or 'rate_limit') -> calls refused without reaching Avancir
+            self._rejected = defaultdict(int)
+            # outcome ('ok' or 'error') -> logins
+            self._token_refreshes = defaultdict(int)
+
+    def observe(self, endpoint, method, status, seconds, bytes_sent=0, bytes_received=0):
+        """Record one HTTP attempt; ``status`` is None when no response came back."""
+        key = (endpoint_label(endpoint), method)
+        with self._lock:
+            buckets = self._buckets[key]
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[position] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            self._latency_sum[key] += seconds
+            self._statuses[(*key, status or 'error')] += 1
+            self._bytes_sent[key] += bytes_sent
+            self._bytes_received[key] += bytes_received
+        if self.parent:
+            self.parent.observe(endpoint, method, status, seconds, bytes_sent, bytes_received)
+
+    def retry(self, endpoint, method, reason):
+        with self._lock:
+            self._retries[(endpoint_label(endpoint), method, str(reason))] += 1
+        if self.parent:
+            self.parent.retry(endpoint, method, reason)
+
+    def rejected(self, reason):
+        with self._lock:
+            self._rejected[reason] += 1
+        if self.parent:
+            self.parent.rejected(reason)
+
+    def token_refresh(self, ok=True):
+        with self._lock:
+            self._token_refreshes['ok' if ok else 'error'] += 1
+        if self.parent:
+            self.parent.token_refresh(ok)
+
+    @staticmethod
+    def _quantile(buckets, count, q):
+        """Upper bound of the bucket holding quantile ``q``; None past the last bound."""
+        rank = q * count
+        seen = 0
+        for position, bucket_count in enumerate(buckets):
+            seen += bucket_count
+            if seen >= rank:
+                return LATENCY_BUCKETS[position] if position < len(LATENCY_BUCKETS) else None
+        return None
+
+    def summary(self):
+        """
+        Per endpoint and method: requests, errors, retries, mean and
+        approximate p50/p95 latency, and bytes; plus process totals.
+        """
+        with self._lock:
+            endpoints = []
+            for (endpoint, method), buckets in sorted(self._buckets.items()):
+                count = sum(buckets)
+                errors = sum(n for (e, m, status), n in self._statuses.items()
+                             if (e, m) == (endpoint, method) and (status == 'error' or status >= 400))
+                endpoints.append({
+                    'endpoint': endpoint,
+                    'method': method,
+                    'requests': count,
+                    'errors': errors,
+                    'retries': sum(n for (e, m, _reason), n in self._retries.items() if (e, m) == (endpoint, method)),
+                    'mean': self._latency_sum[(endpoint, method)] / count if count else 0.0,
+                    'p50': self._quantile(buckets, count, 0.5),
+                    'p95': self._quantile(buckets, count, 0.95),
+                    'bytes_sent': self._bytes_sent[(endpoint, method)],
+                    'bytes_received': self._bytes_received[(endpoint, method)],
+                })
+            return {
+                'endpoints': endpoints,
+                'statuses': {f'{e} {m} {status}': n for (e, m, status), n in sorted(
+                    self._statuses.items(), key=lambda entry: tuple(map(str, entry[0])))},
+                'rejected': dict(self._rejected),
+                'token_refreshes': dict(self._token_refreshes),
+            }
+
+    def render_prometheus(self, prefix='avancir_client'):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                f'# HELP {prefix}_request_duration_seconds Avancir HTTP attempt latency',
+                f'# TYPE {prefix}_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), buckets in sorted(self._buckets.items()):
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_request_duration_seconds_bucket'
+                                 f'{_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}')
+                labels = _labels(endpoint=endpoint, method=method)
+                lines.append(f'{prefix}_request_duration_seconds_sum{labels} {self._latency_sum[(endpoint, method)]}')
+                lines.append(f'{prefix}_request_duration_seconds_count{labels} {cumulative}')
+
+            for name, help_text, series, label_names in (
+                ('responses_total', 'Avancir responses by status code (error: no response)',
+                 self._statuses, ('endpoint', 'method', 'status')),
+                ('retries_total', 'Avancir requests replayed, by reason', self._retries,
+                 ('endpoint', 'method', 'reason')),
+                ('sent_bytes_total', 'Request body bytes sent to Avancir', self._bytes_sent,
+                 ('endpoint', 'method')),
+                ('received_bytes_total', 'Response bytes received from Avancir', self._bytes_received,
+                 ('endpoint', 'method')),
+                ('rejected_total', 'Calls refused by the circuit breaker or the rate limiter',
+                 {(reason,): n for reason, n in self._rejected.items()}, ('reason',)),
+                ('token_refreshes_total', 'Avancir logins, by outcome',
+                 {(outcome,): n for outcome, n in self._token_refreshes.items()}, ('outcome',)),
+            ):
+                lines.append(f'# HELP {prefix}_{name} {help_text}')
+                lines.append(f'# TYPE {prefix}_{name} counter')
+                for key, value in sorted(series.items(), key=lambda entry: tuple(map(str, entry[0]))):
+                    lines.append(f'{prefix}_{name}{_labels(**dict(zip(label_names, key)))} {value}')
+            return '\n'.join(lines) + '\n'
+
+
+# One registry per worker process
+client_metrics = ClientMetrics()
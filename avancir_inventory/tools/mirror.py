@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Normalisation of Avancir items and activity records for the local mirror.
+
+Avancir payloads are not uniform (``id``/``_id``, camelCase/snake_case,
+nested ``{'display_name': ...}`` values); these helpers flatten them into
+the columns of avancir.item and avancir.item.activity.
+"""
+import json
+from datetime import datetime, timezone
+
+
+def parse_timestamp(value):
+    """Parse an Avancir ISO-8601 timestamp into a naive UTC datetime."""
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        # Epoch milliseconds
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _first(record, *keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _display(value):
+    """Flatten ``{'display_name': x}`` style values to x."""
+    if isinstance(value, dict):
+        return _first(value, 'display_name', 'name', 'property_name')
+    return value
+
+
+def normalize_item(item):
+    """Flatten an Avancir item into avancir.item column values, or None without an id."""
+    avancir_id = _first(item, '_id', 'id')
+    if not avancir_id:
+        return None
+    odoo_product_id = _first(item, 'odoo_product_id')
+    return {
+        'avancir_id': str(avancir_id),
+        'name': item.get('name'),
+        'sku': item.get('sku'),
+        'location': _display(item.get('location')),
+        'status': _display(item.get('status')),
+        'rfid_tag': _first(item, 'rfid_tag', 'rfidTag'),
+        'last_scanned_at': parse_timestamp(_first(item, 'last_scanned_at', 'lastScannedAt')),
+        'avancir_updated_at': parse_timestamp(_first(item, 'updated_at', 'updatedAt')),
+        'odoo_product_id': int(odoo_product_id) if str(odoo_product_id or '').isdigit() else None,
+    }
+
+
+def normalize_activity(record):
+    """Flatten an Avancir history/scan record into avancir.item.activity values."""
+    avancir_id = _first(record, '_id', 'id', 'eventId', 'event_id')
+    item_id = _first(record, 'itemId', 'item_id', 'item')
+    if isinstance(item_id, dict):
+        item_id = _first(item_id, '_id', 'id')
+    if not avancir_id or not item_id:
+        return None
+    return {
+        'avancir_id': str(avancir_id),
+        'avancir_item_id': str(item_id),
+        'event_type': _display(_first(record, 'type', 'action', 'event', 'eventType')),
+        'location': _display(record.get('location')),
+        'status': _display(record.get('status')),
+        'rfid_tag': _first(record, 'rfid_tag', 'rfidTag'),
+        'occurred_at': parse_timestamp(_first(
+            record, 'timestamp', 'occurred_at', 'occurredAt', 'created_at', 'createdAt')),
+        'payload': json.dumps(record, default=str),
+    }
+
+
+def item_to_avancir(row):
+    """Render a mirrored avancir.item row (search_read dict) in Avancir's shape."""
+    return {
+        'id': row['avancir_id'],
+        'name': row['name'] or None,
+        'sku': row['sku'] or None,
+        'location': {'display_name': row['location']} if row['location'] else None,
+        'status': {'display_name': row['status']} if row['status'] else None,
+        'rfid_tag': row['rfid_tag'] or None,
+        'last_scanned_at': row['last_scanned_at'] and row['last_scanned_at'].isoformat() + 'Z',
+    }
+
+
+def activity_to_avancir(row):
+    """Render a mirrored activity row as the original Avancir record."""
+    try:
+        return json.loads(row['payload'])
+    except (TypeError, ValueError):
+        return {
+            'id': row['avancir_id'],
+            'itemId': row['avancir_item_id'],
+            'type': row['event_type'] or None,
+            'timestamp': row['occurred_at'] and row['occurred_at'].isoformat() + 'Z',
+        }
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming pagination over Avancir list endpoints.
+
+Follows a cursor when the response carries one and falls back to
+limit/offset otherwise. At most the current page and the one being
+prefetched are held in memory.
+
+A server that ignores the offset keeps answering full pages: iteration
+stops with a warning when a page repeats the previous one, or after
+``max_pages`` pages.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import partial
+
+_logger = logging.getLogger(__name__)
+
+CURSOR_KEYS = ('nextCursor', 'next_cursor', 'cursor')
+
+# Pages read from one endpoint before giving up on reaching its end
+MAX_PAGES = 10000
+
+
+def page_items(response):
+    """Extract the item list from a list endpoint response."""
+    if isinstance(response, list):
+        return response
+    data = response.get('data', [])
+    if isinstance(data, dict):
+        # Some endpoints nest the list: {'data': {'items': [...], ...}}
+        return data.get('items', [])
+    return data
+
+
+def next_page_params(response, params, page_len, page_size):
+    """
+    Return the params for the page after ``response``, or None when done.
+
+    A cursor, then ``total``, decide when the stream ends. Servers may
+    serve fewer items than requested per page, so a short page only ends
+    it when neither is given; an empty page always does.
+
+    Args:
+        response: Decoded JSON of the current page
+        params: Params used to fetch the current page
+        page_len: Number of items on the current page
+        page_size: Requested page size
+    """
+    meta = {}
+    if isinstance(response, dict):
+        for container in (response.get('meta'), response.get('pagination'), response):
+            if isinstance(container, dict):
+                meta = {**container, **meta}
+
+    for key in CURSOR_KEYS:
+        if key in meta:
+            if not meta[key]:
+                return None
+            return {**params, 'cursor': meta[key]}
+
+    if not page_len:
+        return None
+    offset = int(params.get('offset', 0)) + page_len
+    total = meta.get('total')
+    if total is not None:
+        return {**params, 'offset': offset} if offset < int(total) else None
+    if page_len < page_size:
+        return None
+    return {**params, 'offset': offset}
+
+
+def _page_signature(items):
+    """What tells two pages apart: their length and first and last items."""
+    return (len(items), items[0], items[-1]) if items else None
+
+
+def iter_pages(fetch, params=None, page_size=200, prefetch=True, max_pages=MAX_PAGES):
+    """
+    Yield pages (lists of items) from a paginated endpoint.
+
+    Args:
+        fetch: Callable taking request params and returning the decoded response
+        params: Base query params
+        page_size: Items requested per page
+        prefetch: Fetch the next page in the background while the caller
+            processes the current one
+        max_pages: Most pages read before stopping with a warning
+    """
+    params = {**(params or {}), 'limit': page_size, 'offset': 0}
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='avancir-page') if prefetch else None
+
+    def submit(page_params):
+        # Returns a callable giving the response, fetched now or in the background
+        if executor is None:
+            return partial(fetch, page_params)
+        return executor.submit(fetch, page_params).result
+
+    try:
+        pending = submit(params)
+        previous = None
+        pages = 0
+        while pending is not None:
+            response = pending()
+            items = page_items(response)
+            signature = _page_signature(items)
+            if signature is not None and signature == previous:
+                _logger.warning(f'Avancir returned the same page twice (params {params}), '
+                                f'stopping: the endpoint seems to ignore the pagination params')
+                return
+            pages += 1
+            page_params = params
+            params = next_page_params(response, params, len(items), page_size)
+            if params is not None and pages >= max_pages:
+                _logger.warning(f'Stopped paginating after {pages} pages (params {page_params}) '
+                                f'without reaching the last one')
+                params = None
+            pending = submit(params) if params is not None else None
+            previous = signature
+            del response
+            yield items
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def iter_items(fetch, params=None, page_size=200, prefetch=True, max_pages=MAX_PAGES):
+    """
+    Yield individual items across all pages of a list endpoint.
+
+    Closing this generator closes the page iterator too, which waits for
+    the page being prefetched and shuts the prefetch thread down.
+    """
+    with closing(iter_pages(fetch, params, page_size, prefetch, max_pages)) as pages:
+        for page in pages:
+            yield from page
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Set-based reconciliation of Odoo stock against streamed Avancir items.
+"""
+
+
+def reconcile_by_sku(odoo_by_sku, avancir_items, pos_sales=None):
+    """
+    Join Odoo stock and Avancir items on SKU in a single pass.
+
+    Avancir carries one item per RFID-tagged unit, so several items can
+    share a SKU; they are counted, and the last one seen describes the SKU.
+
+    Args:
+        odoo_by_sku: dict {sku: {'product_id', 'name', 'qty_available'}}
+        avancir_items: Iterable of Avancir item dicts, consumed once
+        pos_sales: Optional dict {sku: qty_sold}
+
+    Returns:
+        dict with matched (count), discrepancies, missing_in_avancir,
+        missing_in_odoo and total_avancir_items (distinct SKUs)
+    """
+    pos_sales = pos_sales or {}
+    seen = {}
+    missing_in_odoo = {}
+
+    for item in avancir_items:
+        sku = item.get('sku')
+        if not sku:
+            continue
+        if sku in odoo_by_sku:
+            entry = seen.get(sku)
+            seen[sku] = (
+                item.get('id'),
+                (item.get('status') or {}).get('display_name'),
+                item.get('last_scanned_at'),
+                (entry[3] if entry else 0) + 1,
+            )
+        else:
+            missing_in_odoo[sku] = {
+                'sku': sku,
+                'name': item.get('name'),
+                'avancir_id': item.get('id'),
+            }
+
+    discrepancies = []
+    missing_in_avancir = []
+    for sku, odoo_data in odoo_by_sku.items():
+        entry = seen.get(sku)
+        if entry is None:
+            missing_in_avancir.append({
+                'sku': sku,
+                'name': odoo_data['name'],
+                'product_id': odoo_data['product_id'],
+            })
+        elif sku in pos_sales:
+            discrepancies.append({
+                'sku': sku,
+                'name': odoo_data['name'],
+                'product_id': odoo_data['product_id'],
+                'odoo_qty': odoo_data['qty_available'],
+                'avancir_qty': entry[3],
+                'pos_sold': pos_sales[sku],
+                'avancir_id': entry[0],
+                'avancir_status': entry[1],
+                'last_scan': entry[2],
+            })
+
+    return {
+        'matched': len(seen),
+        'discrepancies': discrepancies,
+        'missing_in_avancir': missing_in_avancir,
+        'missing_in_odoo': list(missing_in_odoo.values()),
+        'total_avancir_items': len(seen) + len(missing_in_odoo),
+    }
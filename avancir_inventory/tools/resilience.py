@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Client-side rate limiting and circuit breaking for the Avancir API.
+
+Both are shared by every thread of a worker process, one instance per
+Avancir account (see ``get_guards``). The rate limiter smooths our own
+request rate; the breaker stops sending requests while Avancir is down so
+that callers fail in milliseconds instead of holding a worker through
+timeouts and retries.
+"""
+import threading
+import time
+
+from odoo.exceptions import UserError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class AvancirUnavailable(UserError):
+    """Raised without calling Avancir: the breaker is open or the rate limit is saturated."""
+
+
+class TokenBucket:
+    """Token bucket: ``rate`` requests per second with bursts up to ``burst``."""
+
+    def __init__(self, rate=0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, rate, burst):
+        with self._lock:
+            self.rate = rate
+            self.burst = max(1, burst)
+            self._tokens = min(self._tokens, self.burst)
+
+    def pause(self, seconds):
+        """Hold every caller back, e.g. for a Retry-After sent by Avancir."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _reserve(self):
+        """Take a token and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            else:
+                wait = 0.0
+            return max(wait, self._paused_until - now)
+
+    def _refund(self):
+        with self._lock:
+            if self.rate > 0:
+                self._tokens = min(self.burst, self._tokens + 1)
+
+    def acquire(self, max_wait):
+        """
+        Wait for a request slot.
+
+        Raises:
+            AvancirUnavailable: if the slot is more than ``max_wait`` seconds away
+        """
+        wait = self._reserve()
+        if wait > max_wait:
+            self._refund()
+            raise AvancirUnavailable(
+                f'Avancir rate limit reached, next request slot in {wait:.1f}s. Try again later.')
+        if wait > 0:
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures.
+
+    While open, calls are rejected until ``reset_timeout`` seconds have
+    passed; then a single probe call is let through (half-open). Its
+    success closes the breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold, reset_timeout):
+        with self._lock:
+            self.failure_threshold = max(1, failure_threshold)
+            self.reset_timeout = reset_timeout
+
+    def before_call(self):
+        """Raise AvancirUnavailable unless a call may go out now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    raise AvancirUnavailable(
+                        f'Avancir is unavailable ({self.last_error}); '
+                        f'requests are paused for another {remaining:.0f}s.')
+                self.state = HALF_OPEN
+                self._probing = False
+            if self._probing:
+                raise AvancirUnavailable('Avancir is unavailable; waiting for a recovery probe.')
+            self._probing = True
+
+    def cancel_probe(self):
+        """Give the probe slot back when the call never went out."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)[:200]
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def reset(self):
+        self.record_success()
+
+    def snapshot(self):
+        """State for display: state, failures, seconds until the next probe, last error."""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = max(0, round(self.opened_at + self.reset_timeout - time.monotonic()))
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'retry_in': retry_in,
+                'last_error': self.last_error,
+            }
+
+
+# Process-wide guards, one pair per Avancir account
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guards(key):
+    """Return the (TokenBucket, CircuitBreaker) pair shared for ``key``."""
+    with _guards_lock:
+        guards = _guards.get(key)
+        if guards is None:
+            guards = _guards[key] = (TokenBucket(), CircuitBreaker())
+        return guards
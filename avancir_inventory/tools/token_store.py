@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Avancir session tokens shared between threads and worker processes.
+
+Tokens live in memory and in one small file per key under the Odoo data
+directory. A refresh holds an exclusive ``flock`` on the key's lock file,
+so only one caller across all workers logs in while the others wait and
+then pick up the token it wrote.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows: fall back to in-process locking
+    fcntl = None
+
+_logger = logging.getLogger(__name__)
+
+# Token valid for 1 hour, refresh at 50 minutes
+TOKEN_TTL = 50 * 60
+# Start a background refresh this long before expiry
+REFRESH_AHEAD = 5 * 60
+
+
+class TokenStore:
+    """Single-flight token cache keyed by (dbname, api_url, username, workspace)."""
+
+    def __init__(self):
+        self._memory = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._refreshing = set()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _file_path(directory, key):
+        digest = hashlib.sha1('\x1f'.join(str(k) for k in key).encode('utf-8')).hexdigest()
+        return os.path.join(directory, f'{digest}.json')
+
+    def _read_file(self, directory, key):
+        if not directory:
+            return None
+        try:
+            with open(self._file_path(directory, key)) as f:
+                entry = json.load(f)
+            return entry['token'], float(entry['expiry'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_file(self, directory, key, token, expiry):
+        if not directory:
+            return
+        path = self._file_path(directory, key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'token': token, 'expiry': expiry}, f)
+        os.replace(tmp_path, path)
+
+    def _file_lock(self, directory, key, blocking=True):
+        """Open and flock the key's lock file; returns the fd or None if busy."""
+        if not directory or fcntl is None:
+            return -1
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd = os.open(self._file_path(directory, key) + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        return fd
+
+    @staticmethod
+    def _file_unlock(fd):
+        if fd is not None and fd >= 0:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @staticmethod
+    def _usable(entry, stale_token):
+        return entry and entry[1] > time.time() and entry[0] != stale_token
+
+    def get(self, key, login, directory=None, stale_token=None):
+        """
+        Return a valid token for ``key``, logging in through ``login()`` if needed.
+
+        Args:
+            key: Tuple identifying database, API, user and workspace
+            login: Callable performing /auth/login and returning the token
+            directory: Shared directory for cross-worker caching, or None
+            stale_token: A token the server rejected; it is never returned
+        """
+        entry = self._memory.get(key)
+        if not self._usable(entry, stale_token):
+            entry = self._read_file(directory, key)
+            if self._usable(entry, stale_token):
+                self._memory[key] = entry
+            else:
+                return self._refresh(key, login, directory, stale_token)
+
+        if entry[1] - time.time() < REFRESH_AHEAD:
+            self._refresh_in_background(key, login, directory)
+        return entry[0]
+
+    def _refresh(self, key, login, directory, stale_token=None, blocking=True):
+        lock = self._lock_for(key)
+        if not lock.acquire(blocking=blocking):
+            return None
+        try:
+            fd = self._file_lock(directory, key, blocking=blocking)
+            if fd is None:
+                return None
+            try:
+                # Whoever held the lock before us may already have refreshed
+                entry = self._memory.get(key)
+                if not self._usable(entry, stale_token):
+                    entry = self._read_file(directory, key)
+                if self._usable(entry, stale_token) and (
+                        blocking or entry[1] - time.time() >= REFRESH_AHEAD):
+                    self._memory[key] = entry
+                    return entry[0]
+
+                token = login()
+                expiry = time.time() + TOKEN_TTL
+                self._memory[key] = (token, expiry)
+                try:
+                    self._write_file(directory, key, token, expiry)
+                except OSError as e:
+                    _logger.warning(f'Could not persist Avancir token: {e}')
+                return token
+            finally:
+                self._file_unlock(fd)
+        finally:
+            lock.release()
+
+    def _refresh_in_background(self, key, login, directory):
+        with self._locks_guard:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._refresh(key, login, directory, blocking=False)
+            except Exception as e:
+                _logger.warning(f'Background Avancir token refresh failed: {e}')
+            finally:
+                with self._locks_guard:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, name='avancir-token-refresh', daemon=True).start()
+
+    def invalidate(self, key):
+        self._memory.pop(key, None)
+
+
+token_store = TokenStore()